@@ -0,0 +1,510 @@
+"""
+etl_bench.py
+---------------------------------
+합성 데이터로 ETL 진입점별 처리량(rows/s)과 스테이지별 최대 메모리를 측정합니다.
+
+- synth.py 의 seed 고정 생성기로 flowpop 파일, tb_gmc_* 테이블, KCB/지역화폐 파일, 와이파이 로그를 만듭니다.
+- 매 실행마다 벤치마크 전용 DB 를 새로 만들고 끝나면 삭제합니다.
+    * BENCH_DSN (또는 --dsn) 이 있으면 그 서버에 yeosu_bench_<run_id> DB 를 생성
+    * 없으면 initdb / pg_ctl (PATH 또는 PG_BIN) 로 임시 클러스터를 띄움
+- 케이스마다 새 인터프리터에서 실제 모듈 함수를 실행하고, utils.stage() 가 남기는 스테이지 기록
+  (행 수, wall/CPU 시간)에 10ms 간격 RSS 샘플을 맞춰 스테이지별 최대 메모리를 구합니다.
+- 결과는 커밋 해시와 함께 JSON lines 로 누적되어 compare 로 커밋 간 비교할 수 있습니다.
+
+사용 예)
+    BENCH_DSN=postgresql://postgres@localhost:5432/postgres python etl_bench.py
+    python etl_bench.py --scale 0.1 --only flowpop pop
+    python etl_bench.py compare --base a1b2c3d
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEPLOY_DIR = os.path.dirname(BENCH_DIR)
+MODULE_DIR = os.path.join(DEPLOY_DIR, "module")
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results", "etl_bench.jsonl")
+
+# scale 1.0 기준 데이터 크기
+BASE_SIZES = {
+    "flowpop_rows": 1_000_000,
+    "households": 50_000,
+    "kcb_rows": 200_000,
+    "local_pay_rows": 300_000,
+    "wifi_days": 14,
+}
+FLOWPOP_YM = "202509"
+
+
+# -----------------------------------------------------------
+# 🐘 벤치마크 전용 PostgreSQL
+# -----------------------------------------------------------
+def _find_pg_bin(name: str) -> str | None:
+    pg_bin = os.getenv("PG_BIN")
+    if pg_bin and os.path.exists(os.path.join(pg_bin, name)):
+        return os.path.join(pg_bin, name)
+    return shutil.which(name)
+
+
+class BenchDatabase:
+    """
+    벤치마크 1회용 DB. with 블록이 끝나면 DB(임시 클러스터면 클러스터 전체)를 삭제합니다.
+
+    Parameters
+    ----------
+    dsn : str, optional
+        관리용 접속 DSN (CREATE DATABASE 권한 필요). 없으면 임시 클러스터를 띄웁니다.
+    keep : bool
+        True 이면 종료 후에도 DB 를 남깁니다. (결과 테이블 확인용, 임시 클러스터에는 적용되지 않음)
+    """
+
+    def __init__(self, dsn: str | None, run_id: str, keep: bool = False):
+        self.dsn = dsn
+        self.dbname = f"yeosu_bench_{run_id}"
+        self.keep = keep
+        self._cluster_dir = None
+
+    def _start_cluster(self):
+        initdb, pg_ctl = _find_pg_bin("initdb"), _find_pg_bin("pg_ctl")
+        if not initdb or not pg_ctl:
+            raise RuntimeError("BENCH_DSN 이 없고 initdb / pg_ctl 도 찾을 수 없습니다. (PATH 또는 PG_BIN 지정)")
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            raise RuntimeError("initdb 는 root 로 실행할 수 없습니다. BENCH_DSN 으로 접속할 PostgreSQL 을 지정하세요.")
+
+        self._cluster_dir = tempfile.mkdtemp(prefix="yeosu_bench_pg_")
+        data_dir = os.path.join(self._cluster_dir, "data")
+        subprocess.run([initdb, "-D", data_dir, "-U", "postgres", "-A", "trust", "-E", "UTF8"],
+                       check=True, capture_output=True)
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        subprocess.run([pg_ctl, "-D", data_dir, "-l", os.path.join(self._cluster_dir, "postgres.log"), "-w",
+                        "-o", f"-p {port} -c listen_addresses=127.0.0.1 -k {self._cluster_dir}", "start"],
+                       check=True, capture_output=True)
+        self.dsn = f"postgresql://postgres@127.0.0.1:{port}/postgres"
+
+    def _stop_cluster(self):
+        subprocess.run([_find_pg_bin("pg_ctl"), "-D", os.path.join(self._cluster_dir, "data"), "-m", "fast", "stop"],
+                       capture_output=True)
+        shutil.rmtree(self._cluster_dir, ignore_errors=True)
+
+    def _admin(self):
+        import psycopg2
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def __enter__(self):
+        if not self.dsn:
+            self._start_cluster()
+        conn = self._admin()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {self.dbname}")
+            cur.execute(f"CREATE DATABASE {self.dbname}")
+        conn.close()
+        return self
+
+    def __exit__(self, *exc):
+        if self._cluster_dir:
+            self._stop_cluster()
+        elif not self.keep:
+            conn = self._admin()
+            with conn.cursor() as cur:
+                cur.execute(f"DROP DATABASE IF EXISTS {self.dbname} WITH (FORCE)")
+            conn.close()
+
+    def params(self) -> dict:
+        """DSN 을 user / password / host / port 로 분해합니다. (host=/소켓경로 쿼리 형식 포함)"""
+        parts = urlsplit(self.dsn)
+        query = parse_qs(parts.query)
+        return {
+            "user": parts.username or query.get("user", ["postgres"])[0],
+            "password": parts.password or "",
+            "host": parts.hostname or query.get("host", [""])[0],
+            "port": str(parts.port or query.get("port", ["5432"])[0]),
+        }
+
+    def connect(self):
+        import psycopg2
+        p = self.params()
+        return psycopg2.connect(dbname=self.dbname, user=p["user"], password=p["password"],
+                                host=p["host"] or None, port=p["port"])
+
+    def env(self) -> dict:
+        """
+        모듈들이 읽는 DB_* / WIFI_DB_* 환경변수. 유닉스 소켓이면 DB_HOST 를 비우고 PGHOST 로 넘깁니다.
+        """
+        p = self.params()
+        env = {}
+        for prefix in ("DB", "WIFI_DB"):
+            env.update({
+                f"{prefix}_USER": p["user"], f"{prefix}_PASS": p["password"],
+                f"{prefix}_HOST": "" if p["host"].startswith("/") else p["host"],
+                f"{prefix}_PORT": p["port"], f"{prefix}_NAME": self.dbname,
+            })
+        if p["host"].startswith("/"):
+            env["PGHOST"] = p["host"]
+        return env
+
+
+# -----------------------------------------------------------
+# 🧪 벤치마크 케이스 (prepare: 부모 프로세스에서 데이터 생성 / run: 자식 프로세스에서 측정)
+# -----------------------------------------------------------
+def reset_tables(sql: str):
+    """자식 프로세스에서 케이스 실행 전 이전 케이스의 결과 테이블을 정리합니다."""
+    from utils import get_engine_from_env
+    raw = get_engine_from_env(app_name="etl_bench").raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(sql)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def prepare_flowpop(db, workdir, sizes, seed):
+    import synth
+    data_dir = os.path.join(workdir, "data")
+    path = os.path.join(data_dir, f"yeosoo_flow_age_time_{FLOWPOP_YM}.csv")
+    if not os.path.exists(path):
+        path = synth.gen_flowpop_file(data_dir, FLOWPOP_YM, sizes["flowpop_rows"], seed)
+    return {"path": path, "ym": FLOWPOP_YM}
+
+
+def run_flowpop(params, workers=1, layout="wide"):
+    import flowpop
+    from utils import get_engine_from_env
+    reset_tables(
+        "DROP TABLE IF EXISTS public.tb_flowpop, public.tb_flowpop_compact, public.tb_flowpop_grid CASCADE"
+    )
+    flowpop.load_flowpop(params["path"], workers=workers, layout=layout)
+    flowpop.run_sql_aggregations(params["ym"], get_engine_from_env(app_name="flowpop"))
+
+
+def prepare_pop(db, workdir, sizes, seed):
+    import synth
+    conn = db.connect()
+    try:
+        return synth.gen_resident_tables(conn, sizes["households"], seed)
+    finally:
+        conn.close()
+
+
+def run_pop(params):
+    import pop
+    pop.run_population(async_io=False)
+
+
+def prepare_localeco(db, workdir, sizes, seed):
+    import synth
+    data_dir = os.path.join(workdir, "data")
+    kcb, ind = synth.gen_kcb_files(data_dir, sizes["kcb_rows"], seed)
+    pay = synth.gen_local_pay_file(data_dir, sizes["local_pay_rows"], seed)
+    return {"kcb": kcb, "ind": ind, "local_pay": pay}
+
+
+def run_localeco(params, backend="pandas"):
+    import localeco
+    from utils import setup_logger
+    logger = setup_logger("LocalEconomy-BENCH")
+    for process in (localeco.process_kcb, localeco.process_local, localeco.process_local2):
+        if backend == "duckdb":
+            process = localeco.DUCKDB_PROCESSORS.get(process, process)
+        process(logger)
+
+
+def prepare_wifi(db, workdir, sizes, seed):
+    import synth
+    conn = db.connect()
+    try:
+        start, end = synth.gen_wifi_logs(conn, sizes["wifi_days"], seed)
+    finally:
+        conn.close()
+    return {"start": start.isoformat(), "end": end.isoformat()}
+
+
+def run_wifi(params):
+    import wifi_predict
+    wifi_predict.run_backfill(params["start"], params["end"], use_cache=False)
+
+
+CASES = {
+    # 이름: (prepare, run, run kwargs)
+    "flowpop": (prepare_flowpop, run_flowpop, {}),
+    "flowpop_parallel": (prepare_flowpop, run_flowpop, {"workers": 4}),
+    "flowpop_compact": (prepare_flowpop, run_flowpop, {"layout": "compact"}),
+    "pop": (prepare_pop, run_pop, {}),
+    "localeco": (prepare_localeco, run_localeco, {}),
+    "localeco_duckdb": (prepare_localeco, run_localeco, {"backend": "duckdb"}),
+    "wifi": (prepare_wifi, run_wifi, {}),
+}
+
+
+# -----------------------------------------------------------
+# 📈 자식 프로세스: RSS 샘플링 + 케이스 실행
+# -----------------------------------------------------------
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def child_main(case: str, params_path: str, rss_path: str, interval: float = 0.01):
+    sys.path.insert(0, MODULE_DIR)
+    sys.path.insert(0, os.path.join(MODULE_DIR, "predict_model"))
+    os.chdir(MODULE_DIR)
+
+    samples = []
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            samples.append((time.time(), _rss_bytes()))
+            stop.wait(interval)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    with open(params_path, encoding="utf-8") as f:
+        params = json.load(f)
+    _, run, kwargs = CASES[case]
+    t0 = time.time()
+    status = "ok"
+    try:
+        run(params, **kwargs)
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stop.set()
+        sampler.join()
+        with open(rss_path, "w", encoding="utf-8") as f:
+            json.dump({"started": t0, "ended": time.time(), "status": status, "samples": samples}, f)
+
+
+# -----------------------------------------------------------
+# 🏁 부모 프로세스: 준비 → 실행 → 스테이지 기록 병합
+# -----------------------------------------------------------
+def _git_info() -> dict:
+    def git(*args):
+        proc = subprocess.run(["git", *args], cwd=DEPLOY_DIR, capture_output=True, text=True)
+        return proc.stdout.strip() if proc.returncode == 0 else None
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "-uno"))}
+
+
+def _peak_in_window(samples, start: float, end: float) -> float | None:
+    """[start, end] 구간 RSS 샘플 최댓값(MB). 구간이 샘플 간격보다 짧으면 직후 샘플을 사용합니다."""
+    window = [rss for t, rss in samples if start <= t <= end]
+    if not window:
+        window = [rss for t, rss in samples if t >= end][:1]
+    return round(max(window) / 1024 ** 2, 1) if window else None
+
+
+def merge_results(case: str, metrics_path: str, rss: dict, meta: dict) -> list[dict]:
+    """스테이지 JSON 기록마다 같은 시간 구간의 최대 RSS 를 붙여 결과 레코드를 만듭니다."""
+    records = []
+    if os.path.exists(metrics_path):
+        with open(metrics_path, encoding="utf-8") as f:
+            stages = [json.loads(line) for line in f if line.strip()]
+    else:
+        stages = []
+    for st in stages:
+        ended = datetime.fromisoformat(st["ts"]).timestamp()
+        records.append({
+            **meta, "case": case, "job": st["job"], "stage": st["stage"], "labels": st.get("labels", {}),
+            "status": st["status"], "rows_in": st["rows_in"], "rows_out": st["rows_out"],
+            "wall_s": st["wall_s"], "cpu_s": st["cpu_s"], "rows_per_sec": st["rows_per_sec"],
+            "peak_rss_mb": _peak_in_window(rss["samples"], ended - st["wall_s"], ended),
+        })
+    records.append({
+        **meta, "case": case, "job": None, "stage": "_case", "labels": {}, "status": rss["status"],
+        "rows_in": None, "rows_out": None, "wall_s": round(rss["ended"] - rss["started"], 4), "cpu_s": None,
+        "rows_per_sec": None, "peak_rss_mb": _peak_in_window(rss["samples"], rss["started"], rss["ended"]),
+    })
+    return records
+
+
+def run_case(case: str, db: BenchDatabase, workdir: str, sizes: dict, seed: int, meta: dict) -> list[dict]:
+    prepare, _, _ = CASES[case]
+    print(f"🧪 [{case}] 데이터 생성 중 ...", flush=True)
+    params = prepare(db, workdir, sizes, seed)
+    params_path = os.path.join(workdir, f"params_{case}.json")
+    with open(params_path, "w", encoding="utf-8") as f:
+        json.dump(params, f, ensure_ascii=False)
+
+    metrics_path = os.path.join(workdir, f"metrics_{case}.jsonl")
+    rss_path = os.path.join(workdir, f"rss_{case}.json")
+    env = {
+        **os.environ, **db.env(),
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "METRICS_LOG_PATH": metrics_path,
+        "WIFI_PRED_CACHE_PATH": os.path.join(workdir, "cache", "wifi_prediction_cache.json"),
+        "DB_APP_NAME": "etl_bench",
+    }
+    env.pop("PROM_TEXTFILE_DIR", None)
+
+    print(f"🏃 [{case}] 실행 중 ...", flush=True)
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "_child", case, params_path, rss_path],
+                          cwd=MODULE_DIR, env=env, capture_output=True, text=True)
+    if not os.path.exists(rss_path):
+        raise RuntimeError(f"{case} 실행 실패:\n{proc.stderr[-3000:]}")
+    with open(rss_path, encoding="utf-8") as f:
+        rss = json.load(f)
+    if proc.returncode != 0:
+        print(f"❌ [{case}] 실패:\n{proc.stderr[-3000:]}", flush=True)
+    return merge_results(case, metrics_path, rss, meta)
+
+
+def _fmt(value, spec: str) -> str:
+    return "" if value is None else format(value, spec)
+
+
+def print_records(records: list[dict]):
+    print(f"{'case':<18}{'stage':<16}{'labels':<34}{'rows':>12}{'wall_s':>10}{'rows/s':>12}{'peak MB':>10}")
+    for r in records:
+        labels = ",".join(f"{k}={v}" for k, v in r["labels"].items())[:32]
+        rows = r["rows_out"] if r["rows_out"] is not None else r["rows_in"]
+        print(f"{r['case']:<18}{r['stage']:<16}{labels:<34}{_fmt(rows, ','):>12}{r['wall_s']:>10.2f}"
+              f"{_fmt(r['rows_per_sec'], ',.0f'):>12}{_fmt(r['peak_rss_mb'], ',.0f'):>10}"
+              + ("" if r["status"] == "ok" else "  ❌"))
+
+
+def cmd_run(args):
+    sys.path.insert(0, BENCH_DIR)
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    sizes = {k: max(int(round(v * args.scale)), 1) for k, v in BASE_SIZES.items()}
+    meta = {"run_id": run_id, "ts": datetime.now().isoformat(timespec="seconds"), **_git_info(),
+            "host": platform.node(), "python": platform.python_version(),
+            "scale": args.scale, "seed": args.seed}
+    cases = args.only or list(CASES)
+
+    workdir = tempfile.mkdtemp(prefix="yeosu_bench_")
+    os.makedirs(os.path.join(workdir, "data"))
+    # 매핑 JSON 은 실제 파일을 그대로 사용
+    os.symlink(os.path.join(DEPLOY_DIR, "data", "json"), os.path.join(workdir, "data", "json"))
+
+    records = []
+    try:
+        with BenchDatabase(args.dsn or os.getenv("BENCH_DSN"), run_id, keep=args.keep_db) as db:
+            for case in cases:
+                records += run_case(case, db, workdir, sizes, args.seed, meta)
+    finally:
+        if args.keep_files:
+            print(f"📁 작업 디렉토리: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_records(records)
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    print(f"📝 결과 {len(records)}건 → {args.results}")
+    return 0 if all(r["status"] == "ok" for r in records) else 1
+
+
+# -----------------------------------------------------------
+# 🔍 커밋 간 비교
+# -----------------------------------------------------------
+def _summarize(records: list[dict]) -> dict:
+    """(case, stage, labels) 별 rows / wall_s 합계와 peak 최댓값"""
+    out = {}
+    for r in records:
+        key = (r["case"], r["stage"], json.dumps(r["labels"], sort_keys=True, ensure_ascii=False))
+        agg = out.setdefault(key, {"rows": 0, "wall_s": 0.0, "peak_rss_mb": 0.0})
+        rows = r["rows_out"] if r["rows_out"] is not None else r["rows_in"]
+        agg["rows"] += rows or 0
+        agg["wall_s"] += r["wall_s"] or 0.0
+        agg["peak_rss_mb"] = max(agg["peak_rss_mb"], r["peak_rss_mb"] or 0.0)
+    for agg in out.values():
+        agg["rows_per_sec"] = agg["rows"] / agg["wall_s"] if agg["rows"] and agg["wall_s"] > 0 else None
+    return out
+
+
+def _pick_run(runs: dict, rev: str | None, default_pos: int) -> str:
+    if rev is None:
+        return list(runs)[default_pos]
+    matched = [run_id for run_id, recs in runs.items()
+               if run_id == rev or (recs[0]["commit"] or "").startswith(rev)]
+    if not matched:
+        raise SystemExit(f"결과 파일에서 {rev} 실행을 찾을 수 없습니다.")
+    return matched[-1]
+
+
+def cmd_compare(args):
+    with open(args.results, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    runs = {}
+    for r in records:
+        runs.setdefault(r["run_id"], []).append(r)
+    if len(runs) < 2 and not (args.base and args.head):
+        raise SystemExit("비교하려면 실행 결과가 2개 이상 필요합니다.")
+
+    base_id, head_id = _pick_run(runs, args.base, -2), _pick_run(runs, args.head, -1)
+    base, head = _summarize(runs[base_id]), _summarize(runs[head_id])
+    b0, h0 = runs[base_id][0], runs[head_id][0]
+    print(f"base: {base_id} ({b0['commit']}{'+' if b0['dirty'] else ''}, scale {b0['scale']})")
+    print(f"head: {head_id} ({h0['commit']}{'+' if h0['dirty'] else ''}, scale {h0['scale']})")
+    print(f"{'case':<18}{'stage':<16}{'labels':<30}{'base rows/s':>13}{'head rows/s':>13}{'Δ':>8}"
+          f"{'base MB':>9}{'head MB':>9}")
+
+    for key in sorted(set(base) | set(head)):
+        case, stage_name, labels = key
+        b, h = base.get(key, {}), head.get(key, {})
+        b_rps, h_rps = b.get("rows_per_sec"), h.get("rows_per_sec")
+        if stage_name == "_case":
+            b_rps, h_rps = b.get("wall_s"), h.get("wall_s")
+        delta = (h_rps / b_rps - 1) * 100 if b_rps and h_rps else None
+        label_str = ",".join(f"{k}={v}" for k, v in json.loads(labels).items())[:28]
+        spec = ".2f" if stage_name == "_case" else ",.0f"
+        print(f"{case:<18}{stage_name:<16}{label_str:<30}{_fmt(b_rps, spec):>13}{_fmt(h_rps, spec):>13}"
+              f"{_fmt(delta, '+.1f') + ('%' if delta is not None else ''):>8}"
+              f"{_fmt(b.get('peak_rss_mb'), ',.0f'):>9}{_fmt(h.get('peak_rss_mb'), ',.0f'):>9}")
+    print("(_case 행은 rows/s 대신 케이스 전체 wall 초 - 작을수록 빠름)")
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "_child":
+        child_main(*sys.argv[2:5])
+        return 0
+
+    parser = argparse.ArgumentParser(description="합성 데이터 ETL 처리량 / 메모리 벤치마크")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="결과 JSON lines 파일 (누적)")
+    sub = parser.add_subparsers(dest="command")
+
+    p_run = sub.add_parser("run", help="벤치마크 실행 (기본)")
+    p_cmp = sub.add_parser("compare", help="두 실행 결과 비교 (기본: 마지막 두 실행)")
+    for p in (parser, p_run):
+        p.add_argument("--scale", type=float, default=1.0, help="데이터 크기 배율 (기본 1.0)")
+        p.add_argument("--seed", type=int, default=42)
+        p.add_argument("--only", nargs="+", choices=list(CASES), help="실행할 케이스만 지정")
+        p.add_argument("--dsn", help="관리용 PostgreSQL DSN (기본 BENCH_DSN, 없으면 임시 클러스터)")
+        p.add_argument("--keep-db", action="store_true", help="종료 후 벤치마크 DB 를 삭제하지 않음")
+        p.add_argument("--keep-files", action="store_true", help="생성한 파일/로그 디렉토리를 삭제하지 않음")
+    p_cmp.add_argument("--base", help="기준 실행 (run_id 또는 커밋 해시 앞부분)")
+    p_cmp.add_argument("--head", help="비교 실행 (run_id 또는 커밋 해시 앞부분)")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return cmd_compare(args)
+    return cmd_run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
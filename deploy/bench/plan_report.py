@@ -0,0 +1,221 @@
+"""
+plan_report.py
+---------------------------------
+SQL 프로파일링(SQL_PROFILE=1)으로 저장된 실행 계획을 조회하고 실행(run) 간 비교합니다.
+
+- 저장소는 utils.sql_profile_path() (SQL_PROFILE_DB, 기본 LOG_DIR/sql_profile.sqlite) 입니다.
+- run_id 는 프로세스 한 번의 실행이며, SQL_PROFILE_RUN_ID 로 직접 지정할 수도 있습니다.
+- diff 는 같은 쿼리 이름끼리 계획 구조(노드 종류 / 테이블 / 인덱스 / 조인 방식)의 차이와
+  실행 시간, 공유 버퍼 hit/read 변화를 보여줍니다.
+
+사용 예)
+    python plan_report.py runs
+    python plan_report.py list --run 20251201020000-1234
+    python plan_report.py show 42
+    python plan_report.py diff                      # 마지막 두 실행 비교
+    python plan_report.py diff --base 20251101 --head 20251201 --name flowpop.tb_flowpop_agg_daily
+"""
+import os
+import sys
+import json
+import sqlite3
+import difflib
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_DIR = os.path.join(os.path.dirname(BENCH_DIR), "module")
+
+
+def _default_db() -> str:
+    sys.path.insert(0, MODULE_DIR)
+    from utils import sql_profile_path
+    return sql_profile_path()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if not os.path.exists(path):
+        raise SystemExit(f"프로파일 저장소가 없습니다: {path} (SQL_PROFILE=1 로 실행했는지 확인)")
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+# -----------------------------------------------------------
+# 🌳 계획 트리 평탄화
+# -----------------------------------------------------------
+def _root(plan_json: str) -> dict:
+    plan = json.loads(plan_json)
+    return (plan[0] if isinstance(plan, list) else plan)["Plan"]
+
+
+def walk_plan(node: dict, depth: int = 0):
+    """(depth, node) 를 전위 순회로 반환합니다."""
+    yield depth, node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child, depth + 1)
+
+
+def node_signature(node: dict) -> str:
+    """실행 시마다 변하지 않는 노드 구조 (노드 종류 / 조인 방식 / 테이블 / 인덱스)"""
+    parts = [node["Node Type"]]
+    for key, fmt in (("Join Type", "{} join"), ("Strategy", "{}"), ("Relation Name", "on {}"),
+                     ("Index Name", "using {}"), ("Parent Relationship", "[{}]")):
+        if node.get(key):
+            parts.append(fmt.format(node[key]))
+    return " ".join(parts)
+
+
+def node_stats(node: dict) -> str:
+    loops = node.get("Actual Loops") or 1
+    rows = node.get("Actual Rows")
+    return (
+        f"rows={_fmt(rows, ',')} (est {_fmt(node.get('Plan Rows'), ',')})"
+        f" loops={loops} time={_fmt(node.get('Actual Total Time'), ',.1f')}ms"
+        f" hit={_fmt(node.get('Shared Hit Blocks'), ',')} read={_fmt(node.get('Shared Read Blocks'), ',')}"
+        + (f" temp={node['Temp Written Blocks']:,}" if node.get("Temp Written Blocks") else "")
+    )
+
+
+def plan_lines(plan_json: str, stats: bool = True) -> list[str]:
+    lines = []
+    for depth, node in walk_plan(_root(plan_json)):
+        line = "  " * depth + "-> " + node_signature(node)
+        lines.append(line + ("  " + node_stats(node) if stats else ""))
+    return lines
+
+
+def plan_totals(plan_json: str) -> dict:
+    """루트 노드 기준 공유 버퍼 hit/read (하위 노드 값이 누적되어 있음)"""
+    root = _root(plan_json)
+    return {"hit": root.get("Shared Hit Blocks"), "read": root.get("Shared Read Blocks"),
+            "temp": root.get("Temp Written Blocks")}
+
+
+# -----------------------------------------------------------
+# 📋 명령
+# -----------------------------------------------------------
+def cmd_runs(conn, args):
+    rows = conn.execute("""
+        SELECT run_id, MIN(ts) AS started, GROUP_CONCAT(DISTINCT job) AS jobs, COUNT(*) AS n,
+               SUM(elapsed_ms) AS total_ms
+        FROM sql_profile GROUP BY run_id ORDER BY MIN(id)
+    """).fetchall()
+    print(f"{'run_id':<24}{'started':<25}{'plans':>6}{'total s':>10}  jobs")
+    for r in rows:
+        print(f"{r['run_id']:<24}{r['started']:<25}{r['n']:>6}{r['total_ms'] / 1000:>10,.1f}  {r['jobs']}")
+    return 0
+
+
+def cmd_list(conn, args):
+    sql = "SELECT id, run_id, name, params, elapsed_ms, plan_ms FROM sql_profile WHERE 1=1"
+    params = []
+    if args.run:
+        sql += " AND run_id LIKE ?"
+        params.append(args.run + "%")
+    if args.name:
+        sql += " AND name LIKE ?"
+        params.append(args.name.replace("*", "%"))
+    sql += " ORDER BY id"
+    print(f"{'id':>5}  {'run_id':<24}{'name':<40}{'elapsed ms':>12}{'plan ms':>11}  params")
+    for r in conn.execute(sql, params):
+        print(f"{r['id']:>5}  {r['run_id']:<24}{r['name']:<40}{r['elapsed_ms']:>12,.0f}"
+              f"{_fmt(r['plan_ms'], ',.0f'):>11}  {r['params'] or ''}")
+    return 0
+
+
+def cmd_show(conn, args):
+    r = conn.execute("SELECT * FROM sql_profile WHERE id = ?", (args.id,)).fetchone()
+    if r is None:
+        raise SystemExit(f"id {args.id} 가 없습니다.")
+    print(f"[{r['id']}] {r['name']}  run={r['run_id']}  job={r['job']}  ts={r['ts']}")
+    print(f"elapsed {r['elapsed_ms']:,.0f}ms / EXPLAIN ANALYZE {_fmt(r['plan_ms'], ',.0f')}ms  params={r['params']}")
+    if args.sql:
+        print(r["sql"].strip())
+    print("\n".join(plan_lines(r["plan"])))
+    return 0
+
+
+def _latest_by_name(conn, run_id: str) -> dict:
+    """run 안에서 쿼리 이름별 마지막 계획"""
+    rows = conn.execute(
+        "SELECT * FROM sql_profile WHERE run_id = ? ORDER BY id", (run_id,)
+    ).fetchall()
+    return {r["name"]: r for r in rows}
+
+
+def _pick_run(run_ids: list[str], prefix: str | None, default_pos: int) -> str:
+    if prefix is None:
+        return run_ids[default_pos]
+    matched = [run_id for run_id in run_ids if run_id.startswith(prefix)]
+    if not matched:
+        raise SystemExit(f"저장소에서 {prefix} 실행을 찾을 수 없습니다.")
+    return matched[-1]
+
+
+def cmd_diff(conn, args):
+    run_ids = [r[0] for r in conn.execute("SELECT run_id FROM sql_profile GROUP BY run_id ORDER BY MIN(id)")]
+    if len(run_ids) < 2 and not (args.base and args.head):
+        raise SystemExit("비교하려면 실행이 2개 이상 필요합니다.")
+    base_id, head_id = _pick_run(run_ids, args.base, -2), _pick_run(run_ids, args.head, -1)
+    base, head = _latest_by_name(conn, base_id), _latest_by_name(conn, head_id)
+    names = sorted(set(base) | set(head))
+    if args.name:
+        names = [n for n in names if n == args.name]
+    print(f"base: {base_id}\nhead: {head_id}\n")
+
+    for name in names:
+        b, h = base.get(name), head.get(name)
+        if b is None or h is None:
+            print(f"■ {name}: {'head' if b is None else 'base'} 에만 있음 (임계값 미만이었을 수 있음)\n")
+            continue
+        bt, ht = plan_totals(b["plan"]), plan_totals(h["plan"])
+        delta = (h["elapsed_ms"] / b["elapsed_ms"] - 1) * 100 if b["elapsed_ms"] else None
+        b_sig, h_sig = plan_lines(b["plan"], stats=False), plan_lines(h["plan"], stats=False)
+        changed = b_sig != h_sig
+        print(f"■ {name}  {'⚠ 계획 변경' if changed else '계획 동일'}")
+        print(f"  elapsed {b['elapsed_ms']:,.0f}ms → {h['elapsed_ms']:,.0f}ms ({_fmt(delta, '+.1f')}%)"
+              f"  hit {_fmt(bt['hit'], ',')} → {_fmt(ht['hit'], ',')}"
+              f"  read {_fmt(bt['read'], ',')} → {_fmt(ht['read'], ',')}"
+              f"  temp {_fmt(bt['temp'], ',')} → {_fmt(ht['temp'], ',')}")
+        if changed:
+            for line in difflib.unified_diff(b_sig, h_sig, "base", "head", lineterm="", n=2):
+                print("  " + line)
+        elif args.verbose:
+            for b_line, h_line in zip(plan_lines(b["plan"]), plan_lines(h["plan"])):
+                print("  - " + b_line + "\n  + " + h_line.strip())
+        print()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL 실행 계획 프로파일 조회 / 비교")
+    parser.add_argument("--db", help="프로파일 저장소 (기본 SQL_PROFILE_DB 또는 LOG_DIR/sql_profile.sqlite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("runs", help="실행(run) 목록")
+    p_list = sub.add_parser("list", help="저장된 계획 목록")
+    p_list.add_argument("--run", help="run_id (앞부분)")
+    p_list.add_argument("--name", help="쿼리 이름 (* 와일드카드)")
+    p_show = sub.add_parser("show", help="계획 하나를 트리로 출력")
+    p_show.add_argument("id", type=int)
+    p_show.add_argument("--sql", action="store_true", help="SQL 원문도 출력")
+    p_diff = sub.add_parser("diff", help="두 실행의 같은 쿼리 계획 비교 (기본: 마지막 두 실행)")
+    p_diff.add_argument("--base", help="기준 run_id (앞부분)")
+    p_diff.add_argument("--head", help="비교 run_id (앞부분)")
+    p_diff.add_argument("--name", help="특정 쿼리 이름만 비교")
+    p_diff.add_argument("-v", "--verbose", action="store_true", help="계획이 같아도 노드별 수치 비교 출력")
+
+    args = parser.parse_args()
+    conn = _connect(args.db or _default_db())
+    try:
+        return {"runs": cmd_runs, "list": cmd_list, "show": cmd_show, "diff": cmd_diff}[args.command](conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+startup_bench.py
+---------------------------------
+deploy 모듈 진입점별 임포트(기동) 시간 측정 및 예산 검사
+
+- 진입점마다 새 인터프리터를 띄워 `import <모듈>` 시간을 repeat 회 측정하고 중앙값을 예산과 비교합니다.
+- 진입점별로 "임포트되면 안 되는 모듈"(예: flowpop 의 pandas / geopandas)이 로드되었는지도 검사합니다.
+- 하나라도 예산 초과 또는 금지 모듈이 로드되면 종료 코드 1 을 반환합니다. (CI / 배포 전 점검용)
+
+사용 예)
+    python startup_bench.py
+    python startup_bench.py --repeat 7 --budget flowpop=0.4 --detail
+    python startup_bench.py --only flowpop pop --json startup.jsonl
+"""
+import os
+import sys
+import json
+import tempfile
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 이름: (작업 디렉토리, 모듈, 예산(초), 임포트되면 안 되는 모듈)
+ENTRY_POINTS = {
+    "utils": ("module", "utils", 0.8, ["pandas", "geopandas", "shapely", "pyproj"]),
+    "flowpop": ("module", "flowpop", 0.8, ["pandas", "geopandas", "shapely", "pyproj"]),
+    "orchestrator": ("module", "orchestrator", 0.8, ["pandas", "geopandas", "shapely", "pyproj"]),
+    "pop": ("module", "pop", 1.5, ["geopandas", "shapely", "pyproj"]),
+    "localeco": ("module", "localeco", 1.5, ["geopandas", "shapely", "pyproj"]),
+    "wifi_predict": ("module/predict_model", "wifi_predict", 2.0, ["geopandas", "sklearn", "xgboost", "joblib"]),
+    "compiled_model": ("module/predict_model", "compiled_model", 1.0, ["pandas", "geopandas", "sklearn", "xgboost"]),
+}
+
+CHILD_CODE = """
+import sys, time, json
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {watch!r} if m in sys.modules]}}))
+"""
+
+
+def measure_once(name: str, log_dir: str, importtime: bool = False) -> dict:
+    """새 인터프리터에서 모듈을 한 번 임포트하고 소요 시간/로드된 감시 모듈을 반환합니다."""
+    workdir, module, _, forbidden = ENTRY_POINTS[name]
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", CHILD_CODE.format(module=module, watch=forbidden)]
+    # 진입점 임포트 시 생성되는 로그 파일은 임시 디렉토리로
+    env = {**os.environ, "LOG_DIR": log_dir, "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(cmd, cwd=os.path.join(DEPLOY_DIR, workdir), env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} 임포트 실패:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["importtime"] = _top_imports(proc.stderr, module)
+    return result
+
+
+def _top_imports(stderr: str, module: str, top: int = 10) -> list[tuple[str, float]]:
+    """-X importtime 출력에서 누적 시간이 큰 최상위 패키지(측정 대상 모듈 제외)를 뽑습니다."""
+    rows = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = (part.strip() for part in line[len("import time:"):].split("|"))
+        if "." in package or package == module:
+            continue
+        rows[package] = max(rows.get(package, 0.0), int(cumulative) / 1e6)
+    return sorted(rows.items(), key=lambda r: r[1], reverse=True)[:top]
+
+
+def run(names: list[str], repeat: int, budgets: dict, detail: bool) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name in names:
+            # 첫 실행은 .pyc / 디스크 캐시 워밍업으로 버림
+            measure_once(name, log_dir)
+            samples = [measure_once(name, log_dir) for _ in range(repeat)]
+            seconds = [s["seconds"] for s in samples]
+            loaded = sorted(set().union(*(s["loaded"] for s in samples)))
+            median = statistics.median(seconds)
+            budget = budgets[name]
+            result = {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "entry_point": name,
+                "median_s": round(median, 4),
+                "min_s": round(min(seconds), 4),
+                "max_s": round(max(seconds), 4),
+                "budget_s": budget,
+                "forbidden_loaded": loaded,
+                "ok": median <= budget and not loaded,
+            }
+            if detail:
+                result["top_imports"] = measure_once(name, log_dir, importtime=True)["importtime"]
+            results.append(result)
+    return results
+
+
+def parse_budgets(values: list[str]) -> dict:
+    budgets = {name: spec[2] for name, spec in ENTRY_POINTS.items()}
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        if name not in budgets:
+            raise SystemExit(f"알 수 없는 진입점: {name}")
+        budgets[name] = float(seconds)
+    return budgets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="deploy 모듈 임포트 시간 예산 검사")
+    parser.add_argument("--repeat", type=int, default=5, help="진입점별 측정 횟수 (중앙값 사용)")
+    parser.add_argument("--budget", action="append", metavar="NAME=SECONDS", help="진입점 예산 변경 (반복 지정 가능)")
+    parser.add_argument("--only", nargs="+", choices=list(ENTRY_POINTS), help="측정할 진입점만 지정")
+    parser.add_argument("--detail", action="store_true", help="-X importtime 으로 누적 시간 상위 패키지 출력")
+    parser.add_argument("--json", metavar="PATH", help="결과를 JSON lines 로 추가 기록")
+    args = parser.parse_args()
+
+    results = run(args.only or list(ENTRY_POINTS), args.repeat, parse_budgets(args.budget), args.detail)
+
+    for r in results:
+        mark = "✅" if r["ok"] else "❌"
+        extra = f"  금지 모듈 로드: {r['forbidden_loaded']}" if r["forbidden_loaded"] else ""
+        print(f"{mark} {r['entry_point']:16s} median {r['median_s']:.3f}s "
+              f"(min {r['min_s']:.3f}s, max {r['max_s']:.3f}s) / budget {r['budget_s']:.2f}s{extra}")
+        for package, seconds in r.get("top_imports", []):
+            print(f"      {package:24s} {seconds:.3f}s")
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
@@ -0,0 +1,368 @@
+"""
+synth.py
+---------------------------------
+ETL 벤치마크용 합성 데이터 생성기 (seed 고정 → 같은 seed / scale 이면 같은 데이터)
+
+- flow_age_time 유동인구 파이프(|) 파일
+- tb_gmc_* 주민등록 세대/세대원/전입/전출 테이블 (addr_id_map / pop_grid_id 로 매핑 가능한 주소 사용)
+- KCB 소상공인(YEOSU_SOHO_STAT_*) / 업종코드(YEOSU_IND_CODE*) / 지역화폐(local_pay_*) 파일
+- ap.log_summary_rukus 와이파이 접속 로그 (wifi_grid_id 의 AP 사용)
+
+격자 id, 주소, 가맹점명, AP 는 deploy/data/json 의 실제 매핑에서 뽑아 파이프라인의 매핑 단계가 실제와 같은 비율로 동작하도록 합니다.
+"""
+import io
+import os
+import sys
+import json
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JSON_DIR = os.path.join(DEPLOY_DIR, "data", "json")
+sys.path.insert(0, os.path.join(DEPLOY_DIR, "module"))
+from utils import compact_grid_mapping
+
+# 여수시 행정동 코드 (flow_age_time 의 admi_cd 형식, 8자리)
+ADMI_CODES = [46130510 + 10 * i for i in range(27)]
+FLOW_AGE_COLS = [f"{g}{a:02d}" for g in "mf" for a in (0, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70)]
+FLOW_COLS = ["id", "x", "y", "type", "timezn_cd", *FLOW_AGE_COLS, "total", "admi_cd", "etl_ymd"]
+
+SIC_CODES = [
+    ("I5611", "숙박 및 음식점업(55~56)", "음식점 및 주점업", "음식점업", "한식 음식점업"),
+    ("I5621", "숙박 및 음식점업(55~56)", "음식점 및 주점업", "주점 및 비알코올 음료점업", "주점업"),
+    ("I5510", "숙박 및 음식점업(55~56)", "숙박업", "일반 및 생활 숙박시설 운영업", "여관업"),
+    ("G4744", "도매 및 소매업(45~47)", "소매업; 자동차 제외", "섬유, 의복, 신발 및 가죽제품 소매업", "가방 및 기타 가죽제품 소매업"),
+    ("G4785", "도매 및 소매업(45~47)", "소매업; 자동차 제외", "기타 상품 전문 소매업", "그 외 기타 상품 전문 소매업"),
+    ("G4653", "도매 및 소매업(45~47)", "도매 및 상품 중개업", "기계장비 및 관련 물품 도매업", "컴퓨터 및 주변장치 도매업"),
+    ("S9691", "협회 및 단체, 수리 및 기타 개인 서비스업(94~96)", "기타 개인 서비스업", "그 외 기타 개인 서비스업", "세탁업"),
+    ("S9612", "협회 및 단체, 수리 및 기타 개인 서비스업(94~96)", "기타 개인 서비스업", "미용, 욕탕 및 유사 서비스업", "욕탕업"),
+    ("A0322", "농업, 임업 및 어업(01~03)", "어업", "양식어업 및 어업관련 서비스업", "어업 관련 서비스업"),
+]
+LOCAL_PAY_TYPES = ["음식점", "카페/베이커리", "의료/보건", "가전/통신", "학원/교육", "마트/편의점", "기타"]
+
+
+# -----------------------------------------------------------
+# 📚 실제 매핑에서 표본 추출
+# -----------------------------------------------------------
+def _load_json(name: str):
+    with open(os.path.join(JSON_DIR, name), encoding="utf-8") as f:
+        data = json.load(f)
+    return json.loads(data) if isinstance(data, str) else data
+
+
+def grid_id_pool() -> np.ndarray:
+    """매핑 JSON 들에 등장하는 유효 grid_id (int32, 정렬)"""
+    ids = [compact_grid_mapping(_load_json(name)).to_numpy()
+           for name in ("pop_grid_id.json", "local_grid_id.json", "wifi_grid_id.json")]
+    return np.unique(np.concatenate(ids)).astype(np.int32)
+
+
+def address_pool() -> pd.DataFrame:
+    """
+    addr_id_map 의 키("도로명/법정동코드-[S]본번[-부번]")를 tb_gmc_* 주소 컬럼으로 분해합니다.
+    pop_grid_id 로 격자가 정해지는 주소만 사용합니다.
+    """
+    addr_id_map = _load_json("addr_id_map.json")
+    pop_grid_id = compact_grid_mapping(_load_json("pop_grid_id.json"))
+    rows = []
+    for key, name in addr_id_map.items():
+        if name not in pop_grid_id.index or "-" not in key:
+            continue
+        code, main, *sub = key.split("-")
+        san = "2" if main.startswith("S") else "1"
+        main = main.lstrip("S")
+        if not (code.isdigit() and main.isdigit()):
+            continue
+        rows.append({
+            "rd_code": code if len(code) == 12 else None,
+            "regn_code": code if len(code) != 12 else None,
+            "san": san,
+            "orgno": int(main),
+            "subno": int(sub[0]) if sub and sub[0].isdigit() else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def _jumin_sids(rng: np.random.Generator, n: int, start: int = 0) -> np.ndarray:
+    """앞 6자리 생년월일 + 성별 1자리 + 일련번호 6자리 (중복 없는 13자리 문자열)"""
+    yy = rng.integers(0, 100, n)
+    mm = rng.integers(1, 13, n)
+    dd = rng.integers(1, 29, n)
+    gender = np.where(yy < 25, rng.integers(3, 5, n), rng.integers(1, 3, n))
+    serial = np.arange(start, start + n) % 1_000_000
+    return np.array([f"{a:02d}{b:02d}{c:02d}{g}{s:06d}" for a, b, c, g, s in zip(yy, mm, dd, gender, serial)])
+
+
+# -----------------------------------------------------------
+# 🚶 유동인구 flow_age_time 파일
+# -----------------------------------------------------------
+def gen_flowpop_file(out_dir: str, ym: str, n_rows: int, seed: int = 0, chunk: int = 500_000) -> str:
+    """
+    yeosoo_flow_age_time_<ym>.csv 를 생성합니다. (원본과 같은 36개 컬럼, '|' 구분)
+    격자 × type(1, 2) × 시간대(0~23) × 일자 조합에서 n_rows 행을 뽑고, 연령/성별 값은 0.01 단위의 희소한 값입니다.
+    """
+    rng = np.random.default_rng(seed)
+    grids = grid_id_pool()
+    admi = rng.choice(ADMI_CODES, len(grids))
+    start = datetime.strptime(ym, "%Y%m").date()
+    days = ((start.replace(day=28) + timedelta(days=4)).replace(day=1) - start).days
+
+    path = os.path.join(out_dir, f"yeosoo_flow_age_time_{ym}.csv")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("|".join(FLOW_COLS) + "\n")
+        for lo in range(0, n_rows, chunk):
+            n = min(chunk, n_rows - lo)
+            g = rng.integers(0, len(grids), n)
+            ages = np.round(rng.binomial(3, 0.08, (n, len(FLOW_AGE_COLS))) * 0.01 * rng.integers(1, 4, (n, 1)), 2)
+            df = pd.DataFrame(ages, columns=FLOW_AGE_COLS)
+            df.insert(0, "id", grids[g])
+            df.insert(1, "x", np.round(rng.uniform(950_000, 1_030_000, n), 3))
+            df.insert(2, "y", np.round(rng.uniform(1_640_000, 1_680_000, n), 3))
+            df.insert(3, "type", rng.integers(1, 3, n))
+            df.insert(4, "timezn_cd", rng.integers(0, 24, n))
+            df["total"] = np.round(ages.sum(axis=1), 2)
+            df["admi_cd"] = admi[g]
+            df["etl_ymd"] = [f"{ym}{d:02d}" for d in rng.integers(1, days + 1, n)]
+            df.to_csv(f, sep="|", header=False, index=False)
+    return path
+
+
+# -----------------------------------------------------------
+# 🏠 주민등록 tb_gmc_* 테이블
+# -----------------------------------------------------------
+GMC_DDL = """
+DROP TABLE IF EXISTS tb_gmc_hshldr_info, tb_gmc_fmbr_info, tb_gmc_mvin_info, tb_gmc_mvout_info;
+CREATE TABLE tb_gmc_hshldr_info (
+    jumin_head_sid      varchar(13),
+    jumin_head_sid_sno  varchar(20),
+    jumin_state_code    varchar(2),
+    jumin_regn_code     varchar(10),
+    jumin_rd_code       varchar(12),
+    jumin_san           varchar(1),
+    jumin_bdng_orgno    integer,
+    jumin_bdng_subno    integer,
+    jumin_inport_ymd    varchar(8),
+    data_crtr_dt        date
+);
+CREATE TABLE tb_gmc_fmbr_info (
+    jumin_sid           varchar(13),
+    jumin_head_sid      varchar(13),
+    jumin_state_code    varchar(2),
+    data_crtr_dt        date
+);
+CREATE TABLE tb_gmc_mvin_info (
+    jumin_sid             varchar(13),
+    jumin_inr_rd_code     varchar(12),
+    jumin_inr_regn_code   varchar(10),
+    jumin_inr_bdng_orgno  integer,
+    jumin_inr_bdng_subno  integer,
+    jumin_inr_san         varchar(1),
+    data_crtr_dt          date
+);
+CREATE TABLE tb_gmc_mvout_info (
+    jumin_sid             varchar(13),
+    jumin_inr_rd_code     varchar(12),
+    jumin_exr_rd_code     varchar(12),
+    jumin_exr_regn_code   varchar(10),
+    jumin_exr_bdng_orgno  integer,
+    jumin_exr_bdng_subno  integer,
+    jumin_exr_san         varchar(1),
+    data_crtr_dt          date
+);
+"""
+
+
+def copy_frame(conn, df: pd.DataFrame, table: str):
+    """DataFrame 을 psycopg2 COPY 로 적재합니다. (NaN/None → NULL)"""
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cur = conn.cursor()
+    cur.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT CSV)", buf)
+    cur.close()
+
+
+def _address_columns(addrs: pd.DataFrame, idx: np.ndarray, prefix: str, unmatched: np.ndarray) -> dict:
+    """주소 표본을 tb_gmc_* 주소 컬럼으로 펼칩니다. unmatched 행은 매핑되지 않는 본번으로 바꿉니다."""
+    picked = addrs.iloc[idx].reset_index(drop=True)
+    orgno = picked["orgno"].astype("Int64").to_numpy(dtype=object)
+    orgno[unmatched] = 99999
+    return {
+        f"{prefix}rd_code": picked["rd_code"].to_numpy(),
+        f"{prefix}regn_code": picked["regn_code"].to_numpy(),
+        f"{prefix}bdng_orgno": orgno,
+        f"{prefix}bdng_subno": picked["subno"].astype("Int64").to_numpy(dtype=object),
+        f"{prefix}san": picked["san"].to_numpy(),
+    }
+
+
+def gen_resident_tables(conn, n_households: int, seed: int = 0, snapshots: int = 1,
+                        move_ratio: float = 0.05, unmatched_ratio: float = 0.03):
+    """
+    tb_gmc_hshldr_info / fmbr_info / mvin_info / mvout_info 를 생성합니다.
+
+    Parameters
+    ----------
+    n_households : int
+        스냅샷 하나의 세대 수 (세대원은 세대당 1~6명)
+    snapshots : int
+        data_crtr_dt 스냅샷 개수 (월말 기준, 최신이 마지막)
+    move_ratio : float
+        세대원 대비 전입/전출 건수 비율
+    unmatched_ratio : float
+        주소 매핑이 실패하도록 만드는 비율
+    """
+    rng = np.random.default_rng(seed)
+    addrs = address_pool()
+    cur = conn.cursor()
+    cur.execute(GMC_DDL)
+
+    today = date.today().replace(day=1)
+    for k in range(snapshots):
+        crtr_dt = today - timedelta(days=30 * (snapshots - 1 - k) + 1)
+        heads = _jumin_sids(rng, n_households, start=k)
+        unmatched = rng.random(n_households) < unmatched_ratio
+        hshldr = pd.DataFrame({
+            "jumin_head_sid": heads,
+            "jumin_head_sid_sno": np.arange(n_households),
+            "jumin_state_code": rng.choice(["10", "13", "43", "20"], n_households, p=[0.85, 0.05, 0.05, 0.05]),
+            **_address_columns(addrs, rng.integers(0, len(addrs), n_households), "jumin_", unmatched),
+            "jumin_inport_ymd": [f"{y}{m:02d}01" for y, m in zip(rng.integers(1990, 2025, n_households),
+                                                                  rng.integers(1, 13, n_households))],
+            "data_crtr_dt": crtr_dt,
+        })
+        copy_frame(conn, hshldr, "tb_gmc_hshldr_info")
+
+        members = rng.integers(1, 7, n_households)
+        n_members = int(members.sum())
+        fmbr = pd.DataFrame({
+            "jumin_sid": _jumin_sids(rng, n_members, start=n_households + k),
+            "jumin_head_sid": np.repeat(heads, members),
+            "jumin_state_code": rng.choice(["10", "13", "43", "20"], n_members, p=[0.85, 0.05, 0.05, 0.05]),
+            "data_crtr_dt": crtr_dt,
+        })
+        copy_frame(conn, fmbr, "tb_gmc_fmbr_info")
+
+        n_moves = max(int(n_members * move_ratio), 1)
+        for table, prefix in (("tb_gmc_mvin_info", "jumin_inr_"), ("tb_gmc_mvout_info", "jumin_exr_")):
+            unmatched = rng.random(n_moves) < unmatched_ratio
+            moves = pd.DataFrame({
+                "jumin_sid": _jumin_sids(rng, n_moves, start=k),
+                **_address_columns(addrs, rng.integers(0, len(addrs), n_moves), prefix, unmatched),
+                "data_crtr_dt": crtr_dt,
+            })
+            if table == "tb_gmc_mvout_info":
+                moves["jumin_inr_rd_code"] = moves["jumin_exr_rd_code"]
+            copy_frame(conn, moves, table)
+
+    conn.commit()
+    cur.close()
+    return {"households": n_households * snapshots}
+
+
+# -----------------------------------------------------------
+# 🏪 KCB / 업종코드 / 지역화폐 파일
+# -----------------------------------------------------------
+def gen_kcb_files(out_dir: str, n_rows: int, seed: int = 0, months: int = 12) -> tuple[str, str]:
+    """YEOSU_SOHO_STAT_*.txt 와 YEOSU_IND_CODE.txt ('|' 구분) 를 생성합니다."""
+    rng = np.random.default_rng(seed)
+    grids = grid_id_pool()
+    end = date.today().replace(day=1)
+    yms = [(end - timedelta(days=31 * i)).strftime("%Y%m") for i in range(months)][::-1]
+
+    ind = pd.DataFrame(SIC_CODES, columns=["SIC_CD", "SIC_FST_CLSFY_ITM_NM", "SIC_SCND_CLSFY_ITM_NM",
+                                           "SIC_TRD_CLSFY_ITM_NM", "SIC_FOUR_CLSFY_ITM_NM"])
+    ind_path = os.path.join(out_dir, "YEOSU_IND_CODE.txt")
+    ind.to_csv(ind_path, sep="|", index=False)
+
+    shop = rng.integers(1, 4, n_rows)
+    kcb = pd.DataFrame({
+        "QID50": rng.choice(grids, n_rows),
+        "BS_YR_MON": rng.choice(yms, n_rows),
+        "SIC_CD_LV4": rng.choice(ind["SIC_CD"], n_rows),
+        "WGS84_X": np.round(rng.uniform(127.4, 127.8, n_rows), 6),
+        "WGS84_Y": np.round(rng.uniform(34.6, 35.0, n_rows), 6),
+        "UTMK_X": np.round(rng.uniform(950_000, 1_030_000, n_rows), 3),
+        "UTML_Y": np.round(rng.uniform(1_640_000, 1_680_000, n_rows), 3),
+        "SHOP_CNT": shop,
+        "OP_CNT": shop,
+        "NEW_OPN_CNT": rng.binomial(1, 0.05, n_rows),
+        "RUN_OUT_CNT": rng.binomial(1, 0.04, n_rows),
+        "RUN_OUT2_CNT": rng.binomial(1, 0.02, n_rows),
+        "TOT_SALE_AMT": rng.gamma(1.2, 1500, n_rows).astype(int),
+        **{f"TOT_SALES_AMT{i}_CNT": rng.binomial(1, 0.3, n_rows) for i in range(6)},
+    })
+    kcb_path = os.path.join(out_dir, f"YEOSU_SOHO_STAT_{yms[0]}-{yms[-1]}.txt")
+    kcb.to_csv(kcb_path, sep="|", index=False)
+    return kcb_path, ind_path
+
+
+def gen_local_pay_file(out_dir: str, n_rows: int, seed: int = 0, months: int = 9) -> str:
+    """local_pay_*.csv (원본과 같은 한글 컬럼) 를 생성합니다. 가맹점명은 local_grid_id 에서 뽑습니다."""
+    rng = np.random.default_rng(seed)
+    merchants = np.array(list(_load_json("local_grid_id.json")))
+    end = date.today().replace(day=1)
+    start = end - timedelta(days=31 * months)
+    pay_days = pd.to_datetime(start) + pd.to_timedelta(rng.integers(0, (end - start).days, n_rows), unit="D")
+    members = rng.integers(0, max(n_rows // 20, 1), n_rows)
+    birth_y = 1940 + members % 65
+
+    df = pd.DataFrame({
+        "번호": np.arange(1, n_rows + 1),
+        "회원ID": 1_000_000 + members,
+        "성별": np.where(members % 2, "남", "여"),
+        "생년월일": [f"{y}{m:02d}{d:02d}" for y, m, d in zip(birth_y, members % 12 + 1, members % 28 + 1)],
+        "거주지주소": rng.choice(["전라남도여수시", "전라남도순천시", "경기도시흥시"], n_rows, p=[0.9, 0.07, 0.03]),
+        "가맹점명": rng.choice(merchants, n_rows),
+        "업종": rng.choice(LOCAL_PAY_TYPES, n_rows),
+        "결제년월일": pay_days.strftime("%Y-%m-%d"),
+        "가맹점주소": "전라남도 여수시",
+        "결제금액": (rng.gamma(1.5, 15_000, n_rows) // 100 * 100).astype(int),
+    })
+    path = os.path.join(out_dir, f"local_pay_{start:%Y%m}_{end:%m}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+# -----------------------------------------------------------
+# 📶 와이파이 ap.log_summary_rukus
+# -----------------------------------------------------------
+def gen_wifi_logs(conn, days: int, seed: int = 0, end: datetime | None = None) -> tuple[datetime, datetime]:
+    """
+    ap.log_summary_rukus(std_date, ap_id, cnt) 에 AP × 1시간 로그를 days 일치 생성합니다.
+    접속 수는 시간대(주간 높음)와 요일(주말 높음)에 따라 달라지는 포아송 값입니다.
+
+    Returns
+    -------
+    (datetime, datetime)
+        생성 구간 [start, end)
+    """
+    rng = np.random.default_rng(seed)
+    aps = np.array(list(_load_json("wifi_grid_id.json")))
+    end = (end or datetime.now()).replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    hours = pd.date_range(start, end, freq="h", inclusive="left")
+
+    base = rng.gamma(2.0, 3.0, len(aps))
+    diurnal = 0.3 + np.sin(np.pi * np.clip((hours.hour.to_numpy() - 6) / 16, 0, 1))
+    weekend = np.where(hours.dayofweek.to_numpy() >= 4, 1.3, 1.0)
+    lam = np.outer(diurnal * weekend, base)
+
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE SCHEMA IF NOT EXISTS ap;
+    DROP TABLE IF EXISTS ap.log_summary_rukus;
+    CREATE TABLE ap.log_summary_rukus (std_date timestamp, ap_id varchar(64), cnt integer);
+    """)
+    df = pd.DataFrame({
+        "std_date": np.repeat(hours.to_numpy(), len(aps)),
+        "ap_id": np.tile(aps, len(hours)),
+        "cnt": rng.poisson(lam).ravel(),
+    })
+    copy_frame(conn, df[df["cnt"] > 0], "ap.log_summary_rukus")
+    cur.execute("CREATE INDEX ON ap.log_summary_rukus (std_date)")
+    conn.commit()
+    cur.close()
+    return start, end
@@ -1,11 +1,15 @@
 import csv
+import io
 import argparse
 import sys
 import os
 import tempfile
 import glob
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from utils import setup_logger, get_engine_from_env, get_src_dir
+from utils import (setup_logger, get_engine_from_env, get_src_dir, stage, grid_id_sql_type, get_grid_lattice,
+                   profiled_execute)
 
 # -----------------------------------------------------------
 # ⚙️ 안전한 변환 함수
@@ -56,7 +60,7 @@ def ensure_parent_table(cur):
     # 2) 부모 테이블 생성
     create_sql = """
     CREATE TABLE IF NOT EXISTS public.tb_flowpop (
-        id           bpchar(8),
+        id           {grid_type},
         "type"       varchar(20),
         timezn_cd    varchar(10),
         m10 float8,
@@ -78,7 +82,7 @@ def ensure_parent_table(cur):
         etl_ymd date NOT NULL
     )
     PARTITION BY RANGE (etl_ymd);
-    """
+    """.format(grid_type=grid_id_sql_type())
 
     cur.execute(create_sql)
     logger.info("🎉 부모 테이블 tb_flowpop 생성 완료")    
@@ -86,8 +90,8 @@ def ensure_parent_table(cur):
 # -----------------------------------------------------------
 # 📅 월별 파티션 자동 생성 함수
 # -----------------------------------------------------------
-def ensure_partition(cur, etl_ymd_str):
-    """etl_ymd 값(YYYYMMDD 또는 YYYY-MM-DD)을 기준으로 월별 파티션 생성"""
+def partition_bounds(etl_ymd_str):
+    """etl_ymd 값(YYYYMMDD, YYYY-MM-DD, YYYYMM)이 속한 월의 (시작일, 다음 달 시작일)"""
     # 입력 문자열 정규화
     etl_ymd_str = etl_ymd_str.strip()
 
@@ -104,19 +108,286 @@ def ensure_partition(cur, etl_ymd_str):
 
     start = ymd.replace(day=1)
     next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, next_month
+
+
+def ensure_partition(cur, etl_ymd_str, parent="tb_flowpop"):
+    """
+    etl_ymd 값(YYYYMMDD 또는 YYYY-MM-DD)을 기준으로 월별 파티션 생성
+    parent 는 tb_flowpop(wide) 또는 tb_flowpop_compact(compact) 입니다.
+    """
+    start, next_month = partition_bounds(etl_ymd_str)
 
-    partition_name = f"public.tb_flowpop_{start.strftime('%Y%m')}"
+    partition_name = f"public.{parent}_{start.strftime('%Y%m')}"
     sql = f"""
     CREATE TABLE IF NOT EXISTS {partition_name}
-        PARTITION OF public.tb_flowpop
+        PARTITION OF public.{parent}
         FOR VALUES FROM ('{start}') TO ('{next_month}');
-    CREATE INDEX IF NOT EXISTS idx_tb_flowpop_{start.strftime('%Y%m')}_timezn_ymd
+    CREATE INDEX IF NOT EXISTS idx_{parent}_{start.strftime('%Y%m')}_timezn_ymd
         ON {partition_name} (etl_ymd, timezn_cd, id);
     """
     cur.execute(sql)
     logger.info(f"📦 파티션 확인/생성 완료: {partition_name}")
     return partition_name
 
+# -----------------------------------------------------------
+# 🧾 월 적재 버전 (조회 캐시 무효화용)
+# -----------------------------------------------------------
+# 월 파티션 / 집계 / 롤업이 바뀔 때마다 해당 월의 version 을 올립니다.
+# flowpop_api 의 조회 캐시는 이 값을 주기적으로 읽어 바뀐 월의 캐시만 비웁니다.
+LOAD_LOG_TABLE = "tb_flowpop_load_log"
+CREATE_LOAD_LOG = f"""
+CREATE TABLE IF NOT EXISTS public.{LOAD_LOG_TABLE} (
+    crtr_ym    varchar(6) PRIMARY KEY,
+    version    bigint NOT NULL,
+    step       varchar(20),
+    loaded_at  timestamp NOT NULL DEFAULT now()
+);
+"""
+
+
+def mark_month_loaded(cur, ym, step):
+    """
+    ym(YYYYMM) 월 데이터가 바뀌었음을 기록합니다. (version + 1)
+    cur 의 트랜잭션과 함께 커밋되므로 적재/집계와 같은 트랜잭션에서 호출합니다.
+    """
+    cur.execute(CREATE_LOAD_LOG)
+    cur.execute(f"""
+    INSERT INTO public.{LOAD_LOG_TABLE} (crtr_ym, version, step, loaded_at)
+    VALUES (%s, 1, %s, now())
+    ON CONFLICT (crtr_ym) DO UPDATE
+        SET version = public.{LOAD_LOG_TABLE}.version + 1, step = EXCLUDED.step, loaded_at = now();
+    """, (ym, step))
+
+# -----------------------------------------------------------
+# 🗜️ compact 레이아웃 (월 파티션 생성 시 선택)
+# -----------------------------------------------------------
+# wide    : tb_flowpop_YYYYMM 파티션에 성/연령 14개 float8 컬럼 + admi_cd 를 행마다 저장 (기존 방식)
+# compact : tb_flowpop_compact_YYYYMM 에 (격자, 일자, 시간대, 유형) 당 real[14] 벡터 하나만 저장하고,
+#           격자마다 같은 값이 반복되던 admi_cd 는 격자 차원 테이블 tb_flowpop_grid 로 분리합니다.
+#           같은 이름 tb_flowpop_YYYYMM 은 기존 컬럼 모양의 호환 뷰가 되므로
+#           run_sql_aggregations / run_rollups 등 월 파티션을 읽는 SQL 은 그대로 동작합니다.
+# 이미 만들어진 월은 기존 레이아웃을 유지하며, wide 월은 compact_partition 으로 전환합니다.
+FLOWPOP_LAYOUT = os.getenv("FLOWPOP_LAYOUT", "wide")
+FLOWPOP_BANDS = [
+    "m10", "m20", "m30", "m40", "m50", "m60", "m70",
+    "f10", "f20", "f30", "f40", "f50", "f60", "f70",
+]
+WIDE_COLUMNS = ["id", "type", "timezn_cd", *FLOWPOP_BANDS, "total", "admi_cd", "etl_ymd"]
+COMPACT_COLUMNS = ["id", "etl_ymd", "timezn_cd", "type", "total", "pop"]
+
+CREATE_COMPACT_PARENT = """
+CREATE TABLE IF NOT EXISTS public.tb_flowpop_compact (
+    id          integer NOT NULL,
+    etl_ymd     date NOT NULL,
+    timezn_cd   varchar(10),    -- wide 와 같은 원본 코드 문자열 ('08' 등, 숫자 변환 시 앞자리 0 이 사라짐)
+    "type"      varchar(20),
+    total       real,
+    pop         real[]      -- FLOWPOP_BANDS 순서 (m10..m70, f10..f70)
+)
+PARTITION BY RANGE (etl_ymd);
+
+CREATE TABLE IF NOT EXISTS public.tb_flowpop_grid (
+    id          integer PRIMARY KEY,
+    admi_cd     varchar(20)
+);
+"""
+
+
+def flowpop_layout(layout=None) -> str:
+    """레이아웃 이름("wide" | "compact")을 검증해 반환합니다. 없으면 FLOWPOP_LAYOUT 환경변수 값입니다."""
+    layout = (layout or FLOWPOP_LAYOUT).strip().lower()
+    if layout not in ("wide", "compact"):
+        raise ValueError(f"FLOWPOP_LAYOUT 은 wide 또는 compact 여야 합니다: {layout!r}")
+    return layout
+
+
+def partition_layout(cur, etl_ymd_str, layout=None) -> str:
+    """
+    etl_ymd 가 속한 월의 레이아웃을 반환합니다.
+    이미 적재된 월은 기존 레이아웃을 따르고, 처음 만드는 월만 layout(기본 FLOWPOP_LAYOUT)을 사용합니다.
+    """
+    requested = flowpop_layout(layout)
+    suffix = partition_bounds(etl_ymd_str)[0].strftime('%Y%m')
+
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.tb_flowpop_compact_{suffix}",))
+    if cur.fetchone()[0]:
+        current = "compact"
+    else:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (f"public.tb_flowpop_{suffix}",))
+        row = cur.fetchone()
+        current = "wide" if row else None
+        if row and row[0] == "v":
+            # 이전 버전의 병렬 적재 실패로 compact 파티션 없이 남은 호환 뷰
+            logger.warning(f"⚠ compact 파티션 없는 호환 뷰 public.tb_flowpop_{suffix} 삭제")
+            cur.execute(f"DROP VIEW public.tb_flowpop_{suffix};")
+            current = None
+
+    if current is None:
+        return requested
+    if current != requested:
+        logger.info(f"ℹ️ {suffix} 월은 이미 {current} 레이아웃으로 존재 → {current} 유지 (요청: {requested})")
+    return current
+
+
+def compact_select_sql(source, id_type) -> str:
+    """
+    compact 테이블(source)을 wide 컬럼 모양(WIDE_COLUMNS)으로 펼치는 SELECT 문.
+    admi_cd 는 tb_flowpop_grid 와 LEFT JOIN 하며, PK 조인이라 admi_cd 를 쓰지 않는 쿼리에서는 조인이 제거됩니다.
+    timezn_cd / type 은 compact 에도 문자열로 저장되므로 varchar 캐스트는 타입 표기만 맞추는 무손실 변환입니다.
+    """
+    id_expr = "c.id" if id_type == "integer" else f"c.id::text::{id_type}"
+    bands = ",\n        ".join(
+        f"c.pop[{i}]::float8 AS {band}" for i, band in enumerate(FLOWPOP_BANDS, start=1)
+    )
+    return f"""
+    SELECT
+        {id_expr} AS id,
+        c."type"::varchar(20) AS "type",
+        c.timezn_cd::varchar(10) AS timezn_cd,
+        {bands},
+        c.total::float8 AS total,
+        g.admi_cd,
+        c.etl_ymd
+    FROM {source} c
+    LEFT JOIN public.tb_flowpop_grid g ON g.id = c.id
+    """
+
+
+def wide_id_type(cur) -> str:
+    """부모 tb_flowpop 의 id 컬럼 타입 (호환 뷰가 같은 타입으로 id 를 내보내도록)"""
+    cur.execute("""
+        SELECT format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = 'public.tb_flowpop'::regclass AND attname = 'id'
+    """)
+    return cur.fetchone()[0]
+
+
+def ensure_compact_parent(cur):
+    """
+    compact 부모 테이블 / 격자 차원 테이블과 전체 월 호환 뷰 v_tb_flowpop 을 만듭니다.
+    (ensure_parent_table 이후에 호출)
+    """
+    cur.execute(CREATE_COMPACT_PARENT)
+    # 뷰 재생성은 AccessExclusive 잠금이라 조회 중인 대시보드를 기다리게 되므로 없을 때만 만듭니다.
+    cur.execute("SELECT to_regclass('public.v_tb_flowpop') IS NOT NULL")
+    if cur.fetchone()[0]:
+        return
+    wide_cols = ", ".join(WIDE_COLUMNS)
+    cur.execute(f"""
+    CREATE VIEW public.v_tb_flowpop AS
+    SELECT {wide_cols} FROM public.tb_flowpop
+    UNION ALL
+    {compact_select_sql("public.tb_flowpop_compact", wide_id_type(cur))};
+    """)
+    logger.info("🎉 전체 월 호환 뷰 v_tb_flowpop 생성 완료")
+
+
+def ensure_compat_view(cur, etl_ymd_str):
+    """
+    compact 월의 호환 뷰 public.tb_flowpop_YYYYMM 을 만듭니다.
+    월 파티션 대신 compact 부모를 월 범위로 읽으므로 파티션 생성(ATTACH) 전에 만들어도 됩니다.
+    """
+    start, next_month = partition_bounds(etl_ymd_str)
+    view_name = f"public.tb_flowpop_{start.strftime('%Y%m')}"
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (view_name,))
+    if cur.fetchone()[0]:
+        return view_name
+    cur.execute(f"""
+    CREATE VIEW {view_name} AS
+    {compact_select_sql("public.tb_flowpop_compact", wide_id_type(cur))}
+    WHERE c.etl_ymd >= '{start}' AND c.etl_ymd < '{next_month}';
+    """)
+    logger.info(f"🪟 호환 뷰 생성 완료: {view_name}")
+    return view_name
+
+
+def pack_bands(row) -> str:
+    """성/연령 14개 값을 real[] 배열 리터럴('{...}')로 묶습니다. 빈 값은 NULL 입니다."""
+    return "{" + ",".join(
+        "NULL" if row[c] in ("", None) else str(row[c]) for c in FLOWPOP_BANDS
+    ) + "}"
+
+
+def upsert_grid_dim(cur, grid_admi):
+    """
+    {grid_id: admi_cd} 를 tb_flowpop_grid 에 반영합니다. (같은 격자는 최근 적재 값으로 갱신)
+    """
+    buf = io.StringIO()
+    csv.writer(buf).writerows(grid_admi.items())
+    buf.seek(0)
+
+    cur.execute("""
+    CREATE TEMP TABLE tmp_flowpop_grid (id integer, admi_cd varchar(20)) ON COMMIT DROP;
+    """)
+    cur.copy_expert("COPY tmp_flowpop_grid (id, admi_cd) FROM STDIN WITH (FORMAT CSV)", buf)
+    cur.execute("""
+    INSERT INTO public.tb_flowpop_grid (id, admi_cd)
+    SELECT id, admi_cd FROM tmp_flowpop_grid
+    ON CONFLICT (id) DO UPDATE SET admi_cd = EXCLUDED.admi_cd
+    WHERE public.tb_flowpop_grid.admi_cd IS DISTINCT FROM EXCLUDED.admi_cd;
+    """)
+    logger.info(f"🧭 격자 차원 반영: {len(grid_admi):,}개 격자 (변경 {cur.rowcount:,}건)")
+
+
+def compact_partition(ym, engine):
+    """
+    이미 wide 로 적재된 ym 월 파티션을 compact 레이아웃으로 전환합니다.
+
+    한 트랜잭션에서 격자 차원 반영 → compact 파티션 생성/복사 → wide 파티션 삭제 → 호환 뷰 생성을 수행하므로
+    조회 쪽에는 전환 전/후 중 하나만 보입니다.
+    """
+    suffix = datetime.strptime(ym, "%Y%m").strftime("%Y%m")
+    wide_name = f"public.tb_flowpop_{suffix}"
+    bands = ", ".join(FLOWPOP_BANDS)
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if partition_layout(cur, ym, "wide") == "compact":
+            logger.info(f"✔ {suffix} 월은 이미 compact 레이아웃")
+            return
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (wide_name,))
+        if not cur.fetchone()[0]:
+            raise ValueError(f"전환할 wide 파티션이 없습니다: {wide_name}")
+
+        with stage("compact_partition", logger, ym=ym) as rec:
+            ensure_compact_parent(cur)
+            # 격자별로 가장 많이 나온 admi_cd 를 차원 값으로 사용
+            cur.execute(f"""
+            INSERT INTO public.tb_flowpop_grid (id, admi_cd)
+            SELECT DISTINCT ON (id) id::integer, admi_cd
+            FROM (
+                SELECT id, admi_cd, COUNT(*) AS cnt
+                FROM {wide_name}
+                WHERE id IS NOT NULL
+                GROUP BY id, admi_cd
+            ) t
+            ORDER BY id, cnt DESC
+            ON CONFLICT (id) DO UPDATE SET admi_cd = EXCLUDED.admi_cd;
+            """)
+            compact_name = ensure_partition(cur, ym, parent="tb_flowpop_compact")
+            cur.execute(f"""
+            INSERT INTO {compact_name} ({', '.join(COMPACT_COLUMNS)})
+            SELECT id::integer, etl_ymd, timezn_cd, "type", total::real,
+                   ARRAY[{bands}]::real[]
+            FROM {wide_name};
+            """)
+            rows = cur.rowcount
+            cur.execute(f"DROP TABLE {wide_name};")
+            ensure_compat_view(cur, ym)
+            mark_month_loaded(cur, suffix, "compact")
+            raw.commit()
+            rec.set_rows(rows_out=rows)
+        logger.info(f"🗜️ {wide_name} → {compact_name} 전환 완료 ({rows:,}행)")
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        cur.close()
+        raw.close()
+
 # -------------------------------------------------------------------
 # 🔧 집계 테이블 자동 생성 공통 함수
 # -------------------------------------------------------------------
@@ -191,6 +462,10 @@ CREATE TABLE public.tb_flowpop_agg_daily (
 # -----------------------------------------------------------
 
 def run_sql_aggregations(ym, engine):
+    """
+    ym 월 유동인구를 성/연령, 시간대, 요일, 일자별 집계 테이블에 적재합니다.
+    compact 월은 같은 이름의 호환 뷰(tb_flowpop_YYYYMM)를 읽으며, 뷰가 real[] 원소 접근으로 펼쳐지므로 SQL 은 동일합니다.
+    """
     # 집계 테이블 자동 생성
     ensure_table_exists(engine, "tb_flowpop_agg_agegen", CREATE_AGG_AGEGEN)
     ensure_table_exists(engine, "tb_flowpop_agg_timezn", CREATE_AGG_WEEKDAY)
@@ -286,9 +561,12 @@ def run_sql_aggregations(ym, engine):
 
         for name, query in sql_dict.items():
             logger.info(f"▶ [집계 실행 시작] {name}")
-            cur.execute(query)
+            with stage("aggregate", logger, table=name, ym=ym) as rec:
+                profiled_execute(cur, f"flowpop.{name}", query, ym=ym)
+                rec.set_rows(rows_out=cur.rowcount)
             logger.info(f"✔ [집계 실행 완료] {name}")
 
+        mark_month_loaded(cur, ym, "aggregate")
         raw.commit()
         logger.info(f"📊 전체 SQL 집계 테이블 생성 완료: {ym}")
 
@@ -302,117 +580,574 @@ def run_sql_aggregations(ym, engine):
         raw.close()
 
 # -----------------------------------------------------------
-# 🚀 메인 ETL 로직
+# 🗺️ 지도 조회용 다중 해상도 롤업 (250m / 1km / 행정동)
 # -----------------------------------------------------------
-def load_flowpop(input_file):
-    logger.info(f"시작: {input_file} 파일을 PostgreSQL로 적재합니다.")
+# 50m 격자 × 일자 원본 대신 줌 레벨에 맞는 작은 테이블을 읽도록
+# 월 단위로 (상위 격자 | 행정동) × 시간대 × type 합계를 미리 만들어 둡니다.
+ROLLUP_MEASURES = [
+    "m10", "m20", "m30", "m40", "m50", "m60", "m70",
+    "f10", "f20", "f30", "f40", "f50", "f60", "f70",
+    "total",
+]
+
+# (테이블명, 셀 크기[m]) - 작은 해상도부터 나열하면 상위 단계는 직전 단계 결과에서 집계합니다.
+ROLLUP_GRID_LEVELS = [
+    ("tb_flowpop_rollup_250m", 250),
+    ("tb_flowpop_rollup_1km", 1000),
+]
+ROLLUP_ADMI_TABLE = "tb_flowpop_rollup_admi"
+
+
+def create_rollup_sql(table_name: str, key_col: str, key_type: str) -> str:
+    measures = ",\n        ".join(f"{c} float8" for c in ROLLUP_MEASURES)
+    return f"""
+    CREATE TABLE IF NOT EXISTS public.{table_name} (
+        crtr_ym      varchar(6) NOT NULL,
+        {key_col}    {key_type},
+        timezn_cd    varchar(10),
+        "type"       varchar(20),
+        {measures}
+    );
+    CREATE INDEX IF NOT EXISTS idx_{table_name}_ym_key
+        ON public.{table_name} (crtr_ym, {key_col}, timezn_cd);
+    """
+
+
+def month_range(ym: str):
+    """YYYYMM → (월 시작일, 다음 달 시작일) 문자열"""
+    start_date = datetime.strptime(ym, "%Y%m").date()
+    next_date = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start_date.strftime("%Y-%m-%d"), next_date.strftime("%Y-%m-%d")
+
 
-    engine = get_engine_from_env()
+def load_rollup_lattice(required: bool = False):
+    """
+    롤업용 격자 규칙을 로드합니다.
+    grid_lattice.json 도 없고 격자 레이어(get_grid_paths)로 새로 만들 수도 없으면
+    required=False 일 때 경고만 남기고 None 을 반환합니다.
+    """
+    try:
+        return get_grid_lattice()
+    except (FileNotFoundError, ImportError, ValueError) as e:
+        if required:
+            raise
+        logger.warning(f"⚠️ 격자 규칙을 만들 수 없어 롤업을 건너뜁니다: {e}")
+        return None
+
+
+def run_rollups(ym, engine, lattice=None, required: bool = False) -> bool:
+    """
+    ym 월의 유동인구를 250m / 1km 격자, 행정동(admi_cd) 단위로 롤업합니다.
+
+    - 상위 격자 id 는 격자 규칙(GridLattice)으로 50m grid_id 에서 산술 계산합니다.
+      (블록 좌하단 50m 격자 id 를 상위 격자 id 로 사용)
+    - 해당 월 행만 DELETE 후 다시 INSERT 하며, 한 트랜잭션이라 조회 중에도 이전/새 결과 중 하나만 보입니다.
+
+    Parameters
+    ----------
+    ym : str
+        롤업 대상 월 (YYYYMM)
+    engine : sqlalchemy.Engine
+    lattice : GridLattice, optional
+        없으면 get_grid_lattice() (grid_lattice.json) 를 사용합니다.
+    required : bool
+        False 이면 격자 규칙을 만들 수 없을 때 롤업을 건너뛰고 False 를 반환합니다. (적재 작업은 성공 처리)
+
+    Returns
+    -------
+    bool
+        롤업을 실행했으면 True
+    """
+    lattice = lattice or load_rollup_lattice(required)
+    if lattice is None:
+        return False
+    tn = f"public.tb_flowpop_{ym}"
+    start_s, next_s = month_range(ym)
+    grid_type = grid_id_sql_type()
+    sums = ", ".join(f"SUM({c}) AS {c}" for c in ROLLUP_MEASURES)
+    cols = ", ".join(ROLLUP_MEASURES)
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+
+        for table_name, _ in ROLLUP_GRID_LEVELS:
+            cur.execute(create_rollup_sql(table_name, "grid_id", grid_type))
+        cur.execute(create_rollup_sql(ROLLUP_ADMI_TABLE, "admi_cd", "varchar(20)"))
+
+        # 1️⃣ 일자를 접은 50m 월 합계 (이후 모든 단계의 원천)
+        with stage("rollup_base", logger, ym=ym) as rec:
+            profiled_execute(cur, "flowpop.rollup_base", f"""
+            CREATE TEMP TABLE tmp_flowpop_month ON COMMIT DROP AS
+            SELECT id, admi_cd, timezn_cd, type, {sums}
+            FROM {tn}
+            WHERE etl_ymd >= '{start_s}' AND etl_ymd < '{next_s}'
+              AND id IS NOT NULL
+            GROUP BY id, admi_cd, timezn_cd, type;
+            """, ym=ym)
+            rec.set_rows(rows_out=cur.rowcount)
+
+        # 2️⃣ 격자 피라미드 (250m → 1km 는 250m 결과에서 집계)
+        source, source_key, source_factor = "tmp_flowpop_month", "id", 1
+        for table_name, size in ROLLUP_GRID_LEVELS:
+            factor = lattice.factor_of(size)
+            if factor % source_factor:
+                source, source_key, source_factor = "tmp_flowpop_month", "id", 1
+            parent = lattice.parent_id_sql(source_key, factor)
+            where = "" if source == "tmp_flowpop_month" else f"WHERE crtr_ym = '{ym}'"
+
+            with stage("rollup", logger, table=table_name, ym=ym) as rec:
+                cur.execute(f"DELETE FROM public.{table_name} WHERE crtr_ym = '{ym}';")
+                profiled_execute(cur, f"flowpop.{table_name}", f"""
+                INSERT INTO public.{table_name} (crtr_ym, grid_id, timezn_cd, type, {cols})
+                SELECT '{ym}', ({parent})::{grid_type}, timezn_cd, type, {sums}
+                FROM {source}
+                {where}
+                GROUP BY 2, timezn_cd, type;
+                """, ym=ym)
+                rec.set_rows(rows_out=cur.rowcount)
+            logger.info(f"✔ [롤업 완료] {table_name} ({size}m, {cur.rowcount:,}행)")
+            source, source_key, source_factor = f"public.{table_name}", "grid_id", factor
+
+        # 3️⃣ 행정동
+        with stage("rollup", logger, table=ROLLUP_ADMI_TABLE, ym=ym) as rec:
+            cur.execute(f"DELETE FROM public.{ROLLUP_ADMI_TABLE} WHERE crtr_ym = '{ym}';")
+            profiled_execute(cur, f"flowpop.{ROLLUP_ADMI_TABLE}", f"""
+            INSERT INTO public.{ROLLUP_ADMI_TABLE} (crtr_ym, admi_cd, timezn_cd, type, {cols})
+            SELECT '{ym}', admi_cd, timezn_cd, type, {sums}
+            FROM tmp_flowpop_month
+            GROUP BY admi_cd, timezn_cd, type;
+            """, ym=ym)
+            rec.set_rows(rows_out=cur.rowcount)
+        logger.info(f"✔ [롤업 완료] {ROLLUP_ADMI_TABLE} ({cur.rowcount:,}행)")
+
+        mark_month_loaded(cur, ym, "rollup")
+        raw.commit()
+        logger.info(f"🗺️ 다중 해상도 롤업 완료: {ym}")
+        return True
+
+    except Exception as e:
+        raw.rollback()
+        logger.error(f"❌ 롤업 실행 오류 발생: {e}")
+        raise e
+
+    finally:
+        cur.close()
+        raw.close()
+
+# -----------------------------------------------------------
+# 🔌 다중 커넥션 병렬 COPY (staging 테이블 → 파티션)
+# -----------------------------------------------------------
+# 변환된 CSV 를 줄 경계 기준 바이트 구간으로 나눠 N 개 커넥션이 동시에 staging 테이블로 COPY 하고,
+# 모든 샤드가 성공했을 때만 하나의 트랜잭션에서 파티션으로 붙입니다. (실패 시 staging 만 삭제)
+COPY_WORKERS = int(os.getenv("FLOWPOP_COPY_WORKERS", "1"))
+
+
+class FileSlice:
+    """파일의 [start, end) 바이트 구간만 읽는 file-like 객체 (copy_expert 입력용)"""
+
+    def __init__(self, path, start, end):
+        self.f = open(path, "rb")
+        self.f.seek(start)
+        self.remaining = end - start
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+def split_file_ranges(path, n):
+    """파일을 줄 단위가 깨지지 않는 n 개 이하의 바이트 구간 [(start, end), ...] 으로 나눕니다."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for k in range(1, n):
+            f.seek(max(size * k // n, bounds[-1]))
+            if f.tell() > 0:
+                f.readline()
+            pos = min(f.tell(), size)
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def copy_shard(engine, path, start, end, table_name, columns, shard):
+    """한 커넥션으로 파일 구간 하나를 COPY 하고 커밋합니다. 처리 통계 dict 를 반환합니다."""
     conn = engine.raw_connection()
-    cur = conn.cursor()
+    src = FileSlice(path, start, end)
+    t0 = time.perf_counter()
+    try:
+        with stage("copy_shard", logger, table=table_name, shard=shard) as rec:
+            cur = conn.cursor()
+            cur.copy_expert(
+                f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV)",
+                src
+            )
+            conn.commit()
+            rec.set_rows(rows_out=cur.rowcount)
+        return {"shard": shard, "rows": cur.rowcount, "bytes": end - start,
+                "seconds": time.perf_counter() - t0}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        src.close()
+        conn.close()
 
-    columns_to_exclude = [
-        'x', 'y',
-        'm00', 'm15', 'm25', 'm35', 'm45', 'm55', 'm65',
-        'f00', 'f15', 'f25', 'f35', 'f45', 'f55', 'f65',
-    ]
 
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_file:
+def drop_staging(engine, staging_name):
+    """실패한 병렬 적재의 staging 테이블을 별도 커넥션으로 삭제합니다. (실패해도 경고만)"""
+    try:
+        conn = engine.raw_connection()
+        try:
+            conn.cursor().execute(f"DROP TABLE IF EXISTS {staging_name};")
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"⚠ staging 테이블 삭제 실패: {staging_name} ({e})")
 
-        reader = csv.DictReader(open(input_file, 'r', encoding='utf-8', newline=''), delimiter='|')
-        all_columns = reader.fieldnames
-        selected_columns = [c for c in all_columns if c not in columns_to_exclude]
-        final_columns = selected_columns
 
-        writer = csv.writer(temp_file, delimiter=',')
+def parallel_copy(engine, path, columns, etl_ymd_str, workers, parent="tb_flowpop", on_publish=None):
+    """
+    변환된 CSV(path)를 workers 개 커넥션으로 병렬 COPY 하여 월 파티션에 반영합니다.
 
-        first_etl_ymd = None
-        row_count = 0
+    1. {parent}_YYYYMM_stg 를 만들고 샤드별 커넥션이 동시에 COPY 합니다.
+    2. 모두 성공하면 월 범위 CHECK 제약과 인덱스를 staging 에 만든 뒤
+    3. 하나의 트랜잭션에서 파티션이 없으면 staging 을 ATTACH PARTITION 하고,
+       이미 있으면 INSERT ... SELECT 로 옮긴 뒤 staging 을 삭제합니다.
 
-        for row in reader:
-            row['etl_ymd'] = normalize_date(row['etl_ymd'])
+    어느 샤드든 실패하면 staging 만 삭제되고 파티션은 변경되지 않습니다.
+    parent 는 tb_flowpop(wide) 또는 tb_flowpop_compact(compact) 입니다.
+    on_publish(cur) 는 3 의 반영 트랜잭션 안에서 호출됩니다. (compact 격자 차원 / 호환 뷰를 데이터와 함께 커밋)
 
-            if first_etl_ymd is None:
-                first_etl_ymd = row['etl_ymd']
+    Returns
+    -------
+    (str, int)
+        파티션 이름, 적재 행 수
+    """
+    start, next_month = partition_bounds(etl_ymd_str)
+    suffix = start.strftime('%Y%m')
+    partition_name = f"public.{parent}_{suffix}"
+    staging_name = f"public.{parent}_{suffix}_stg"
+    ranges = split_file_ranges(path, workers)
 
-            # 연령/성별 합산
-            row['m10'] = safe_float(row['m00']) + safe_float(row['m10']) + safe_float(row['m15'])
-            row['m20'] = safe_float(row['m20']) + safe_float(row['m25'])
-            row['m30'] = safe_float(row['m30']) + safe_float(row['m35'])
-            row['m40'] = safe_float(row['m40']) + safe_float(row['m45'])
-            row['m50'] = safe_float(row['m50']) + safe_float(row['m55'])
-            row['m60'] = safe_float(row['m60']) + safe_float(row['m65'])
+    conn = engine.raw_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+        DROP TABLE IF EXISTS {staging_name};
+        CREATE TABLE {staging_name} (LIKE public.{parent} INCLUDING DEFAULTS);
+        """)
+        conn.commit()
+
+        # 1️⃣ 샤드별 병렬 COPY
+        logger.info(f"🔌 병렬 COPY 시작 → {staging_name} ({len(ranges)}개 커넥션)")
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="flowpop-copy") as pool:
+            futures = [
+                pool.submit(copy_shard, engine, path, lo, hi, staging_name, columns, i)
+                for i, (lo, hi) in enumerate(ranges)
+            ]
+            stats = [f.result() for f in futures]
+        elapsed = time.perf_counter() - t0
+
+        for st in stats:
+            secs = max(st["seconds"], 1e-9)
+            logger.info(
+                f"🔌 [conn {st['shard']}] {st['rows']:,}행 / {st['bytes'] / 1e6:,.1f}MB / {st['seconds']:.1f}s"
+                f" → {st['rows'] / secs:,.0f} rows/s, {st['bytes'] / 1e6 / secs:,.1f} MB/s"
+            )
+        total_rows = sum(st["rows"] for st in stats)
+        logger.info(f"🔌 병렬 COPY 완료: {total_rows:,}행 / {elapsed:.1f}s → {total_rows / max(elapsed, 1e-9):,.0f} rows/s")
+
+        # 2️⃣ 부착 전 검증/인덱스 (staging 은 아직 조회 대상이 아니므로 잠금 부담 없음)
+        cur.execute(f"""
+        ALTER TABLE {staging_name} ADD CONSTRAINT {parent}_{suffix}_stg_bounds
+            CHECK (etl_ymd IS NOT NULL AND etl_ymd >= '{start}' AND etl_ymd < '{next_month}');
+        """)
+        conn.commit()
+
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (partition_name,))
+        exists = cur.fetchone()[0]
 
-            row['f10'] = safe_float(row['f00']) + safe_float(row['f10']) + safe_float(row['f15'])
-            row['f20'] = safe_float(row['f20']) + safe_float(row['f25'])
-            row['f30'] = safe_float(row['f30']) + safe_float(row['f35'])
-            row['f40'] = safe_float(row['f40']) + safe_float(row['f45'])
-            row['f50'] = safe_float(row['f50']) + safe_float(row['f55'])
-            row['f60'] = safe_float(row['f60']) + safe_float(row['f65'])
+        # 3️⃣ 단일 트랜잭션으로 반영
+        if exists:
+            cur.execute(f"""
+            INSERT INTO {partition_name} ({', '.join(columns)})
+            SELECT {', '.join(columns)} FROM {staging_name};
+            DROP TABLE {staging_name};
+            """)
+        else:
+            cur.execute(f"""
+            CREATE INDEX idx_{parent}_{suffix}_timezn_ymd
+                ON {staging_name} (etl_ymd, timezn_cd, id);
+            """)
+            conn.commit()
+            cur.execute(f"""
+            ALTER TABLE {staging_name} RENAME TO {parent}_{suffix};
+            ALTER TABLE public.{parent} ATTACH PARTITION {partition_name}
+                FOR VALUES FROM ('{start}') TO ('{next_month}');
+            ALTER TABLE {partition_name} DROP CONSTRAINT {parent}_{suffix}_stg_bounds;
+            """)
+        if on_publish is not None:
+            on_publish(cur)
+        mark_month_loaded(cur, suffix, "load")
+        conn.commit()
+        logger.info(f"📦 파티션 반영 완료: {partition_name} ({'INSERT' if exists else 'ATTACH'})")
+        return partition_name, total_rows
+
+    except Exception:
+        # 정리 실패(끊긴 커넥션 등)가 원래 COPY / ATTACH 오류를 가리지 않도록 새 커넥션에서 경고만 남깁니다.
+        try:
+            conn.rollback()
+        except Exception as e:
+            logger.warning(f"⚠ 롤백 실패 (커넥션 종료로 간주): {e}")
+        drop_staging(engine, staging_name)
+        raise
 
-            row['admi_cd'] = str(int(row['admi_cd']) * 100)
+    finally:
+        cur.close()
+        conn.close()
 
-            for c in columns_to_exclude:
-                row.pop(c, None)
 
-            writer.writerow([row[c] for c in final_columns])
-            row_count += 1
+# -----------------------------------------------------------
+# 🚀 메인 ETL 로직
+# -----------------------------------------------------------
+def load_flowpop(input_file, workers=None, layout=None):
+    """
+    유동인구 CSV 를 변환하여 월 파티션으로 적재합니다.
+    workers(기본 FLOWPOP_COPY_WORKERS) 가 2 이상이면 parallel_copy 로 다중 커넥션 COPY 를 사용합니다.
+    layout(기본 FLOWPOP_LAYOUT) 은 처음 만드는 월에만 적용되며, 이미 있는 월은 기존 레이아웃으로 적재합니다.
+    """
+    workers = workers or COPY_WORKERS
+    logger.info(f"시작: {input_file} 파일을 PostgreSQL로 적재합니다.")
 
-            if row_count % 5000000 == 0:
-                logger.info(f"진행 중: {row_count:,}행 처리 완료")
+    engine = get_engine_from_env(app_name="flowpop")
 
-        temp_file.flush()
+    columns_to_exclude = [
+        'x', 'y',
+        'm00', 'm15', 'm25', 'm35', 'm45', 'm55', 'm65',
+        'f00', 'f15', 'f25', 'f35', 'f45', 'f55', 'f65',
+    ]
+
+    # 레이아웃은 월 단위로 정해지므로 첫 행의 etl_ymd 로 먼저 결정합니다.
+    with open(input_file, 'r', encoding='utf-8', newline='') as f:
+        first_row = next(csv.DictReader(f, delimiter='|'), None)
+    if first_row is None:
+        logger.error("❌ etl_ymd 값을 찾을 수 없습니다.")
+        return
+    # 레이아웃 결정은 짧은 커넥션에서 바로 커밋 (변환 동안 idle 트랜잭션을 잡고 있지 않도록)
+    layout_conn = engine.raw_connection()
+    try:
+        layout_cur = layout_conn.cursor()
+        layout = partition_layout(layout_cur, normalize_date(first_row['etl_ymd']), layout)
+        layout_conn.commit()
+        layout_cur.close()
+    finally:
+        layout_conn.close()
+    logger.info(f"🗂️ 적재 레이아웃: {layout}")
+
+    grid_admi = {}
+    grid_conflicts = 0
+    bad_ids = 0
+
+    with stage("transform", logger, file=os.path.basename(input_file), layout=layout) as transform_rec:
+        with tempfile.NamedTemporaryFile(mode='w+', delete=False) as temp_file:
+
+            reader = csv.DictReader(open(input_file, 'r', encoding='utf-8', newline=''), delimiter='|')
+            all_columns = reader.fieldnames
+            selected_columns = [c for c in all_columns if c not in columns_to_exclude]
+            final_columns = COMPACT_COLUMNS if layout == "compact" else selected_columns
+
+            writer = csv.writer(temp_file, delimiter=',')
+
+            first_etl_ymd = None
+            row_count = 0
+
+            for row in reader:
+                row['etl_ymd'] = normalize_date(row['etl_ymd'])
+
+                if first_etl_ymd is None:
+                    first_etl_ymd = row['etl_ymd']
+
+                # 연령/성별 합산
+                row['m10'] = safe_float(row['m00']) + safe_float(row['m10']) + safe_float(row['m15'])
+                row['m20'] = safe_float(row['m20']) + safe_float(row['m25'])
+                row['m30'] = safe_float(row['m30']) + safe_float(row['m35'])
+                row['m40'] = safe_float(row['m40']) + safe_float(row['m45'])
+                row['m50'] = safe_float(row['m50']) + safe_float(row['m55'])
+                row['m60'] = safe_float(row['m60']) + safe_float(row['m65'])
+
+                row['f10'] = safe_float(row['f00']) + safe_float(row['f10']) + safe_float(row['f15'])
+                row['f20'] = safe_float(row['f20']) + safe_float(row['f25'])
+                row['f30'] = safe_float(row['f30']) + safe_float(row['f35'])
+                row['f40'] = safe_float(row['f40']) + safe_float(row['f45'])
+                row['f50'] = safe_float(row['f50']) + safe_float(row['f55'])
+                row['f60'] = safe_float(row['f60']) + safe_float(row['f65'])
+
+                row['admi_cd'] = str(int(row['admi_cd']) * 100)
+
+                for c in columns_to_exclude:
+                    row.pop(c, None)
+
+                if layout == "compact":
+                    # compact 의 id 는 integer NOT NULL → 비었거나 숫자가 아닌 id 는 COPY 전체를 깨뜨리므로 제외
+                    row['id'] = row['id'].strip()
+                    if not row['id'].isdigit():
+                        bad_ids += 1
+                        continue
+                    # admi_cd 는 행 대신 격자 차원으로
+                    prev = grid_admi.get(row['id'])
+                    if prev is not None and prev != row['admi_cd']:
+                        grid_conflicts += 1
+                    grid_admi[row['id']] = row['admi_cd']
+                    row['pop'] = pack_bands(row)
+
+                writer.writerow([row[c] for c in final_columns])
+                row_count += 1
+
+                if row_count % 5000000 == 0:
+                    logger.info(f"진행 중: {row_count:,}행 처리 완료")
+
+            temp_file.flush()
+        transform_rec.set_rows(rows_in=row_count + bad_ids, rows_out=row_count)
 
     if not first_etl_ymd:
+        os.remove(temp_file.name)
         logger.error("❌ etl_ymd 값을 찾을 수 없습니다.")
         return
 
+    if bad_ids:
+        logger.warning(f"⚠ 비었거나 숫자가 아닌 격자 id {bad_ids:,}행 → compact 적재에서 제외")
+    if grid_conflicts:
+        logger.warning(f"⚠ 한 격자에 서로 다른 admi_cd {grid_conflicts:,}건 → 마지막 값으로 격자 차원에 반영")
+
     logger.info(f"총 {row_count:,}행 변환 완료 (etl_ymd={first_etl_ymd})")
-    ensure_parent_table(cur)
-    partition_name = ensure_partition(cur, first_etl_ymd)
-
-    with open(temp_file.name, 'r') as temp_file_read:
-        logger.info(f"COPY 시작 → {partition_name}")
-        cur.copy_expert(
-            f"""
-            COPY {partition_name} ({', '.join(final_columns)})
-            FROM STDIN WITH (FORMAT CSV)
-            """,
-            temp_file_read
-        )
+    parent = "tb_flowpop_compact" if layout == "compact" else "tb_flowpop"
+
+    def publish_compact(publish_cur):
+        # 격자 차원 / 호환 뷰는 데이터와 같은 트랜잭션에서 커밋 (실패 시 빈 월 뷰가 남지 않도록)
+        upsert_grid_dim(publish_cur, grid_admi)
+        ensure_compat_view(publish_cur, first_etl_ymd)
+
+    on_publish = publish_compact if layout == "compact" else None
+
+    conn = engine.raw_connection()
+    cur = conn.cursor()
+
+    with stage("ddl", logger, layout=layout):
+        ensure_parent_table(cur)
+        if layout == "compact":
+            ensure_compact_parent(cur)
+        if workers <= 1:
+            partition_name = ensure_partition(cur, first_etl_ymd, parent=parent)
+            if on_publish is not None:
+                on_publish(cur)
+
+    if workers > 1:
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        try:
+            with stage("copy", logger, rows_in=row_count, workers=workers) as rec:
+                partition_name, loaded = parallel_copy(
+                    engine, temp_file.name, final_columns, first_etl_ymd, workers, parent=parent,
+                    on_publish=on_publish,
+                )
+                rec.set_rows(rows_out=loaded)
+        finally:
+            os.remove(temp_file.name)
+        logger.info(f"✅ 데이터 적재 완료: {partition_name}, 총 {loaded:,}행")
+        return
 
-    conn.commit()
+    with stage("copy", logger, rows_in=row_count, table=partition_name) as rec:
+        with open(temp_file.name, 'r') as temp_file_read:
+            logger.info(f"COPY 시작 → {partition_name}")
+            cur.copy_expert(
+                f"""
+                COPY {partition_name} ({', '.join(final_columns)})
+                FROM STDIN WITH (FORMAT CSV)
+                """,
+                temp_file_read
+            )
+        loaded = cur.rowcount
+        mark_month_loaded(cur, first_etl_ymd[:7].replace("-", ""), "load")
+
+        conn.commit()
+        rec.set_rows(rows_out=loaded)
     cur.close()
     conn.close()
 
     logger.info(f"✅ 데이터 적재 완료: {partition_name}, 총 {row_count:,}행")
 
 
+# -----------------------------------------------------------
+# 🔎 입력 파일 탐색
+# -----------------------------------------------------------
+def find_flowpop_file(ym: str) -> str:
+    """SRC_DIR 에서 ym(YYYYMM) 이 포함된 가장 최근 유동인구 CSV 경로를 반환합니다."""
+    pattern = f"*flow_age_time*{ym}*.csv"
+    matched_files = sorted(glob.glob(os.path.join(get_src_dir(), pattern)))
+    if not matched_files:
+        raise FileNotFoundError(f"{ym}이 포함된 CSV 파일을 찾을 수 없습니다.")
+    return matched_files[-1]
+
+
+logger = setup_logger("flowpop")
+
 # -----------------------------------------------------------
 # 🧭 실행부
 # -----------------------------------------------------------
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="FLOWPOP 월별 데이터 적재 스크립트")
     parser.add_argument("ym", help="적재할 월(YYYYMM)")
-    logger = setup_logger("flowpop")
+    parser.add_argument("--workers", type=int, default=COPY_WORKERS,
+                        help="병렬 COPY 커넥션 수 (기본 FLOWPOP_COPY_WORKERS, 1 이면 단일 COPY)")
+    parser.add_argument("--rollup-only", action="store_true",
+                        help="적재/집계 없이 이미 적재된 월의 다중 해상도 롤업만 다시 계산")
+    parser.add_argument("--layout", choices=["wide", "compact"], default=None,
+                        help="새로 만드는 월 파티션의 저장 레이아웃 (기본 FLOWPOP_LAYOUT)")
+    parser.add_argument("--to-compact", action="store_true",
+                        help="적재 없이 이미 wide 로 적재된 월을 compact 레이아웃으로 전환")
 
     args = parser.parse_args()
     logger.info("▶ 스크립트 시작")
 
-    SRC_DIR = get_src_dir()
-    pattern = f"*flow_age_time*{args.ym}*.csv"
-    matched_files = sorted(glob.glob(os.path.join(SRC_DIR, pattern)))
+    if args.rollup_only or args.to_compact:
+        try:
+            engine = get_engine_from_env(app_name="flowpop")
+            if args.to_compact:
+                compact_partition(args.ym, engine)
+            if args.rollup_only:
+                run_rollups(args.ym, engine, required=True)
+            logger.info("▶ 스크립트 종료")
+        except Exception as e:
+            logger.exception(f"❌ 오류 발생: {e}")
+            sys.exit(1)
+        sys.exit(0)
 
-    if not matched_files:
-        logger.error(f"❌ {args.ym}이 포함된 CSV 파일을 찾을 수 없습니다.")
+    try:
+        input_file = find_flowpop_file(args.ym)
+    except FileNotFoundError as e:
+        logger.error(f"❌ {e}")
         sys.exit(1)
-
-    input_file = matched_files[-1]
     logger.info(f"선택된 파일: {input_file}")
 
     try:
-        load_flowpop(input_file)
-        run_sql_aggregations(args.ym, get_engine_from_env())
+        load_flowpop(input_file, workers=args.workers, layout=args.layout)
+        engine = get_engine_from_env(app_name="flowpop")
+        run_sql_aggregations(args.ym, engine)
+        run_rollups(args.ym, engine)
         logger.info("▶ 스크립트 종료")
     except Exception as e:
         logger.exception(f"❌ 오류 발생: {e}")
@@ -0,0 +1,487 @@
+"""
+flowpop_api.py
+---------------------------------
+유동인구 격자 / 기간 / 시간대 조회 서비스 (Python API + 로컬 HTTP)
+
+- 격자 집합 x 기간 x 시간대 조회는 월 파티션(wide: tb_flowpop_YYYYMM, compact: tb_flowpop_compact_YYYYMM)에
+  준비된 문장(PREPARE)으로 실행되어 (etl_ymd, timezn_cd, id) 인덱스를 사용합니다.
+  compact 월은 호환 뷰(id 를 wide 타입으로 캐스트) 대신 파티션을 직접 조건으로 걸고 선택 목록에서만 캐스트합니다.
+- 결과 DataFrame 은 메모리 상한(FLOWPOP_API_CACHE_MB) LRU 캐시에 월 단위 키로 보관합니다.
+- tb_flowpop_load_log 의 월 version 이 바뀌면(재적재 / 재집계 / 롤업) 그 월의 캐시만 버립니다.
+  (version 확인 주기 FLOWPOP_API_VERSION_TTL 초)
+
+사용 예)
+    python flowpop_api.py --port 8766
+    curl 'http://127.0.0.1:8766/flowpop/grid?ids=10000001,10000002&start=2025-09-01&end=2025-09-07&timezn=08,09'
+    curl 'http://127.0.0.1:8766/flowpop/agg/daily?ym=202509'
+    curl 'http://127.0.0.1:8766/flowpop/rollup/250m?ym=202509&keys=10000001&timezn=08'
+    curl 'http://127.0.0.1:8766/flowpop/stats'
+
+    >>> reader = FlowpopReader()
+    >>> df = reader.grid_slice([10000001, 10000002], "2025-09-01", "2025-09-07", timezn=["08", "09"])
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+
+from utils import setup_logger, get_engine_from_env, profiled_execute, to_grid_id
+from flowpop import (FLOWPOP_BANDS, LOAD_LOG_TABLE, ROLLUP_GRID_LEVELS, ROLLUP_ADMI_TABLE, compact_select_sql,
+                     wide_id_type)
+
+logger = setup_logger("flowpop_api")
+
+CACHE_MB = float(os.getenv("FLOWPOP_API_CACHE_MB", 256))
+VERSION_TTL = float(os.getenv("FLOWPOP_API_VERSION_TTL", 30))
+
+# 조회 가능한 월 집계 / 롤업 테이블 (URL 이름 → 테이블)
+AGG_TABLES = {
+    "agegen": "tb_flowpop_agg_agegen",
+    "timezn": "tb_flowpop_agg_timezn",
+    "dayname": "tb_flowpop_agg_dayname",
+    "daily": "tb_flowpop_agg_daily",
+}
+ROLLUP_TABLES = {
+    **{name.removeprefix("tb_flowpop_rollup_"): (name, "grid_id") for name, _ in ROLLUP_GRID_LEVELS},
+    "admi": (ROLLUP_ADMI_TABLE, "admi_cd"),
+}
+
+# grid_slice 결과 컬럼 (WIDE_COLUMNS 를 조회 키 순서로)
+GRID_COLUMNS = ["id", "etl_ymd", "timezn_cd", "type", *FLOWPOP_BANDS, "total", "admi_cd"]
+
+
+# -----------------------------------------------------------
+# 🧠 메모리 상한 LRU
+# -----------------------------------------------------------
+class FrameCache:
+    """
+    DataFrame 을 (종류, 월, ...) 키로 보관하는 LRU 캐시.
+    크기는 항목 수가 아니라 DataFrame 메모리(deep) 합계로 제한하며,
+    항목마다 저장 당시의 월 version 을 함께 두어 version 이 다르면 미스로 처리합니다.
+
+    Parameters
+    ----------
+    max_bytes : int
+        캐시 메모리 상한. 이보다 큰 결과는 캐시하지 않습니다.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df: pd.DataFrame, version):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (df, version, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, ym: str | None = None) -> int:
+        """ym 월 항목(ym 이 없으면 전체)을 버리고 버린 항목 수를 반환합니다."""
+        with self._lock:
+            keys = [k for k in self.entries if ym is None or k[1] == ym]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def _drop(self, key):
+        _, _, size = self.entries.pop(key)
+        self.nbytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self.entries), "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# -----------------------------------------------------------
+# 🔧 입력 정규화
+# -----------------------------------------------------------
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    return datetime.strptime(text, "%Y-%m-%d" if "-" in text else "%Y%m%d").date()
+
+
+def _month_slices(start: date, end: date):
+    """[start, end] (양끝 포함) 을 월별 (YYYYMM, 시작일, 종료일) 로 나눕니다."""
+    cur = start
+    while cur <= end:
+        next_month = (cur.replace(day=28) + timedelta(days=4)).replace(day=1)
+        yield cur.strftime("%Y%m"), cur, min(end, next_month - timedelta(days=1))
+        cur = next_month
+
+
+def _codes(values) -> tuple:
+    """시간대 / type / 행정동 코드 목록을 정렬된 문자열 튜플로 (없으면 빈 튜플)"""
+    if values is None:
+        return ()
+    if isinstance(values, (str, int)):
+        values = [values]
+    codes = tuple(sorted({str(v).strip() for v in values if str(v).strip()}))
+    for code in codes:
+        if not code.replace("_", "").isalnum():
+            raise ValueError(f"잘못된 코드 값: {code!r}")
+    return codes
+
+
+def _grid_ids(values) -> tuple:
+    ids = to_grid_id(pd.Series(list(values), dtype=object))
+    if ids.isna().any():
+        raise ValueError("8자리 grid_id 가 아닌 값이 있습니다.")
+    return tuple(sorted(set(ids.astype(int).tolist())))
+
+
+def _array_literal(values) -> str:
+    """PostgreSQL 배열 리터럴. 타입이 정해지지 않은 문자열로 넘겨 준비된 문장의 파라미터 타입으로 변환되게 합니다."""
+    return "{" + ",".join(f'"{v}"' for v in values) + "}"
+
+
+# -----------------------------------------------------------
+# 📚 조회 API
+# -----------------------------------------------------------
+class FlowpopReader:
+    """
+    유동인구 조회 캐시. 반환하는 DataFrame 은 캐시와 공유되므로 수정하지 말고 읽기만 합니다.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.Engine, optional
+        없으면 get_engine_from_env(app_name="flowpop_api")
+    cache_mb : float, optional
+        캐시 메모리 상한 (기본 FLOWPOP_API_CACHE_MB)
+    version_ttl : float, optional
+        tb_flowpop_load_log 재확인 주기(초) (기본 FLOWPOP_API_VERSION_TTL)
+    """
+
+    def __init__(self, engine=None, cache_mb: float | None = None, version_ttl: float | None = None):
+        self.engine = engine or get_engine_from_env(app_name="flowpop_api")
+        self.cache = FrameCache(int((cache_mb if cache_mb is not None else CACHE_MB) * 1024 * 1024))
+        self.version_ttl = VERSION_TTL if version_ttl is None else version_ttl
+        self._versions = {}
+        self._layouts = {}
+        self._id_type = None
+        self._versions_at = None
+        self._versions_lock = threading.Lock()
+
+    # ---------------------------------------------
+    # 월 version (재적재 감지)
+    # ---------------------------------------------
+    def refresh_versions(self, force: bool = False) -> list[str]:
+        """
+        tb_flowpop_load_log 를 읽어 version 이 바뀐 월의 캐시를 비우고 그 월 목록을 반환합니다.
+        version_ttl 안에 다시 호출되면 (force 가 아니면) 아무것도 하지 않습니다.
+        """
+        now = time.monotonic()
+        if not force and self._versions_at is not None and now - self._versions_at < self.version_ttl:
+            return []
+        with self._versions_lock:
+            if not force and self._versions_at is not None and now - self._versions_at < self.version_ttl:
+                return []
+            raw = self.engine.raw_connection()
+            try:
+                cur = raw.cursor()
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{LOAD_LOG_TABLE}",))
+                versions = {}
+                if cur.fetchone()[0]:
+                    cur.execute(f"SELECT crtr_ym, version FROM public.{LOAD_LOG_TABLE}")
+                    versions = dict(cur.fetchall())
+                raw.rollback()
+            finally:
+                raw.close()
+            changed = [ym for ym, v in versions.items() if self._versions.get(ym) != v]
+            self._versions, self._versions_at = versions, time.monotonic()
+        for ym in changed:
+            self._layouts.pop(ym, None)
+            dropped = self.cache.invalidate(ym)
+            if dropped:
+                logger.info(f"♻️ {ym} 재적재 감지 → 캐시 {dropped:,}건 무효화")
+        return changed
+
+    def invalidate(self, ym: str | None = None) -> int:
+        """ym 월(없으면 전체) 캐시를 즉시 비웁니다."""
+        return self.cache.invalidate(ym)
+
+    # ---------------------------------------------
+    # 준비된 문장 실행
+    # ---------------------------------------------
+    def _execute(self, name: str, relation: str, sql: str, params: list, empty_columns, ym: str) -> pd.DataFrame:
+        """
+        relation 이 있으면 sql 을 커넥션별로 한 번만 PREPARE 하고 EXECUTE 합니다. (없으면 빈 DataFrame)
+        준비된 문장은 DB 세션 단위이므로 풀 커넥션의 info 에 준비한 이름을 기록해 둡니다.
+        """
+        stmt = "flowpop_api_" + hashlib.md5(sql.encode("utf-8")).hexdigest()[:16]
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            prepared = raw.info.setdefault("flowpop_api_prepared", set())
+            if stmt not in prepared:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (relation,))
+                if not cur.fetchone()[0]:
+                    raw.rollback()
+                    return pd.DataFrame(columns=empty_columns)
+                cur.execute(f"PREPARE {stmt} AS {sql}")
+                prepared.add(stmt)
+            placeholders = ", ".join(["%s"] * len(params))
+            try:
+                profiled_execute(cur, name, f"EXECUTE {stmt} ({placeholders})", params, ym=ym)
+            except Exception:
+                # 월 파티션이 삭제된 경우 등: 다음 호출에서 존재 확인부터 다시 하도록
+                prepared.discard(stmt)
+                try:
+                    raw.rollback()
+                    cur.execute(f"DEALLOCATE {stmt}")
+                except Exception as e:
+                    # 끊긴 커넥션 등: 정리 오류가 원래 오류를 가리지 않도록 커넥션을 풀에서 폐기
+                    logger.warning(f"⚠ 준비 문장 정리 실패 → 커넥션 폐기 ({e})")
+                    raw.invalidate()
+                raise
+            columns = [d[0] for d in cur.description]
+            df = pd.DataFrame.from_records(cur.fetchall(), columns=columns, coerce_float=True)
+            raw.rollback()
+            return df
+        finally:
+            raw.close()
+
+    def _month_layout(self, ym: str) -> str:
+        """
+        ym 월 저장 레이아웃("wide" | "compact")을 반환합니다.
+        월 version 이 바뀌면(--to-compact 전환 포함) refresh_versions 가 지워 다시 확인합니다.
+        """
+        layout = self._layouts.get(ym)
+        if layout is not None:
+            return layout
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.tb_flowpop_compact_{ym}",))
+            layout = "compact" if cur.fetchone()[0] else "wide"
+            if layout == "compact" and self._id_type is None:
+                self._id_type = wide_id_type(cur)
+            raw.rollback()
+        finally:
+            raw.close()
+        self._layouts[ym] = layout
+        return layout
+
+    def _cached(self, key, loader) -> pd.DataFrame:
+        self.refresh_versions()
+        version = self._versions.get(key[1])
+        df = self.cache.get(key, version)
+        if df is None:
+            df = loader()
+            self.cache.put(key, df, version)
+        return df
+
+    # ---------------------------------------------
+    # 조회
+    # ---------------------------------------------
+    def grid_slice(self, grid_ids, start, end=None, timezn=None) -> pd.DataFrame:
+        """
+        격자 집합 x 기간([start, end], 양끝 포함) x 시간대의 일자별 유동인구(wide 컬럼)를 반환합니다.
+        여러 달에 걸친 기간은 월별로 나눠 조회 / 캐시한 뒤 이어 붙입니다.
+
+        Parameters
+        ----------
+        grid_ids : list
+            50m 격자 grid_id 목록 (8자리 문자열 / 정수)
+        start, end : str | date
+            YYYY-MM-DD 또는 YYYYMMDD. end 가 없으면 start 하루
+        timezn : list, optional
+            시간대 코드 목록. 없으면 전체 시간대
+        """
+        ids = _grid_ids(grid_ids)
+        tz = _codes(timezn)
+        start = _as_date(start)
+        end = _as_date(end) if end is not None else start
+        if not ids or end < start:
+            return pd.DataFrame(columns=GRID_COLUMNS)
+
+        cols = ", ".join(f'"{c}"' if c == "type" else c for c in GRID_COLUMNS)
+        frames = []
+        for ym, lo, hi in _month_slices(start, end):
+            self.refresh_versions()
+            if self._month_layout(ym) == "compact":
+                # 호환 뷰의 c.id::text::<wide 타입> 은 인덱스 조건이 되지 못하므로 파티션 컬럼에 직접 조건을 겁니다.
+                relation = f"public.tb_flowpop_compact_{ym}"
+                where = ("c.etl_ymd BETWEEN $1 AND $2 AND c.id = ANY($3::integer[])"
+                         + (" AND c.timezn_cd = ANY($4)" if tz else ""))
+                sql = (f"SELECT {cols} FROM ({compact_select_sql(relation, self._id_type)} WHERE {where}) s "
+                       f"ORDER BY etl_ymd, timezn_cd, id")
+            else:
+                relation = f"public.tb_flowpop_{ym}"
+                where = "etl_ymd BETWEEN $1 AND $2 AND id = ANY($3)" + (" AND timezn_cd = ANY($4)" if tz else "")
+                sql = f"SELECT {cols} FROM {relation} WHERE {where} ORDER BY etl_ymd, timezn_cd, id"
+            params = [lo, hi, _array_literal(ids)] + ([_array_literal(tz)] if tz else [])
+            key = ("grid", ym, ids, lo, hi, tz)
+            frames.append(self._cached(
+                key, lambda: self._execute("flowpop_api.grid_slice", relation, sql, params, GRID_COLUMNS, ym)
+            ))
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return pd.DataFrame(columns=GRID_COLUMNS)
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def agg(self, name: str, ym: str) -> pd.DataFrame:
+        """ym 월 집계 테이블(agegen / timezn / dayname / daily) 전체를 반환합니다."""
+        if name not in AGG_TABLES:
+            raise ValueError(f"알 수 없는 집계: {name} ({', '.join(AGG_TABLES)})")
+        ym = datetime.strptime(str(ym), "%Y%m").strftime("%Y%m")
+        relation = f"public.{AGG_TABLES[name]}"
+        sql = f"SELECT * FROM {relation} WHERE crtr_ym = $1"
+        return self._cached(
+            ("agg", ym, name),
+            lambda: self._execute(f"flowpop_api.agg_{name}", relation, sql, [ym], ["crtr_ym"], ym),
+        )
+
+    def rollup(self, level: str, ym: str, keys=None, timezn=None) -> pd.DataFrame:
+        """
+        ym 월 롤업(250m / 1km / admi)을 반환합니다.
+        keys 는 상위 격자 grid_id(250m / 1km) 또는 admi_cd(admi) 목록이며, 없으면 해당 월 전체입니다.
+        """
+        if level not in ROLLUP_TABLES:
+            raise ValueError(f"알 수 없는 롤업: {level} ({', '.join(ROLLUP_TABLES)})")
+        ym = datetime.strptime(str(ym), "%Y%m").strftime("%Y%m")
+        table, key_col = ROLLUP_TABLES[level]
+        relation = f"public.{table}"
+        key_values = () if keys is None else (_grid_ids(keys) if key_col == "grid_id" else _codes(keys))
+        tz = _codes(timezn)
+
+        where, params = ["crtr_ym = $1"], [ym]
+        if key_values:
+            params.append(_array_literal(key_values))
+            where.append(f"{key_col} = ANY(${len(params)})")
+        if tz:
+            params.append(_array_literal(tz))
+            where.append(f"timezn_cd = ANY(${len(params)})")
+        sql = f"SELECT * FROM {relation} WHERE {' AND '.join(where)}"
+        return self._cached(
+            ("rollup", ym, level, key_values, tz),
+            lambda: self._execute(f"flowpop_api.rollup_{level}", relation, sql, params, ["crtr_ym"], ym),
+        )
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "months": len(self._versions)}
+
+    # ---------------------------------------------
+    # 🌐 로컬 HTTP 엔드포인트
+    # ---------------------------------------------
+    def serve_http(self, host: str, port: int):
+        reader = self
+
+        def _list(qs, name):
+            values = [v for item in qs.get(name, []) for v in item.split(",") if v.strip()]
+            return values or None
+
+        def _one(qs, name, default=None):
+            values = qs.get(name)
+            if not values:
+                if default is None:
+                    raise ValueError(f"{name} 파라미터가 필요합니다.")
+                return default
+            return values[0]
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, payload):
+                if isinstance(payload, pd.DataFrame):
+                    body = payload.to_json(orient="records", date_format="iso", force_ascii=False).encode("utf-8")
+                else:
+                    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                qs = parse_qs(url.query)
+                if url.path == "/health":
+                    return self._reply(200, {"status": "ok"})
+                if parts[0] != "flowpop" or len(parts) < 2:
+                    return self._reply(404, {"error": "not found"})
+                try:
+                    if parts[1:] == ["stats"]:
+                        return self._reply(200, reader.stats())
+                    if parts[1:] == ["grid"]:
+                        start = _one(qs, "start")
+                        return self._reply(200, reader.grid_slice(
+                            _list(qs, "ids") or [], start, _one(qs, "end", start), _list(qs, "timezn")))
+                    if parts[1] == "agg" and len(parts) == 3:
+                        return self._reply(200, reader.agg(parts[2], _one(qs, "ym")))
+                    if parts[1] == "rollup" and len(parts) == 3:
+                        return self._reply(200, reader.rollup(parts[2], _one(qs, "ym"), _list(qs, "keys"),
+                                                              _list(qs, "timezn")))
+                except ValueError as e:
+                    return self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    logger.exception(f"❌ 조회 실패 ({self.path}): {e}")
+                    return self._reply(500, {"error": str(e)})
+                return self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path != "/flowpop/invalidate":
+                    return self._reply(404, {"error": "not found"})
+                ym = parse_qs(url.query).get("ym", [None])[0]
+                return self._reply(200, {"invalidated": reader.invalidate(ym)})
+
+            def log_message(self, fmt, *args):
+                logger.debug("HTTP " + fmt % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        logger.info(f"🌐 유동인구 조회 HTTP 엔드포인트 시작: http://{host}:{port}/flowpop")
+        return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="유동인구 격자 / 기간 / 시간대 조회 서비스")
+    parser.add_argument("--host", default=os.getenv("FLOWPOP_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("FLOWPOP_API_PORT", 8766)))
+    parser.add_argument("--cache-mb", type=float, default=CACHE_MB, help="캐시 메모리 상한(MB)")
+    args = parser.parse_args()
+
+    server = FlowpopReader(cache_mb=args.cache_mb).serve_http(args.host, args.port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
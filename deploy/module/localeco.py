@@ -4,7 +4,10 @@ import json
 import os
 from datetime import datetime
 import glob
-from utils import setup_logger, get_engine_from_env, get_src_dir
+import tempfile
+from collections import deque
+from utils import (setup_logger, get_engine_from_env, get_src_dir, AsyncRunner, copy_df_to_table, stage,
+                   to_grid_id, grid_id_for_storage, compact_grid_mapping)
 
 # =========================
 # 📁 공통 경로 정의
@@ -15,10 +18,48 @@ IND_PATTERN = os.path.join(BASE_DIR, "YEOSU_IND_CODE*")
 LOCAL_PAY_PATTERN = os.path.join(BASE_DIR, "local_pay_*")
 LOCAL_GRID_JSON = os.path.join(BASE_DIR, "json/local_grid_id.json")
 
+# =========================
+# 🦆 집계 엔진 설정
+# =========================
+# pandas: 원본 파일 전체를 메모리에 올려 처리 (기존 방식)
+# duckdb: 원본 파일을 DuckDB 로 직접 조회 (필요 컬럼만 읽고, 메모리를 넘으면 임시 디렉토리로 내려 씀)
+LOCALECO_BACKENDS = ("pandas", "duckdb")
+LOCALECO_BACKEND = os.getenv("LOCALECO_BACKEND", "pandas")
+DUCKDB_THREADS = int(os.getenv("LOCALECO_DUCKDB_THREADS", os.cpu_count() or 1))
+DUCKDB_MEMORY_LIMIT = os.getenv("LOCALECO_DUCKDB_MEMORY")  # 예: 4GB (없으면 DuckDB 기본값 = 물리 메모리의 80%)
+DUCKDB_TEMP_DIR = os.getenv("LOCALECO_DUCKDB_TEMP") or os.path.join(tempfile.gettempdir(), "localeco_duckdb")
+DUCKDB_CHUNK_ROWS = int(os.getenv("LOCALECO_DUCKDB_CHUNK_ROWS", 500_000))
+# 비동기 적재 시 동시에 들고 있는 청크 수 (메모리 상한 = 대략 청크 크기 x 이 값)
+DUCKDB_MAX_INFLIGHT = int(os.getenv("LOCALECO_DUCKDB_MAX_INFLIGHT", 2))
+
+# ------------------------------------------------------------------------
+# 공통 적재 함수
+# ------------------------------------------------------------------------
+async def _copy_table(pool, df, table_name, logger):
+    with stage("load", logger, rows_in=df, table=table_name, mode="async"):
+        await copy_df_to_table(pool, df, table_name)
+
+
+def write_table(df, table_name, logger, runner: AsyncRunner | None = None):
+    """
+    DataFrame 을 append 적재합니다.
+    grid_id(Int32)는 여기서 GRID_ID_STORAGE(char | int) 형식으로 변환합니다.
+    runner 가 주어지면 asyncpg COPY 로 백그라운드 적재를 제출하고 바로 반환합니다. (다음 처리와 겹쳐 실행)
+    """
+    if 'grid_id' in df.columns:
+        df = df.assign(grid_id=grid_id_for_storage(df['grid_id']))
+    if runner is not None:
+        future = runner.submit(_copy_table(runner.pool(), df, table_name, logger))
+        logger.info(f"📤 {table_name} 비동기 적재 제출 ({len(df):,} rows)")
+        return future
+    engine = get_engine_from_env(app_name="localeco")
+    with stage("load", logger, rows_in=df, table=table_name):
+        df.to_sql(name=table_name, con=engine, if_exists='append', index=False, method='multi')
+
 # ------------------------------------------------------------------------
 # KCB 데이터 처리 및 적재
 # ------------------------------------------------------------------------
-def process_kcb(logger):
+def process_kcb(logger, runner: AsyncRunner | None = None):
     logger.info("🚀 KCB 데이터 처리 시작")
     kcb_files = sorted(glob.glob(KCB_PATTERN))
     ind_files = sorted(glob.glob(IND_PATTERN))
@@ -29,36 +70,40 @@ def process_kcb(logger):
     ind_file = ind_files[-1]
     logger.info(f"KCB 파일: {kcb_file}, 업종코드 파일: {ind_file}")
 
-    kcb = pd.read_csv(kcb_file, sep='|')
-    ind_code = pd.read_csv(ind_file, sep='|')
-    kcb = pd.merge(kcb, ind_code, left_on='SIC_CD_LV4', right_on='SIC_CD', how='inner').drop(columns='SIC_CD')
-    drop_cols = [
-        'WGS84_X', 'WGS84_Y', 'UTMK_X', 'UTML_Y',
-        'RUN_OUT2_CNT', 'TOT_SALES_AMT1_CNT', 'TOT_SALES_AMT2_CNT',
-        'TOT_SALES_AMT3_CNT', 'TOT_SALES_AMT4_CNT'
-    ]
-    kcb.drop(columns=drop_cols, inplace=True)
-    kcb = kcb[[
-        'QID50', 'BS_YR_MON', 'SIC_CD_LV4','SIC_FST_CLSFY_ITM_NM', 'SIC_SCND_CLSFY_ITM_NM',
-        'SHOP_CNT', 'OP_CNT', 'NEW_OPN_CNT', 'RUN_OUT_CNT', 'TOT_SALE_AMT', 'TOT_SALES_AMT0_CNT', 'TOT_SALES_AMT5_CNT',]]
-    kcb.columns = [col.lower() for col in kcb.columns]
-    kcb.rename(columns={
-        'qid50': 'grid_id',
-        'bs_yr_mon': 'std_ym',
-        'tot_sales_amt5_cnt': 'tot_sales_amt5m_cnt'
-    }, inplace=True)
-    kcb['grid_id'] = kcb['grid_id'].astype(str)
-    kcb['std_ym'] = kcb['std_ym'].astype(str)
-    kcb["reg_dttm"] = datetime.now()
+    with stage("extract", logger, file=os.path.basename(kcb_file)) as rec:
+        kcb = pd.read_csv(kcb_file, sep='|')
+        ind_code = pd.read_csv(ind_file, sep='|')
+        rec.set_rows(rows_out=kcb)
+
+    with stage("transform", logger, rows_in=kcb, table="tb_kcb_stat") as rec:
+        kcb = pd.merge(kcb, ind_code, left_on='SIC_CD_LV4', right_on='SIC_CD', how='inner').drop(columns='SIC_CD')
+        drop_cols = [
+            'WGS84_X', 'WGS84_Y', 'UTMK_X', 'UTML_Y',
+            'RUN_OUT2_CNT', 'TOT_SALES_AMT1_CNT', 'TOT_SALES_AMT2_CNT',
+            'TOT_SALES_AMT3_CNT', 'TOT_SALES_AMT4_CNT'
+        ]
+        kcb.drop(columns=drop_cols, inplace=True)
+        kcb = kcb[[
+            'QID50', 'BS_YR_MON', 'SIC_CD_LV4','SIC_FST_CLSFY_ITM_NM', 'SIC_SCND_CLSFY_ITM_NM',
+            'SHOP_CNT', 'OP_CNT', 'NEW_OPN_CNT', 'RUN_OUT_CNT', 'TOT_SALE_AMT', 'TOT_SALES_AMT0_CNT', 'TOT_SALES_AMT5_CNT',]]
+        kcb.columns = [col.lower() for col in kcb.columns]
+        kcb.rename(columns={
+            'qid50': 'grid_id',
+            'bs_yr_mon': 'std_ym',
+            'tot_sales_amt5_cnt': 'tot_sales_amt5m_cnt'
+        }, inplace=True)
+        kcb['grid_id'] = to_grid_id(kcb['grid_id'])
+        kcb['std_ym'] = kcb['std_ym'].astype(str)
+        kcb["reg_dttm"] = datetime.now()
+        rec.set_rows(rows_out=kcb)
     logger.info(f"KCB 데이터 정제 완료: {kcb.shape[0]} rows, {kcb.shape[1]} columns")
-    engine = get_engine_from_env()
-    kcb.to_sql(name='tb_kcb_stat', con=engine, if_exists='append', index=False, method='multi')
+    write_table(kcb, 'tb_kcb_stat', logger, runner)
     logger.info("✅ KCB 데이터 DB 적재 완료")
 
 # ------------------------------------------------------------------------
 # Local Pay 데이터 처리 및 적재
 # ------------------------------------------------------------------------
-def process_local(logger):
+def process_local(logger, runner: AsyncRunner | None = None):
     logger.info("🚀 Local Pay 데이터 처리 시작")
     pay_files = sorted(glob.glob(LOCAL_PAY_PATTERN))
     if not pay_files or not os.path.exists(LOCAL_GRID_JSON):
@@ -67,29 +112,31 @@ def process_local(logger):
     pay_file = pay_files[-1]
     logger.info(f"Local Pay 파일: {pay_file}, grid_id 파일: {LOCAL_GRID_JSON}")
 
-    local_pay = pd.read_csv(pay_file)
-    with open(LOCAL_GRID_JSON, 'r', encoding='utf-8') as f:
-        local_grid_id = json.load(f)
-    local_pay['결제년월일'] = pd.to_datetime(local_pay['결제년월일'])
-    local_pay['결제년월'] = local_pay['결제년월일'].dt.strftime('%Y-%m')
-    local_pay['grid_id'] = local_pay['가맹점명'].map(local_grid_id)
-    local_pay['std_ym'] = pd.to_datetime(local_pay['결제년월']).dt.strftime("%Y%m")
-    local_pay_agg = local_pay.groupby(['업종', 'grid_id', 'std_ym'], as_index=False).agg(
-        pay_cnt=('번호', 'count'),
-        pay_amt=('결제금액', 'sum')
-    )[['grid_id', 'std_ym', '업종', 'pay_cnt', 'pay_amt']]
-    local_pay_agg.rename(columns={'업종': 'ind_type'}, inplace=True)
-    local_pay_agg['reg_dttm'] = datetime.now()
-    local_pay_agg['grid_id'] = local_pay_agg['grid_id'].astype(str)
+    with stage("extract", logger, file=os.path.basename(pay_file)) as rec:
+        local_pay = pd.read_csv(pay_file)
+        with open(LOCAL_GRID_JSON, 'r', encoding='utf-8') as f:
+            local_grid_id = compact_grid_mapping(json.load(f))
+        rec.set_rows(rows_out=local_pay)
+    with stage("transform", logger, rows_in=local_pay, table="tb_local_pay_agg") as rec:
+        local_pay['결제년월일'] = pd.to_datetime(local_pay['결제년월일'])
+        local_pay['결제년월'] = local_pay['결제년월일'].dt.strftime('%Y-%m')
+        local_pay['grid_id'] = local_pay['가맹점명'].map(local_grid_id)
+        local_pay['std_ym'] = pd.to_datetime(local_pay['결제년월']).dt.strftime("%Y%m")
+        local_pay_agg = local_pay.groupby(['업종', 'grid_id', 'std_ym'], as_index=False).agg(
+            pay_cnt=('번호', 'count'),
+            pay_amt=('결제금액', 'sum')
+        )[['grid_id', 'std_ym', '업종', 'pay_cnt', 'pay_amt']]
+        local_pay_agg.rename(columns={'업종': 'ind_type'}, inplace=True)
+        local_pay_agg['reg_dttm'] = datetime.now()
+        rec.set_rows(rows_out=local_pay_agg)
     logger.info(f"Local Pay 집계 완료: {local_pay_agg.shape[0]} rows")
-    engine = get_engine_from_env()
-    local_pay_agg.to_sql(name='tb_local_pay_agg', con=engine, if_exists='append', index=False, method='multi')
+    write_table(local_pay_agg, 'tb_local_pay_agg', logger, runner)
     logger.info("✅ Local Pay 데이터 DB 적재 완료")
 
 # ------------------------------------------------------------------------
 # Local Pay 데이터 처리 및 적재 (원본 그대로)
 # ------------------------------------------------------------------------
-def process_local2(logger):
+def process_local2(logger, runner: AsyncRunner | None = None):
     logger.info("🚀 Local Pay 데이터 처리 시작")
     pay_files = sorted(glob.glob(LOCAL_PAY_PATTERN))
 
@@ -100,66 +147,287 @@ def process_local2(logger):
     pay_file = pay_files[-1]
     logger.info(f"Local Pay 파일: {pay_file}, grid_id 파일: {LOCAL_GRID_JSON}")
 
-    local_pay = pd.read_csv(pay_file)
+    with stage("extract", logger, file=os.path.basename(pay_file)) as rec:
+        local_pay = pd.read_csv(pay_file)
 
-    # grid JSON 로드
-    with open(LOCAL_GRID_JSON, 'r', encoding='utf-8') as f:
-        local_grid_id = json.load(f)
+        # grid JSON 로드
+        with open(LOCAL_GRID_JSON, 'r', encoding='utf-8') as f:
+            local_grid_id = compact_grid_mapping(json.load(f))
+        rec.set_rows(rows_out=local_pay)
 
-    # 날짜 변환
-    local_pay['결제년월일'] = pd.to_datetime(local_pay['결제년월일'], format='%Y-%m-%d', errors='coerce')
-    local_pay['생년월일'] = pd.to_datetime(local_pay['생년월일'], format='%Y%m%d', errors='coerce')
+    with stage("transform", logger, rows_in=local_pay, table="tb_local_pay_raw") as rec:
+        # 날짜 변환
+        local_pay['결제년월일'] = pd.to_datetime(local_pay['결제년월일'], format='%Y-%m-%d', errors='coerce')
+        local_pay['생년월일'] = pd.to_datetime(local_pay['생년월일'], format='%Y%m%d', errors='coerce')
 
-    # 기본 전처리
-    local_pay['결제년월'] = local_pay['결제년월일'].dt.strftime('%Y-%m')
-    local_pay['grid_id'] = local_pay['가맹점명'].map(local_grid_id)
-    local_pay['std_ym'] = pd.to_datetime(local_pay['결제년월']).dt.strftime("%Y%m")
+        # 기본 전처리
+        local_pay['결제년월'] = local_pay['결제년월일'].dt.strftime('%Y-%m')
+        local_pay['grid_id'] = local_pay['가맹점명'].map(local_grid_id)
+        local_pay['std_ym'] = pd.to_datetime(local_pay['결제년월']).dt.strftime("%Y%m")
 
-    # ---------------------------------------------------------
-    # 🔥 만 나이 계산 (정확하고 안정적인 pandas 공식)
-    # ---------------------------------------------------------
-    pay = local_pay["결제년월일"]
-    birth = local_pay["생년월일"]
+        # ---------------------------------------------------------
+        # 🔥 만 나이 계산 (정확하고 안정적인 pandas 공식)
+        # ---------------------------------------------------------
+        pay = local_pay["결제년월일"]
+        birth = local_pay["생년월일"]
 
-    local_pay["나이"] = (pay.dt.year - birth.dt.year - ((pay.dt.month < birth.dt.month) | ((pay.dt.month == birth.dt.month) & (pay.dt.day < birth.dt.day))).astype(int)).astype("Int64")
-    # ---------------------------------------------------------
+        local_pay["나이"] = (pay.dt.year - birth.dt.year - ((pay.dt.month < birth.dt.month) | ((pay.dt.month == birth.dt.month) & (pay.dt.day < birth.dt.day))).astype(int)).astype("Int64")
+        # ---------------------------------------------------------
 
-    # 연령대 구간화
-    bins = [10, 20, 30, 40, 50, 60, 70, 200]
-    labels = ["10대 이하", "20대", "30대", "40대", "50대", "60대", "70대이상"]
-    local_pay["연령대"] = pd.cut(local_pay["나이"], bins=bins, labels=labels)
+        # 연령대 구간화
+        bins = [10, 20, 30, 40, 50, 60, 70, 200]
+        labels = ["10대 이하", "20대", "30대", "40대", "50대", "60대", "70대이상"]
+        local_pay["연령대"] = pd.cut(local_pay["나이"], bins=bins, labels=labels)
 
-    # 추가 필드
-    local_pay['grid_id'] = local_pay['grid_id'].astype(str)
-    local_pay['reg_dttm'] = datetime.now()
+        # 추가 필드
+        local_pay['reg_dttm'] = datetime.now()
 
-    # 제거할 컬럼
-    local_pay.drop(columns=['번호',"거주지주소","가맹점주소"], inplace=True, errors='ignore')
+        # 제거할 컬럼
+        local_pay.drop(columns=['번호',"거주지주소","가맹점주소"], inplace=True, errors='ignore')
+        rec.set_rows(rows_out=local_pay)
 
     # DB 적재
-    engine = get_engine_from_env()
-    local_pay.to_sql(name='tb_local_pay_raw', con=engine, if_exists='append', index=False, method='multi')
+    write_table(local_pay, 'tb_local_pay_raw', logger, runner)
 
     logger.info("✅ Local Pay 데이터 DB 적재 완료")
 
+# ------------------------------------------------------------------------
+# 🦆 DuckDB 엔진 (원본 파일 직접 조회 + 청크 스트리밍 적재)
+# ------------------------------------------------------------------------
+def localeco_backend(backend: str | None = None) -> str:
+    backend = (backend or LOCALECO_BACKEND).lower()
+    if backend not in LOCALECO_BACKENDS:
+        raise ValueError(f"지원하지 않는 LOCALECO_BACKEND: {backend} (pandas | duckdb)")
+    return backend
+
+
+def duckdb_connect():
+    """
+    메모리 한도 / 임시 디렉토리(spill) / 스레드 수를 설정한 인메모리 DuckDB 커넥션을 반환합니다.
+    duckdb 는 선택 의존성이므로 duckdb 엔진을 사용할 때만 import 합니다.
+    """
+    import duckdb
+
+    os.makedirs(DUCKDB_TEMP_DIR, exist_ok=True)
+    con = duckdb.connect()
+    con.execute(f"SET threads = {DUCKDB_THREADS}")
+    con.execute("SET temp_directory = ?", [DUCKDB_TEMP_DIR])
+    # 결과 순서를 보존하지 않아야 스트리밍 / 병렬 처리 시 버퍼를 쌓지 않습니다.
+    con.execute("SET preserve_insertion_order = false")
+    if DUCKDB_MEMORY_LIMIT:
+        con.execute("SET memory_limit = ?", [DUCKDB_MEMORY_LIMIT])
+    return con
+
+
+def iter_duckdb_chunks(con, sql: str, params: list, chunk_rows: int = DUCKDB_CHUNK_ROWS):
+    """쿼리 결과를 chunk_rows 행 안팎의 DataFrame 으로 나눠 반환합니다. (전체 결과를 한 번에 만들지 않음)"""
+    vectors = max(1, -(-chunk_rows // 2048))  # DuckDB 벡터 = 2048 행
+    con.execute(sql, params)
+    while True:
+        chunk = con.fetch_df_chunk(vectors)
+        if chunk.empty:
+            return
+        yield chunk
+
+
+def write_chunks(chunks, table_name, logger, runner: AsyncRunner | None = None, prepare=None) -> int:
+    """
+    DataFrame 청크를 차례로 write_table 로 적재하고 총 행 수를 반환합니다.
+    runner 가 있으면 첫 청크는 (테이블 생성이 겹치지 않도록) 끝날 때까지 기다리고,
+    이후에는 DUCKDB_MAX_INFLIGHT 개까지만 적재를 겹쳐 메모리 사용량을 제한합니다.
+    """
+    total = 0
+    inflight = deque()
+    for i, chunk in enumerate(chunks):
+        if prepare is not None:
+            chunk = prepare(chunk)
+        future = write_table(chunk, table_name, logger, runner)
+        total += len(chunk)
+        if future is None:
+            continue
+        if i == 0:
+            future.result()
+            continue
+        inflight.append(future)
+        while len(inflight) >= DUCKDB_MAX_INFLIGHT:
+            inflight.popleft().result()
+    for future in inflight:
+        future.result()
+    return total
+
+
+KCB_DUCKDB_SQL = """
+SELECT
+    k.QID50 AS grid_id,
+    CAST(k.BS_YR_MON AS VARCHAR) AS std_ym,
+    k.SIC_CD_LV4 AS sic_cd_lv4,
+    i.SIC_FST_CLSFY_ITM_NM AS sic_fst_clsfy_itm_nm,
+    i.SIC_SCND_CLSFY_ITM_NM AS sic_scnd_clsfy_itm_nm,
+    k.SHOP_CNT AS shop_cnt,
+    k.OP_CNT AS op_cnt,
+    k.NEW_OPN_CNT AS new_opn_cnt,
+    k.RUN_OUT_CNT AS run_out_cnt,
+    k.TOT_SALE_AMT AS tot_sale_amt,
+    k.TOT_SALES_AMT0_CNT AS tot_sales_amt0_cnt,
+    k.TOT_SALES_AMT5_CNT AS tot_sales_amt5m_cnt
+FROM read_csv(?, delim = '|', header = true) k
+JOIN read_csv(?, delim = '|', header = true) i
+  ON CAST(k.SIC_CD_LV4 AS VARCHAR) = CAST(i.SIC_CD AS VARCHAR)
+"""
+
+
+def process_kcb_duckdb(logger, runner: AsyncRunner | None = None):
+    """
+    process_kcb 의 DuckDB 버전입니다. 결과 컬럼 / 타입은 같습니다.
+    원본 파일에서 필요한 컬럼만 읽어 업종코드와 조인하고, 결과를 청크 단위로 적재하므로
+    여러 해 이력이 쌓인 KCB 파일도 메모리에 전부 올리지 않습니다.
+    """
+    logger.info("🚀 KCB 데이터 처리 시작 (duckdb)")
+    kcb_files = sorted(glob.glob(KCB_PATTERN))
+    ind_files = sorted(glob.glob(IND_PATTERN))
+    if not kcb_files or not ind_files:
+        logger.error("❌ KCB 또는 업종코드 파일을 찾을 수 없습니다.")
+        return
+    kcb_file = kcb_files[-1]
+    ind_file = ind_files[-1]
+    logger.info(f"KCB 파일: {kcb_file}, 업종코드 파일: {ind_file}")
+
+    reg_dttm = datetime.now()
+
+    def prepare(chunk):
+        chunk['grid_id'] = to_grid_id(chunk['grid_id'])
+        chunk['reg_dttm'] = reg_dttm
+        return chunk
+
+    con = duckdb_connect()
+    try:
+        # 조회 → 정제 → 적재가 청크 단위로 겹치므로 하나의 stream 스테이지로 기록 (청크별 load 는 따로 기록)
+        with stage("stream", logger, table="tb_kcb_stat", file=os.path.basename(kcb_file),
+                   mode="duckdb") as rec:
+            chunks = iter_duckdb_chunks(con, KCB_DUCKDB_SQL, [kcb_file, ind_file])
+            rows = write_chunks(chunks, 'tb_kcb_stat', logger, runner, prepare)
+            rec.set_rows(rows_out=rows)
+    finally:
+        con.close()
+    logger.info(f"KCB 데이터 정제 / 적재 완료: {rows:,} rows")
+    logger.info("✅ KCB 데이터 DB 적재 완료")
+
+
+LOCAL_PAY_DUCKDB_SQL = """
+WITH pay AS (
+    SELECT
+        CAST(p."가맹점명" AS VARCHAR) AS merchant,
+        p."업종" AS ind_type,
+        strftime(TRY_CAST(p."결제년월일" AS DATE), '%Y%m') AS std_ym,
+        p."번호" AS pay_no,
+        p."결제금액" AS pay_amount
+    FROM read_csv(?, delim = ',', header = true) p
+)
+SELECT
+    m.grid_id,
+    pay.std_ym,
+    pay.ind_type,
+    COUNT(pay.pay_no) AS pay_cnt,
+    CAST(SUM(pay.pay_amount) AS BIGINT) AS pay_amt
+FROM pay
+JOIN merchant_grid m ON pay.merchant = m.merchant
+WHERE pay.ind_type IS NOT NULL AND pay.std_ym IS NOT NULL
+GROUP BY m.grid_id, pay.std_ym, pay.ind_type
+"""
+
+
+def process_local_duckdb(logger, runner: AsyncRunner | None = None):
+    """
+    process_local 의 DuckDB 버전입니다. 결과 컬럼 / 타입은 같습니다.
+    가맹점명 → grid_id 매핑을 테이블로 등록해 조인하고, (업종, grid_id, std_ym) 집계는
+    DuckDB 가 모든 코어로 수행합니다. (메모리 한도를 넘으면 임시 디렉토리로 내려 씀)
+    pandas groupby 와 같이 grid_id / 업종 / std_ym 이 결측인 행은 집계에서 제외합니다.
+    """
+    logger.info("🚀 Local Pay 데이터 처리 시작 (duckdb)")
+    pay_files = sorted(glob.glob(LOCAL_PAY_PATTERN))
+    if not pay_files or not os.path.exists(LOCAL_GRID_JSON):
+        logger.error("❌ Local Pay 파일 또는 grid_id 파일을 찾을 수 없습니다.")
+        return
+    pay_file = pay_files[-1]
+    logger.info(f"Local Pay 파일: {pay_file}, grid_id 파일: {LOCAL_GRID_JSON}")
+
+    with open(LOCAL_GRID_JSON, 'r', encoding='utf-8') as f:
+        local_grid_id = compact_grid_mapping(json.load(f))
+    merchant_grid = pd.DataFrame({
+        'merchant': local_grid_id.index.astype(str),
+        'grid_id': local_grid_id.to_numpy(dtype='int32'),
+    })
+    reg_dttm = datetime.now()
+
+    def prepare(chunk):
+        chunk['grid_id'] = chunk['grid_id'].astype('Int32')
+        chunk['reg_dttm'] = reg_dttm
+        return chunk
+
+    con = duckdb_connect()
+    try:
+        con.register('merchant_grid', merchant_grid)
+        with stage("stream", logger, table="tb_local_pay_agg", file=os.path.basename(pay_file),
+                   mode="duckdb") as rec:
+            chunks = iter_duckdb_chunks(con, LOCAL_PAY_DUCKDB_SQL, [pay_file])
+            rows = write_chunks(chunks, 'tb_local_pay_agg', logger, runner, prepare)
+            rec.set_rows(rows_out=rows)
+    finally:
+        con.close()
+    logger.info(f"Local Pay 집계 완료: {rows:,} rows")
+    logger.info("✅ Local Pay 데이터 DB 적재 완료")
+
+# ------------------------------------------------------------------------
+# 실행 함수 (오케스트레이터/CLI 공용 진입점)
+# ------------------------------------------------------------------------
+PROCESSORS = {
+    "kcb": [process_kcb],
+    "local": [process_local],
+    "all": [process_kcb, process_local],
+    "local2": [process_local2],
+}
+
+# duckdb 엔진일 때 바꿔 실행할 처리 (없는 처리는 pandas 그대로)
+DUCKDB_PROCESSORS = {
+    process_kcb: process_kcb_duckdb,
+    process_local: process_local_duckdb,
+}
+
+
+def run_localeco(target: str, logger, async_io: bool = False, backend: str | None = None):
+    """
+    target(kcb / local / all / local2) 에 해당하는 처리를 순서대로 실행합니다.
+    async_io 가 True 이면 적재를 asyncpg 로 겹쳐 실행하고, 반환 전에 모든 적재가 끝나기를 기다립니다.
+    backend(pandas / duckdb, 기본 LOCALECO_BACKEND) 가 duckdb 이면 kcb / local 을 DuckDB 로 처리합니다.
+    """
+    backend = localeco_backend(backend)
+    runner = AsyncRunner(app_name="localeco") if async_io else None
+    try:
+        for process in PROCESSORS[target]:
+            if backend == "duckdb":
+                process = DUCKDB_PROCESSORS.get(process, process)
+            process(logger, runner)
+        if runner is not None:
+            runner.close()
+            runner = None
+            logger.info("✅ 비동기 적재 완료")
+    finally:
+        if runner is not None:
+            runner.close()
+
 # ------------------------------------------------------------------------
 # Main Entry
 # ------------------------------------------------------------------------
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="KCB / Local Pay 데이터 처리 및 DB 적재")
-    parser.add_argument("target", type=str, choices=["kcb", "local","all","local2"], help="처리할 데이터 종류 선택")
+    parser.add_argument("target", type=str, choices=list(PROCESSORS), help="처리할 데이터 종류 선택")
+    parser.add_argument("--async-io", action="store_true", help="asyncpg COPY 로 적재를 다음 처리와 겹쳐 실행")
+    parser.add_argument("--backend", choices=LOCALECO_BACKENDS, default=None,
+                        help="집계 엔진 (기본 LOCALECO_BACKEND, duckdb 는 원본 파일을 직접 조회해 메모리 사용량 제한)")
     args = parser.parse_args()
     logger = setup_logger(f"LocalEconomy-{args.target.upper()}")
     logger.info(f"▶ 실행 대상: {args.target.upper()}")
     try:
-        if args.target == "kcb":
-            process_kcb(logger)
-        elif args.target == "local":
-            process_local(logger)
-        elif args.target == "all":
-            process_kcb(logger)
-            process_local(logger)
-        elif args.target == "local2":
-            process_local2(logger)
+        run_localeco(args.target, logger, args.async_io, args.backend)
     except Exception as e:
-        logger.exception(f"❌ 실행 중 오류 발생: {e}")
\ No newline at end of file
+        logger.exception(f"❌ 실행 중 오류 발생: {e}")
@@ -0,0 +1,494 @@
+"""
+orchestrator.py
+---------------------------------
+flowpop / pop / localeco / wifi_predict 를 하나의 상주 프로세스에서 실행하는 DAG 스케줄러
+
+- 태스크마다 의존 관계(deps), 동시 실행 수(concurrency), cron 형식 스케줄을 선언합니다.
+- 한 인터프리터 안에서 실행하므로 pandas/geopandas 임포트, 매핑 JSON, DB 커넥션 풀, wifi 모델을 한 번만 로드합니다.
+- 태스크 슬롯마다 lock 파일(fcntl.flock)을 잡아 다른 프로세스(수동 실행 포함)와 겹쳐 실행되지 않게 합니다.
+- SIGTERM / SIGINT 를 받으면 새 태스크를 시작하지 않고, 실행 중인 태스크가 끝나기를 기다린 뒤 종료합니다.
+
+사용 예)
+    python orchestrator.py serve [--wifi-http] [--flowpop-http]
+    python orchestrator.py run flowpop_load --ym 202510
+    python orchestrator.py list
+"""
+import os
+import sys
+import queue
+import fcntl
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(MODULE_DIR, "predict_model"))
+from utils import setup_logger, stage
+
+# ============================================
+# 🪶 로깅 설정
+# ============================================
+logger = setup_logger("orchestrator")
+
+LOCK_DIR = os.getenv("ORCH_LOCK_DIR", os.path.join(os.getenv("LOG_DIR", "./logs"), "locks"))
+MAX_WORKERS = int(os.getenv("ORCH_MAX_WORKERS", 3))
+SHUTDOWN_TIMEOUT = int(os.getenv("ORCH_SHUTDOWN_TIMEOUT", 600))
+
+
+# ============================================
+# ⏰ cron 표현식
+# ============================================
+class CronSchedule:
+    """
+    "분 시 일 월 요일" 5필드 cron 표현식 (*, 목록(,), 범위(-), 간격(/) 지원)
+    요일은 0(일요일)~6, 7 도 일요일로 취급합니다.
+    일/요일이 모두 지정되면 cron 과 같이 둘 중 하나만 맞아도 실행합니다.
+    """
+    FIELDS = [("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7)]
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 표현식은 5개 필드여야 합니다: {expr!r}")
+        self.expr = expr
+        self.minute, self.hour, self.day, self.month, weekday = (
+            self._parse(part, lo, hi) for part, (_, lo, hi) in zip(parts, self.FIELDS)
+        )
+        self.weekday = frozenset(v % 7 for v in weekday)
+        # cron 과 같이 "*" 로 시작하는 필드(*/2 등)는 일/요일 OR 규칙에서 제한 없음으로 취급
+        self._day_any = parts[2].startswith("*")
+        self._weekday_any = parts[4].startswith("*")
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> frozenset:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_str = part.split("/", 1)
+                step = int(step_str)
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                start, end = (int(v) for v in part.split("-", 1))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if step < 1 or start < lo or end > hi or start > end:
+                raise ValueError(f"cron 필드 범위 오류: {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def matches(self, dt: datetime) -> bool:
+        if dt.minute not in self.minute or dt.hour not in self.hour or dt.month not in self.month:
+            return False
+        day_ok = dt.day in self.day
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekday
+        if self._day_any or self._weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt: datetime, horizon_days: int = 366) -> datetime | None:
+        """dt 이후 처음 일치하는 시각(분 단위)을 반환합니다."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        end = t + timedelta(days=horizon_days)
+        while t < end:
+            if t.month not in self.month:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if t.hour not in self.hour:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if self.matches(t):
+                return t
+            t += timedelta(minutes=1)
+        return None
+
+
+# ============================================
+# 🔒 lock 파일
+# ============================================
+class FileLock:
+    """fcntl.flock 기반 비차단 lock. 프로세스가 죽으면 OS 가 자동으로 해제합니다."""
+
+    def __init__(self, name: str, lock_dir: str = LOCK_DIR):
+        os.makedirs(lock_dir, exist_ok=True)
+        self.path = os.path.join(lock_dir, f"{name}.lock")
+        self._fd = None
+
+    def acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+# ============================================
+# 🧩 태스크 정의
+# ============================================
+class Task:
+    """
+    Parameters
+    ----------
+    name : str
+        태스크 이름 (lock 파일 / 로그 / 메트릭 라벨에 사용)
+    fn : callable
+        fn(ctx: TaskContext) 형태의 실행 함수
+    deps : list[str]
+        선행 태스크. 같은 실행 안에서 선행 태스크가 모두 성공해야 시작합니다.
+    schedule : str, optional
+        cron 표현식. 없으면 수동 실행 또는 선행 태스크에 이어서만 실행됩니다.
+    concurrency : int
+        동시에 실행할 수 있는 인스턴스 수 (lock 파일 슬롯 수)
+    """
+
+    def __init__(self, name: str, fn, deps=(), schedule: str | None = None, concurrency: int = 1):
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.schedule = CronSchedule(schedule) if schedule else None
+        self.concurrency = concurrency
+        self.last_status = None
+        self.last_run = None
+
+
+class TaskContext:
+    """태스크 실행 시 전달되는 공용 객체 (중단 이벤트, 공유 리소스, 실행 파라미터)"""
+
+    def __init__(self, stop_event: threading.Event, shared: "SharedResources", params: dict):
+        self.stop_event = stop_event
+        self.shared = shared
+        self.params = params
+
+
+class SharedResources:
+    """태스크 사이에서 공유하는 무거운 객체를 처음 사용할 때 한 번만 만듭니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wifi_service = None
+        self._flowpop_reader = None
+
+    def wifi_service(self):
+        """모델/매핑/watermark 를 로드한 WifiPredictService (폴링 태스크와 HTTP 엔드포인트가 공유)"""
+        with self._lock:
+            if self._wifi_service is None:
+                from wifi_predict import WifiPredictService
+                self._wifi_service = WifiPredictService(
+                    batch_dates=int(os.getenv("WIFI_BATCH_DATES", 24)),
+                    server_agg=os.getenv("WIFI_SERVER_AGG", "0") == "1",
+                )
+            return self._wifi_service
+
+    def flowpop_reader(self):
+        """유동인구 조회 캐시 (flowpop_api.FlowpopReader)"""
+        with self._lock:
+            if self._flowpop_reader is None:
+                from flowpop_api import FlowpopReader
+                self._flowpop_reader = FlowpopReader()
+            return self._flowpop_reader
+
+
+def _previous_ym(now: datetime | None = None) -> str:
+    first = (now or datetime.now()).replace(day=1)
+    return (first - timedelta(days=1)).strftime("%Y%m")
+
+
+def task_flowpop_load(ctx: TaskContext):
+    import flowpop
+    ym = ctx.params.get("ym") or _previous_ym()
+    input_file = flowpop.find_flowpop_file(ym)
+    flowpop.logger.info(f"선택된 파일: {input_file}")
+    flowpop.load_flowpop(input_file)
+
+
+def task_flowpop_agg(ctx: TaskContext):
+    import flowpop
+    from utils import get_engine_from_env
+    ym = ctx.params.get("ym") or _previous_ym()
+    flowpop.run_sql_aggregations(ym, get_engine_from_env(app_name="flowpop"))
+
+
+def task_flowpop_rollup(ctx: TaskContext):
+    import flowpop
+    from utils import get_engine_from_env
+    ym = ctx.params.get("ym") or _previous_ym()
+    flowpop.run_rollups(ym, get_engine_from_env(app_name="flowpop"))
+
+
+def task_population(ctx: TaskContext):
+    import pop
+    pop.run_population(async_io=ctx.params.get("async_io", False))
+
+
+def task_localeco_kcb(ctx: TaskContext):
+    import localeco
+    localeco.run_localeco("kcb", setup_logger("LocalEconomy-KCB"), ctx.params.get("async_io", False))
+
+
+def task_localeco_local(ctx: TaskContext):
+    import localeco
+    localeco.run_localeco("local", setup_logger("LocalEconomy-LOCAL"), ctx.params.get("async_io", False))
+
+
+def task_wifi_predict(ctx: TaskContext):
+    ctx.shared.wifi_service().poll_once()
+
+
+def task_wifi_train(ctx: TaskContext):
+    # 상주 WifiPredictService 는 다음 폴링에서 메타데이터 trained_at 변경을 보고 새 모델로 교체합니다.
+    import train_pipeline
+    train_pipeline.run_training(ctx.params.get("months"), ctx.params.get("start"), ctx.params.get("end"),
+                                server_agg=os.getenv("WIFI_SERVER_AGG", "0") == "1")
+
+
+def _cron(name: str, default: str) -> str | None:
+    """ORCH_CRON_<NAME> 로 스케줄을 바꿀 수 있습니다. ("off" 이면 스케줄 없음)"""
+    expr = os.getenv(f"ORCH_CRON_{name.upper()}", default)
+    return None if expr.strip().lower() in ("", "off") else expr
+
+
+def default_tasks() -> list[Task]:
+    return [
+        Task("flowpop_load", task_flowpop_load, schedule=_cron("flowpop_load", "0 3 5 * *")),
+        Task("flowpop_agg", task_flowpop_agg, deps=["flowpop_load"]),
+        Task("flowpop_rollup", task_flowpop_rollup, deps=["flowpop_load"]),
+        Task("population", task_population, schedule=_cron("population", "0 4 * * *")),
+        Task("localeco_kcb", task_localeco_kcb, schedule=_cron("localeco_kcb", "0 5 5 * *")),
+        Task("localeco_local", task_localeco_local, schedule=_cron("localeco_local", "0 5 5 * *")),
+        Task("wifi_predict", task_wifi_predict, schedule=_cron("wifi_predict", "*/5 * * * *")),
+        Task("wifi_train", task_wifi_train, schedule=_cron("wifi_train", "off")),
+    ]
+
+
+# ============================================
+# 🚦 오케스트레이터
+# ============================================
+class Orchestrator:
+    def __init__(self, tasks: list[Task], max_workers: int = MAX_WORKERS):
+        self.tasks = {t.name: t for t in tasks}
+        for task in tasks:
+            missing = [d for d in task.deps if d not in self.tasks]
+            if missing:
+                raise ValueError(f"{task.name}: 알 수 없는 선행 태스크 {missing}")
+        self._downstream = {name: [t.name for t in tasks if name in t.deps] for name in self.tasks}
+        self._check_acyclic()
+        self.stop_event = threading.Event()
+        self.shared = SharedResources()
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._runs = []
+        self._runs_lock = threading.Lock()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"태스크 의존 관계에 순환이 있습니다: {' → '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.tasks[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+
+        for name in self.tasks:
+            visit(name, [])
+
+    def _closure(self, roots: list[str]) -> list[str]:
+        """roots 와 그 하위(downstream) 태스크 전체를 선언 순서대로 반환합니다."""
+        selected, stack = set(), list(roots)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self._downstream[name])
+        return [name for name in self.tasks if name in selected]
+
+    # ---------------------------------------------
+    # 태스크 1개 실행
+    # ---------------------------------------------
+    def _execute(self, task: Task, params: dict) -> str:
+        locks = [FileLock(f"{task.name}.{slot}") for slot in range(task.concurrency)]
+        lock = next((l for l in locks if l.acquire()), None)
+        if lock is None:
+            logger.warning(f"🔒 {task.name} 이미 실행 중 (슬롯 {task.concurrency}개 모두 사용 중) → 건너뜀")
+            return "skipped"
+        try:
+            with self._workers:
+                if self.stop_event.is_set():
+                    return "cancelled"
+                logger.info(f"▶ [{task.name}] 시작")
+                try:
+                    with stage("task", logger, task=task.name):
+                        task.fn(TaskContext(self.stop_event, self.shared, params))
+                except Exception as e:
+                    logger.exception(f"❌ [{task.name}] 실패: {e}")
+                    return "failed"
+                logger.info(f"✅ [{task.name}] 완료")
+                return "success"
+        finally:
+            lock.release()
+
+    # ---------------------------------------------
+    # DAG 실행
+    # ---------------------------------------------
+    def run_dag(self, roots: list[str], params: dict | None = None) -> dict[str, str]:
+        """
+        roots 와 하위 태스크를 의존 순서대로 실행합니다.
+        독립적인 태스크는 병렬로(ORCH_MAX_WORKERS 까지), 선행 태스크가 실패/건너뜀이면 하위 태스크는 skipped 처리합니다.
+        실행 범위 밖의 선행 태스크는 이 프로세스에서 마지막 실행이 실패한 경우에만 막습니다.
+        """
+        params = params or {}
+        unknown = [r for r in roots if r not in self.tasks]
+        if unknown:
+            raise KeyError(f"알 수 없는 태스크: {unknown}")
+
+        pending = self._closure(roots)
+        in_run = set(pending)
+        status = {}
+        done = queue.Queue()
+        running = 0
+
+        def worker(task):
+            result = self._execute(task, params)
+            task.last_status, task.last_run = result, datetime.now()
+            done.put((task.name, result))
+
+        while pending or running:
+            if self.stop_event.is_set():
+                for name in pending:
+                    status[name] = "cancelled"
+                pending = []
+            for name in list(pending):
+                task = self.tasks[name]
+                dep_status = [status.get(d) if d in in_run else self.tasks[d].last_status for d in task.deps]
+                if any(s in ("failed", "skipped", "cancelled") for s in dep_status if s is not None):
+                    status[name] = "skipped"
+                    pending.remove(name)
+                    logger.warning(f"⏭️ [{name}] 선행 태스크 실패로 건너뜀")
+                elif all(status.get(d) == "success" for d in task.deps if d in in_run):
+                    pending.remove(name)
+                    running += 1
+                    threading.Thread(target=worker, args=(task,), name=f"task-{name}", daemon=True).start()
+            if running:
+                name, result = done.get()
+                status[name] = result
+                running -= 1
+        return status
+
+    def submit_dag(self, roots: list[str], params: dict | None = None) -> threading.Thread:
+        """run_dag 를 백그라운드 스레드로 실행합니다. (스케줄러 루프를 막지 않도록)"""
+        thread = threading.Thread(target=self.run_dag, args=(roots, params), name="dag-" + "+".join(roots), daemon=True)
+        with self._runs_lock:
+            self._runs = [t for t in self._runs if t.is_alive()] + [thread]
+        thread.start()
+        return thread
+
+    # ---------------------------------------------
+    # 상주 스케줄러
+    # ---------------------------------------------
+    def serve(self, wifi_http: tuple[str, int] | None = None, flowpop_http: tuple[str, int] | None = None):
+        """매 분 cron 스케줄을 확인해 due 태스크를 실행합니다. SIGTERM/SIGINT 시 정상 종료합니다."""
+        instance_lock = FileLock("orchestrator")
+        if not instance_lock.acquire():
+            logger.error("❌ 다른 오케스트레이터가 이미 실행 중입니다.")
+            sys.exit(1)
+
+        def _on_signal(signum, frame):
+            logger.info(f"🛑 {signal.Signals(signum).name} 수신 → 새 태스크 중단, 실행 중 태스크 종료 대기")
+            self.stop_event.set()
+
+        signal.signal(signal.SIGTERM, _on_signal)
+        signal.signal(signal.SIGINT, _on_signal)
+
+        servers = []
+        try:
+            if wifi_http is not None:
+                servers.append(self.shared.wifi_service().serve_http(*wifi_http))
+            if flowpop_http is not None:
+                servers.append(self.shared.flowpop_reader().serve_http(*flowpop_http))
+            for task in self.tasks.values():
+                if task.schedule is not None:
+                    logger.info(f"📅 {task.name} '{task.schedule.expr}' 다음 실행: {task.schedule.next_after(datetime.now())}")
+
+            last_tick = None
+            while not self.stop_event.is_set():
+                tick = datetime.now().replace(second=0, microsecond=0)
+                if tick != last_tick:
+                    last_tick = tick
+                    due = [t.name for t in self.tasks.values() if t.schedule is not None and t.schedule.matches(tick)]
+                    if due:
+                        logger.info(f"⏰ {tick:%Y-%m-%d %H:%M} 실행 대상: {due}")
+                        self.submit_dag(due)
+                self.stop_event.wait(max(1.0, 60 - datetime.now().second))
+        finally:
+            for server in servers:
+                server.shutdown()
+            self._wait_runs(SHUTDOWN_TIMEOUT)
+            instance_lock.release()
+            logger.info("▶ 오케스트레이터 종료")
+
+    def _wait_runs(self, timeout: float):
+        deadline = datetime.now() + timedelta(seconds=timeout)
+        with self._runs_lock:
+            runs = list(self._runs)
+        for thread in runs:
+            remaining = (deadline - datetime.now()).total_seconds()
+            thread.join(max(0.0, remaining))
+        alive = [t.name for t in runs if t.is_alive()]
+        if alive:
+            logger.warning(f"⚠️ 종료 대기 시간({timeout}s) 초과, 실행 중인 작업을 남기고 종료: {alive}")
+
+
+# ============================================
+# 🧭 실행부
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL 태스크 오케스트레이터")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="cron 스케줄에 따라 상주 실행")
+    p_serve.add_argument("--wifi-http", action="store_true", help="wifi 예측 HTTP 엔드포인트도 함께 실행")
+    p_serve.add_argument("--host", default=os.getenv("WIFI_HTTP_HOST", "127.0.0.1"))
+    p_serve.add_argument("--port", type=int, default=int(os.getenv("WIFI_HTTP_PORT", 8765)))
+    p_serve.add_argument("--flowpop-http", action="store_true", help="유동인구 조회(flowpop_api) HTTP 엔드포인트도 함께 실행")
+    p_serve.add_argument("--flowpop-port", type=int, default=int(os.getenv("FLOWPOP_API_PORT", 8766)))
+
+    p_run = sub.add_parser("run", help="지정한 태스크와 하위 태스크를 즉시 1회 실행")
+    p_run.add_argument("tasks", nargs="+")
+    p_run.add_argument("--ym", help="flowpop 대상 월(YYYYMM). 없으면 전월")
+    p_run.add_argument("--async-io", action="store_true", help="pop/localeco 적재를 asyncpg 로 실행")
+
+    sub.add_parser("list", help="태스크 / 의존 관계 / 다음 실행 시각 출력")
+
+    args = parser.parse_args()
+    orchestrator = Orchestrator(default_tasks())
+
+    if args.command == "serve":
+        orchestrator.serve((args.host, args.port) if args.wifi_http else None,
+                           (args.host, args.flowpop_port) if args.flowpop_http else None)
+    elif args.command == "run":
+        result = orchestrator.run_dag(args.tasks, {"ym": args.ym, "async_io": args.async_io})
+        logger.info(f"🎯 실행 결과: {result}")
+        print(result)
+        sys.exit(0 if all(s == "success" for s in result.values()) else 1)
+    else:
+        now = datetime.now()
+        for task in orchestrator.tasks.values():
+            schedule = task.schedule.expr if task.schedule else "-"
+            next_run = task.schedule.next_after(now) if task.schedule else "-"
+            print(f"{task.name:16s} deps={task.deps or '-'}  schedule={schedule:14s} next={next_run}")
@@ -7,6 +7,11 @@ from datetime import datetime, timedelta
 from utils import *
 import re
 import json
+import argparse
+import os
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 # ===============================
@@ -39,14 +44,21 @@ def load_sql_sections(file_path: str) -> dict[str, str]:
 # ===============================
 # 🧩 2. SQL 실행 / 적재 함수
 # ===============================
-def run_sql(engine, query: str, params: dict | None = None) -> pd.DataFrame:
+def run_sql(engine, query: str, params: dict | None = None, name: str = "run_sql") -> pd.DataFrame:
+    """쿼리 결과를 DataFrame 으로 반환합니다. name 은 SQL 프로파일링(SQL_PROFILE=1) 저장 이름입니다."""
     with engine.connect() as conn:
-        result = conn.execute(text(query), params or {})
+        result = profiled_execute_sa(conn, name, query, params)
         df = pd.DataFrame(result.fetchall(), columns=result.keys())
     return df
 
 
+def to_storage(df: pd.DataFrame) -> pd.DataFrame:
+    """int32 grid_id 를 GRID_ID_STORAGE(char | int) 형식으로 바꿔 적재용 DataFrame 을 만듭니다."""
+    return df.assign(grid_id=grid_id_for_storage(df['grid_id']))
+
+
 def write_to_db(df: pd.DataFrame, table_name: str, engine, schema: str = None, if_exists: str = "replace"):
+    df = to_storage(df)
     df.to_sql(
         name=table_name,
         con=engine,
@@ -146,13 +158,23 @@ def find_full_addr_id(
 # ===============================
 # 📦 4. 매핑 데이터 로드
 # ===============================
-addr_id_map = json.load(open("../data/json/addr_id_map.json"))
-pop_grid_id = json.load(open("../data/json/pop_grid_id.json"))
+@functools.lru_cache(maxsize=None)
+def load_mappings() -> tuple[dict, dict]:
+    """
+    주소 → 주소명(addr_id_map), 주소명 → grid_id(pop_grid_id) 매핑을 처음 사용할 때 한 번만 읽습니다.
+    (임포트 시점에 큰 JSON 을 파싱하지 않도록 지연 로드)
+    pop_grid_id 는 검증된 Int32 Series 로 변환되며, 결측 sentinel 이 들어 있는 주소는 제외됩니다.
+    """
+    with open("../data/json/addr_id_map.json", encoding="utf-8") as f:
+        addr_id_map = json.load(f)
+    with open("../data/json/pop_grid_id.json", encoding="utf-8") as f:
+        pop_grid_id = compact_grid_mapping(json.load(f))
+    return addr_id_map, pop_grid_id
 
 # ===============================
 # 🧹 5. 전처리 함수들
 # ===============================
-def preprocess_household(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) -> pd.DataFrame:
+def preprocess_household(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: pd.Series) -> pd.DataFrame:
     # 1) 주소 매핑
     df['full_addr_id'] = df.apply(find_full_addr_id, axis=1)
     df['full_addr_name'] = df['full_addr_id'].map(addr_id_map)
@@ -160,9 +182,9 @@ def preprocess_household(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict)
     # 2) grid 매핑
     df['grid_id'] = df['full_addr_name'].map(pop_grid_id)
 
-    # 3) 유효 grid만 남기기
-    df = df[df['grid_id'].notnull() & (df['grid_id'].str.len() == 8)]
-    df['grid_id'] = df['grid_id'].astype(str)
+    # 3) 유효 grid만 남기기 (pop_grid_id 는 검증된 Int32 매핑이므로 미매칭만 <NA>)
+    df = df[df['grid_id'].notna()]
+    df['grid_id'] = df['grid_id'].astype("int32")
 
     # 4) 세대 규모 집계
     gb_df = df.groupby(['grid_id'], as_index=False).agg(
@@ -174,7 +196,7 @@ def preprocess_household(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict)
     )
     return gb_df
 
-def preprocess_inflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) -> pd.DataFrame:
+def preprocess_inflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: pd.Series) -> pd.DataFrame:
     df['full_addr_id'] = df.apply(
         lambda row: find_full_addr_id(
             row,
@@ -189,8 +211,8 @@ def preprocess_inflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) ->
     df['full_addr_name'] = df['full_addr_id'].map(addr_id_map)
     df['grid_id'] = df['full_addr_name'].map(pop_grid_id)
     df['gens'] = (df['age'] // 10 * 10).astype(int)
-    df = df[df['grid_id'].notnull() & (df['grid_id'].str.len() == 8)]
-    df['grid_id'] = df['grid_id'].astype(str)
+    df = df[df['grid_id'].notna()]
+    df['grid_id'] = df['grid_id'].astype("int32")
     df['gender'] = df['gender'].astype(str)
     df['gens'] = df['gens'].astype(str)
     df = df.groupby(['grid_id', 'gender', 'gens'], as_index=False).agg(
@@ -198,7 +220,7 @@ def preprocess_inflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) ->
     )
     return df
 
-def preprocess_outflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) -> pd.DataFrame:
+def preprocess_outflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: pd.Series) -> pd.DataFrame:
     df['full_addr_id'] = df.apply(
         lambda row: find_full_addr_id(
             row,
@@ -213,8 +235,8 @@ def preprocess_outflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) -
     df['full_addr_name'] = df['full_addr_id'].map(addr_id_map)
     df['grid_id'] = df['full_addr_name'].map(pop_grid_id)
     df['gens'] = (df['age'] // 10 * 10).astype(int)
-    df = df[df['grid_id'].notnull() & (df['grid_id'].str.len() == 8)]
-    df['grid_id'] = df['grid_id'].astype(str)
+    df = df[df['grid_id'].notna()]
+    df['grid_id'] = df['grid_id'].astype("int32")
     df['gender'] = df['gender'].astype(str)
     df['gens'] = df['gens'].astype(str)
     df = df.groupby(['grid_id', 'gender', 'gens'], as_index=False).agg(
@@ -222,13 +244,13 @@ def preprocess_outflow(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) -
     )
     return df
 
-def preprocess_totpop(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) -> pd.DataFrame:
+def preprocess_totpop(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: pd.Series) -> pd.DataFrame:
     df['full_addr_id'] = df.apply(find_full_addr_id, axis=1)
     df['full_addr_name'] = df['full_addr_id'].map(addr_id_map)
     df['grid_id'] = df['full_addr_name'].map(pop_grid_id)
     df['gens'] = (df['age'] // 10 * 10).astype(int)
-    df = df[df['grid_id'].notnull() & (df['grid_id'].str.len() == 8)]
-    df['grid_id'] = df['grid_id'].astype(str)
+    df = df[df['grid_id'].notna()]
+    df['grid_id'] = df['grid_id'].astype("int32")
     df['gender'] = df['gender'].astype(str)
     df['gens'] = df['gens'].astype(str)
     df = df.groupby(['grid_id', 'gens', 'gender'], as_index=False).agg(
@@ -239,36 +261,261 @@ def preprocess_totpop(df: pd.DataFrame, addr_id_map: dict, pop_grid_id: dict) ->
 ## ==============================
 # 🚀 파이프라인 실행 함수
 ## ==============================
+SQL_PATH = '../sql/yeosu_query_251113.sql'
+# 쿼리 파일의 스냅샷 파라미터 (None 이면 테이블별 최신 data_crtr_dt)
+SNAPSHOT_PARAM = "snapshot_dt"
+
+
+def to_asyncpg_params(query: str) -> str:
+    """:snapshot_dt 를 asyncpg 위치 파라미터 $1 로 바꿉니다."""
+    return re.sub(rf"(?<!:):{SNAPSHOT_PARAM}\b", "$1", query)
+
+
 def run_pipeline_step(step_name: str, query_key: str, preprocess_fn, output_table: str,
                       engine, queries, addr_id_map, pop_grid_id):
     logger.info(f"▶ {step_name} 시작")
 
-    df = run_sql(engine, queries[query_key])
-    df = preprocess_fn(df, addr_id_map, pop_grid_id)
-    write_to_db(df, output_table, engine)
+    with stage("extract", logger, table=output_table) as rec:
+        df = run_sql(engine, queries[query_key], {SNAPSHOT_PARAM: None}, name=f"population.{output_table}")
+        rec.set_rows(rows_out=df)
+    with stage("preprocess", logger, rows_in=df, table=output_table) as rec:
+        df = preprocess_fn(df, addr_id_map, pop_grid_id)
+        rec.set_rows(rows_out=df)
+    with stage("load", logger, rows_in=df, table=output_table):
+        write_to_db(df, output_table, engine)
 
     logger.info(f"✅ {step_name} 완료")
 
 
+async def run_pipeline_async(pipeline_steps, queries, addr_id_map, pop_grid_id):
+    """
+    asyncpg 로 4개 추출 쿼리를 동시에 실행하고,
+    전처리가 끝나는 단계부터 바로 COPY 적재를 시작해 조회/적재를 겹쳐 실행합니다.
+    """
+    pool = await get_async_pool(app_name="population")
+    gate = ConcurrencyGate()
+
+    async def extract(query, table):
+        with stage("extract", logger, table=table, mode="async") as rec:
+            df = await fetch_df(pool, to_asyncpg_params(query), None, name=f"population.{table}")
+            rec.set_rows(rows_out=df)
+        return df
+
+    async def load(df, table):
+        with stage("load", logger, rows_in=df, table=table, mode="async"):
+            await copy_df_to_table(pool, to_storage(df), table, if_exists="replace")
+
+    try:
+        logger.info("▶ 추출 쿼리 동시 실행 시작")
+        frames = await gate.gather(*(extract(queries[q_key], table) for _, q_key, _, table in pipeline_steps))
+        logger.info("✅ 추출 쿼리 완료")
+
+        writes = []
+        for (step_name, _, fn, table), df in zip(pipeline_steps, frames):
+            logger.info(f"▶ {step_name} 전처리 시작")
+            with stage("preprocess", logger, rows_in=df, table=table, mode="async") as rec:
+                df = await asyncio.to_thread(fn, df, addr_id_map, pop_grid_id)
+                rec.set_rows(rows_out=df)
+            writes.append(asyncio.create_task(gate.run(load(df, table))))
+            logger.info(f"✅ {step_name} 전처리 완료 → {table} 적재 시작")
+        await asyncio.gather(*writes)
+    finally:
+        await close_async_pools()
 
-# ===============================
-# 🚀 메인 파이프라인
-# ===============================
-logger = setup_logger("population")
-logger.info("🏁 파이프라인 시작")
 
-engine = get_engine_from_env()
-queries = load_sql_sections('../sql/yeosu_query_251113.sql')
+logger = setup_logger("population")
 
-pipeline_steps = [
+PIPELINE_STEPS = [
     ("세대별", "1", preprocess_household, "tb_pop_household_count"),
     ("전입자", "2", preprocess_inflow, "tb_pop_inflow_count"),
     ("전출자", "3", preprocess_outflow, "tb_pop_outflow_count"),
     ("총인구", "4", preprocess_totpop, "tb_pop_total_count"),
 ]
 
-for step_name, q_key, fn, table in pipeline_steps:
-    run_pipeline_step(step_name, q_key, fn, table,
-                      engine, queries, addr_id_map, pop_grid_id)
 
-logger.info("🎯 전체 파이프라인 완료")
+def run_population(async_io: bool = False):
+    """주민등록 인구 4개 집계 테이블을 갱신합니다. (오케스트레이터/CLI 공용 진입점)"""
+    logger.info("🏁 파이프라인 시작")
+
+    queries = load_sql_sections(SQL_PATH)
+    addr_id_map, pop_grid_id = load_mappings()
+
+    if async_io:
+        asyncio.run(run_pipeline_async(PIPELINE_STEPS, queries, addr_id_map, pop_grid_id))
+    else:
+        engine = get_engine_from_env(app_name="population")
+        for step_name, q_key, fn, table in PIPELINE_STEPS:
+            run_pipeline_step(step_name, q_key, fn, table,
+                              engine, queries, addr_id_map, pop_grid_id)
+
+    logger.info("🎯 전체 파이프라인 완료")
+
+
+# ===============================
+# 🕰️ 스냅샷 백필 (data_crtr_dt 별 이력)
+# ===============================
+# 최신 스냅샷만 덮어쓰는 run_population 과 달리, 원천에 있는 모든 data_crtr_dt 를 스냅샷별로 처리해
+# tb_pop_*_hist 테이블에 snapshot_dt 컬럼과 함께 누적합니다.
+# 스냅샷 × 출력 테이블 단위 처리 이력은 tb_pop_snapshot_log 에 데이터와 같은 트랜잭션으로 기록되며,
+# 이미 기록된 (스냅샷, 테이블) 은 다시 실행해도 건너뜁니다.
+SNAPSHOT_SOURCE_TABLES = ["tb_gmc_hshldr_info", "tb_gmc_fmbr_info", "tb_gmc_mvin_info", "tb_gmc_mvout_info"]
+SNAPSHOT_LOG_TABLE = "tb_pop_snapshot_log"
+BACKFILL_WORKERS = int(os.getenv("POP_BACKFILL_WORKERS", "2"))
+
+CREATE_SNAPSHOT_LOG = f"""
+CREATE TABLE IF NOT EXISTS public.{SNAPSHOT_LOG_TABLE} (
+    snapshot_dt     VARCHAR(20) NOT NULL,
+    output_table    VARCHAR(100) NOT NULL,
+    row_cnt         INTEGER,
+    reg_dttm        TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (snapshot_dt, output_table)
+);
+"""
+
+_WORKER_STATE = {}
+
+
+def hist_table(output_table: str) -> str:
+    return f"{output_table}_hist"
+
+
+def list_snapshots(engine, since=None) -> list:
+    """주민등록 원천 테이블들에 있는 data_crtr_dt 를 오름차순으로 반환합니다. (since 이후만)"""
+    union = "\n    UNION\n    ".join(f"SELECT DISTINCT data_crtr_dt FROM {t}" for t in SNAPSHOT_SOURCE_TABLES)
+    query = f"SELECT data_crtr_dt FROM (\n    {union}\n) s WHERE data_crtr_dt IS NOT NULL"
+    df = run_sql(engine, query + " ORDER BY 1", name="population.list_snapshots")
+    snapshots = df["data_crtr_dt"].tolist()
+    if since is not None:
+        snapshots = [s for s in snapshots if str(s) >= str(since)]
+    return snapshots
+
+
+def processed_snapshots(engine) -> dict[str, set]:
+    """{스냅샷 키(str): 처리 완료된 출력 테이블 set}"""
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_SNAPSHOT_LOG))
+        rows = conn.execute(text(f"SELECT snapshot_dt, output_table FROM public.{SNAPSHOT_LOG_TABLE}")).fetchall()
+    done = {}
+    for snapshot_key, table in rows:
+        done.setdefault(snapshot_key, set()).add(table)
+    return done
+
+
+def write_snapshot(df: pd.DataFrame, output_table: str, snapshot_dt, engine):
+    """
+    한 스냅샷의 결과를 output_table 에 교체 적재하고 처리 이력을 남깁니다. (한 트랜잭션)
+    같은 테이블에 쓰는 워커끼리는 advisory lock 으로 순서대로 커밋합니다. (최초 테이블 생성 경합 방지)
+    """
+    df = to_storage(df)
+    df.insert(0, SNAPSHOT_PARAM, snapshot_dt)
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:t))"), {"t": output_table})
+        if conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": f"public.{output_table}"}).scalar():
+            conn.execute(text(f"DELETE FROM public.{output_table} WHERE {SNAPSHOT_PARAM} = :s"), {"s": snapshot_dt})
+        df.to_sql(name=output_table, con=conn, if_exists="append", index=False, method="multi")
+        conn.execute(text(f"""
+            INSERT INTO public.{SNAPSHOT_LOG_TABLE} (snapshot_dt, output_table, row_cnt)
+            VALUES (:s, :t, :n)
+            ON CONFLICT (snapshot_dt, output_table)
+            DO UPDATE SET row_cnt = EXCLUDED.row_cnt, reg_dttm = now()
+        """), {"s": str(snapshot_dt), "t": output_table, "n": len(df)})
+
+
+def _init_backfill_worker():
+    # 워커 프로세스마다 쿼리/주소 매핑을 한 번만 읽습니다.
+    _WORKER_STATE["queries"] = load_sql_sections(SQL_PATH)
+    _WORKER_STATE["mappings"] = load_mappings()
+
+
+def run_snapshot(snapshot_dt, skip_tables=()) -> tuple[str, int]:
+    """
+    스냅샷 하나의 4개 집계를 만들어 *_hist 테이블에 적재합니다. (백필 워커 진입점)
+
+    Returns
+    -------
+    (str, int)
+        스냅샷 키, 적재한 출력 테이블 수
+    """
+    if not _WORKER_STATE:
+        _init_backfill_worker()
+    queries = _WORKER_STATE["queries"]
+    addr_id_map, pop_grid_id = _WORKER_STATE["mappings"]
+    engine = get_engine_from_env(app_name="population")
+    snapshot_key = str(snapshot_dt)
+
+    written = 0
+    for step_name, q_key, fn, table in PIPELINE_STEPS:
+        output_table = hist_table(table)
+        if output_table in skip_tables:
+            continue
+        with stage("extract", logger, table=output_table, snapshot=snapshot_key) as rec:
+            df = run_sql(engine, queries[q_key], {SNAPSHOT_PARAM: snapshot_dt}, name=f"population.{table}")
+            rec.set_rows(rows_out=df)
+        with stage("preprocess", logger, rows_in=df, table=output_table, snapshot=snapshot_key) as rec:
+            df = fn(df, addr_id_map, pop_grid_id)
+            rec.set_rows(rows_out=df)
+        with stage("load", logger, rows_in=df, table=output_table, snapshot=snapshot_key):
+            write_snapshot(df, output_table, snapshot_dt, engine)
+        written += 1
+        logger.info(f"✅ [{snapshot_key}] {step_name} → {output_table} ({len(df):,}행)")
+    return snapshot_key, written
+
+
+def run_backfill(workers: int | None = None, since=None, force: bool = False):
+    """
+    원천의 모든 data_crtr_dt 스냅샷을 workers 개 프로세스로 나눠 *_hist 테이블에 적재합니다.
+
+    Parameters
+    ----------
+    workers : int, optional
+        병렬 프로세스 수 (기본 POP_BACKFILL_WORKERS). 1 이면 현재 프로세스에서 순서대로 처리합니다.
+    since : date | str, optional
+        이 스냅샷 이후(포함)만 처리
+    force : bool
+        처리 이력과 상관없이 다시 적재
+    """
+    workers = workers or BACKFILL_WORKERS
+    engine = get_engine_from_env(app_name="population")
+    snapshots = list_snapshots(engine, since)
+    done = processed_snapshots(engine)
+    if force:
+        done = {}
+
+    all_tables = {hist_table(table) for *_, table in PIPELINE_STEPS}
+    todo = [(s, done.get(str(s), set())) for s in snapshots if not all_tables <= done.get(str(s), set())]
+    logger.info(f"🕰️ 스냅샷 {len(snapshots)}개 중 {len(todo)}개 처리 (완료 {len(snapshots) - len(todo)}개 건너뜀, "
+                f"워커 {min(workers, max(len(todo), 1))}개)")
+    if not todo:
+        return []
+
+    finished = []
+    if workers <= 1 or len(todo) == 1:
+        for snapshot_dt, skip in todo:
+            finished.append(run_snapshot(snapshot_dt, skip))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=_init_backfill_worker) as pool:
+            futures = {pool.submit(run_snapshot, s, skip): s for s, skip in todo}
+            for future in as_completed(futures):
+                finished.append(future.result())
+                logger.info(f"🕰️ 스냅샷 완료 {len(finished)}/{len(todo)}: {finished[-1][0]}")
+    logger.info("🎯 스냅샷 백필 완료")
+    return finished
+
+
+# ===============================
+# 🚀 메인 파이프라인
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="주민등록 인구 격자 집계")
+    parser.add_argument("--async-io", action="store_true", help="asyncpg 로 추출/적재를 동시 실행")
+    parser.add_argument("--backfill", action="store_true",
+                        help="모든 data_crtr_dt 스냅샷을 *_hist 테이블에 적재 (처리된 스냅샷은 건너뜀)")
+    parser.add_argument("--workers", type=int, default=None, help="백필 병렬 프로세스 수 (기본 POP_BACKFILL_WORKERS)")
+    parser.add_argument("--since", help="백필 시작 스냅샷 (YYYY-MM-DD, 포함)")
+    parser.add_argument("--force", action="store_true", help="처리 이력과 상관없이 다시 백필")
+    args = parser.parse_args()
+
+    if args.backfill:
+        run_backfill(args.workers, since=args.since, force=args.force)
+    else:
+        run_population(args.async_io)
@@ -0,0 +1,281 @@
+"""
+compiled_model.py
+---------------------------------
+xgb_quantile_bundle.joblib (QuantileTransformer + OneHotEncoder + XGBRegressor 파이프라인)을
+라이브러리 버전과 무관한 NumPy 배열(npz)로 변환하고, 벡터화된 NumPy 평가기로 예측합니다.
+
+- export : joblib 번들 → 트리 노드 배열 + 변환기 분위수 배열 (.npz)
+- load   : npz 만 읽으므로 sklearn / xgboost import 가 필요 없습니다.
+
+사용법
+    python compiled_model.py export            # 번들 변환 + 원본 model.predict 와 오차 검증
+"""
+import os
+import json
+import argparse
+import numpy as np
+
+COMPILED_FORMAT_VERSION = 1
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUNDLE_PATH = os.path.join(MODEL_DIR, "xgb_quantile_bundle.joblib")
+DEFAULT_METADATA_PATH = os.path.join(MODEL_DIR, "xgb_quantile_metadata.json")
+DEFAULT_COMPILED_PATH = os.path.join(MODEL_DIR, "xgb_quantile_compiled.npz")
+
+# sklearn QuantileTransformer 와 동일한 경계값
+BOUNDS_THRESHOLD = 1e-7
+
+
+# ============================================
+# 📦 번들 → 배열 변환
+# ============================================
+def _parse_base_score(booster) -> float:
+    config = json.loads(booster.save_config())
+    base_score = config["learner"]["learner_model_param"]["base_score"]
+    # xgboost 3.x 는 "[1.2E1]" 형태의 벡터 문자열로 저장
+    return float(str(base_score).strip("[]").split(",")[0])
+
+
+def _flatten_trees(booster, feature_index: dict):
+    """booster 의 트리를 [n_trees, max_nodes] 크기의 노드 배열로 변환합니다."""
+    trees = [json.loads(t) for t in booster.get_dump(dump_format="json")]
+
+    def walk(node, out):
+        out[node["nodeid"]] = node
+        for child in node.get("children", []):
+            walk(child, out)
+        return out
+
+    flat = [walk(t, {}) for t in trees]
+    max_nodes = max(max(nodes) + 1 for nodes in flat)
+    n_trees = len(flat)
+
+    feature = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+    threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    yes = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    no = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    missing = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+
+    for t, nodes in enumerate(flat):
+        for nid, node in nodes.items():
+            if "leaf" in node:
+                value[t, nid] = node["leaf"]
+                continue
+            feature[t, nid] = feature_index[node["split"]]
+            threshold[t, nid] = np.float32(node["split_condition"])
+            yes[t, nid] = node["yes"]
+            no[t, nid] = node["no"]
+            missing[t, nid] = node["missing"]
+
+    depth = int(max(_depth(t) for t in trees))
+    return feature, threshold, yes, no, missing, value, depth
+
+
+def _depth(node) -> int:
+    children = node.get("children", [])
+    return 0 if not children else 1 + max(_depth(c) for c in children)
+
+
+def export_bundle(bundle_path: str = DEFAULT_BUNDLE_PATH, metadata_path: str = DEFAULT_METADATA_PATH,
+                  output_path: str = DEFAULT_COMPILED_PATH) -> str:
+    """
+    joblib 번들을 npz 배열 포맷으로 변환해 저장합니다.
+
+    QuantileTransformer(normal) 의 norm.ppf 는 단조 증가이므로 실행 시점에 ppf 를 계산하지 않고,
+    트리 분기 임계값을 균등분포(0~1) 공간으로 미리 변환(norm.cdf)해 둡니다.
+    xgboost 의 float32 비교 규칙도 임계값에 반영하므로 분위수 경계에 걸친 값도 같은 가지로 분기합니다.
+    """
+    import joblib
+    from scipy.stats import norm
+
+    bundle = joblib.load(bundle_path)
+    with open(metadata_path, "r") as f:
+        meta = json.load(f)
+
+    pipe = bundle["model"]
+    pre = pipe.named_steps["preprocess"]
+    reg = pipe.named_steps["regressor"]
+    qt = pre.named_transformers_["num"]
+    ohe = pre.named_transformers_["cat"]
+
+    numeric_features = list(bundle["numeric_features"])
+    categorical_features = list(bundle["categorical_features"])
+
+    # 변환 후 컬럼 순서: [분위수 변환 수치형..., 원-핫 범주형...]
+    categories = [np.asarray(c, dtype=np.float64) for c in ohe.categories_]
+    n_out = len(numeric_features) + sum(len(c) for c in categories)
+
+    booster = reg.get_booster()
+    names = booster.feature_names or [f"f{i}" for i in range(n_out)]
+    feature_index = {name: i for i, name in enumerate(names)}
+    feature, threshold, yes, no, missing, value, depth = _flatten_trees(booster, feature_index)
+
+    # 수치형 분기 임계값을 균등분포 공간으로 변환
+    # xgboost 는 float32(z) < t 로 비교하므로, float64 기준 경계는 t 와 바로 아래 float32 값의 중점
+    numeric_split = (feature >= 0) & (feature < len(numeric_features))
+    t32 = threshold[numeric_split].astype(np.float32)
+    t = (t32.astype(np.float64) + np.nextafter(t32, np.float32(-np.inf)).astype(np.float64)) / 2
+    if qt.output_distribution == "normal":
+        clip_min = norm.ppf(BOUNDS_THRESHOLD - np.spacing(1))
+        clip_max = norm.ppf(1 - (BOUNDS_THRESHOLD - np.spacing(1)))
+        t = np.where(t > clip_max, np.inf, np.where(t <= clip_min, -np.inf, norm.cdf(t)))
+    threshold[numeric_split] = t
+
+    info = {
+        "format_version": COMPILED_FORMAT_VERSION,
+        "trained_at": meta["trained_at"],
+        "numeric_features": numeric_features,
+        "categorical_features": categorical_features,
+        "output_distribution": qt.output_distribution,
+        "base_score": _parse_base_score(booster),
+        "max_depth": depth,
+        "label_classes": [str(c) for c in bundle["label_encoder"].classes_],
+    }
+    cat_arrays = {f"categories_{i}": c for i, c in enumerate(categories)}
+
+    np.savez_compressed(
+        output_path,
+        info=np.array(json.dumps(info, ensure_ascii=False)),
+        quantiles=np.asarray(qt.quantiles_, dtype=np.float64),
+        references=np.asarray(qt.references_, dtype=np.float64),
+        feature=feature, threshold=threshold, yes=yes, no=no, missing=missing, value=value,
+        **cat_arrays,
+    )
+    return output_path
+
+
+# ============================================
+# ⚡ NumPy 평가기
+# ============================================
+class CompiledLabelEncoder:
+    """sklearn LabelEncoder.transform 과 동일하게 동작하는 최소 구현 (미학습 라벨은 ValueError)."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def transform(self, y):
+        y = np.asarray(y).astype(self.classes_.dtype)
+        pos = np.searchsorted(self.classes_, y).clip(0, len(self.classes_) - 1)
+        if not (self.classes_[pos] == y).all():
+            raise ValueError(f"y contains previously unseen labels: {np.setdiff1d(y, self.classes_)}")
+        return pos
+
+
+class CompiledModel:
+    """
+    npz 로 변환된 XGB quantile 파이프라인을 NumPy 만으로 평가합니다.
+    predict(X) 는 원본 Pipeline.predict 와 허용 오차 내에서 같은 값을 반환합니다.
+    """
+
+    def __init__(self, arrays):
+        self.info = json.loads(str(arrays["info"]))
+        if self.info["format_version"] != COMPILED_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 compiled 모델 포맷: {self.info['format_version']}")
+        self.numeric_features = self.info["numeric_features"]
+        self.categorical_features = self.info["categorical_features"]
+        self.trained_at = self.info["trained_at"]
+        self.quantiles = arrays["quantiles"]
+        self.references = arrays["references"]
+        self.categories = [arrays[f"categories_{i}"] for i in range(len(self.categorical_features))]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.yes = arrays["yes"]
+        self.no = arrays["no"]
+        self.missing = arrays["missing"]
+        self.value = arrays["value"]
+        self.base_score = self.info["base_score"]
+        self.max_depth = self.info["max_depth"]
+        self.label_encoder = CompiledLabelEncoder(self.info["label_classes"])
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_COMPILED_PATH) -> "CompiledModel":
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({k: arrays[k] for k in arrays.files})
+
+    def _quantile_transform(self, X: np.ndarray) -> np.ndarray:
+        """QuantileTransformer 의 균등분포(0~1) 단계까지 계산합니다. (normal 의 ppf 는 임계값에 반영됨)"""
+        out = np.empty_like(X)
+        for j in range(X.shape[1]):
+            col = X[:, j]
+            q = self.quantiles[:, j]
+            ref = self.references
+            if self.info["output_distribution"] == "normal":
+                lower = col - BOUNDS_THRESHOLD < q[0]
+                upper = col + BOUNDS_THRESHOLD > q[-1]
+            else:
+                lower = col == q[0]
+                upper = col == q[-1]
+            finite = ~np.isnan(col)
+            res = np.full_like(col, np.nan)
+            res[finite] = 0.5 * (
+                np.interp(col[finite], q, ref) - np.interp(-col[finite], -q[::-1], -ref[::-1])
+            )
+            res[upper] = 1.0
+            res[lower] = 0.0
+            out[:, j] = res
+        return out
+
+    def transform(self, X) -> np.ndarray:
+        """원본 피처(numeric + categorical 순서)를 트리 입력 공간으로 변환합니다."""
+        if hasattr(X, "loc"):
+            X = X[self.numeric_features + self.categorical_features].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        n_num = len(self.numeric_features)
+        parts = [self._quantile_transform(X[:, :n_num])]
+        for j, cats in enumerate(self.categories):
+            parts.append((X[:, n_num + j][:, None] == cats[None, :]).astype(np.float64))
+        return np.hstack(parts)
+
+    def predict(self, X, batch_size: int = 65536) -> np.ndarray:
+        Z = self.transform(X)
+        out = np.empty(len(Z), dtype=np.float64)
+        n_trees = self.feature.shape[0]
+        tree_idx = np.arange(n_trees)[None, :]
+        for start in range(0, len(Z), batch_size):
+            Zb = Z[start:start + batch_size]
+            rows = np.arange(len(Zb))[:, None]
+            node = np.zeros((len(Zb), n_trees), dtype=np.int32)
+            for _ in range(self.max_depth):
+                feat = self.feature[tree_idx, node]
+                is_leaf = feat < 0
+                if is_leaf.all():
+                    break
+                x = Zb[rows, feat.clip(0)]
+                nxt = np.where(x < self.threshold[tree_idx, node], self.yes[tree_idx, node], self.no[tree_idx, node])
+                nxt = np.where(np.isnan(x), self.missing[tree_idx, node], nxt)
+                node = np.where(is_leaf, node, nxt)
+            out[start:start + len(Zb)] = self.base_score + self.value[tree_idx, node].sum(axis=1)
+        return out
+
+
+def verify(bundle_path: str = DEFAULT_BUNDLE_PATH, compiled_path: str = DEFAULT_COMPILED_PATH,
+           n_samples: int = 20000, seed: int = 42) -> float:
+    """원본 번들과 compiled 모델의 예측 최대 절대 오차를 반환합니다."""
+    import joblib
+    import pandas as pd
+
+    bundle = joblib.load(bundle_path)
+    compiled = CompiledModel.load(compiled_path)
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "acs_cnt": rng.integers(0, 2000, n_samples),
+        "hour": rng.integers(0, 24, n_samples),
+        "month": rng.integers(1, 13, n_samples),
+        "is_weekend_group": rng.integers(0, 2, n_samples),
+    })[compiled.numeric_features + compiled.categorical_features]
+    return float(np.abs(bundle["model"].predict(X) - compiled.predict(X)).max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XGB quantile 번들 → NumPy 배열 변환")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--metadata", default=DEFAULT_METADATA_PATH)
+    parser.add_argument("--output", default=DEFAULT_COMPILED_PATH)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        path = export_bundle(args.bundle, args.metadata, args.output)
+        print(f"✅ compiled 모델 저장 완료: {path}")
+    print(f"🔎 최대 절대 오차: {verify(args.bundle, args.output):.6g}")
@@ -0,0 +1,100 @@
+"""
+prediction_cache.py
+---------------------------------
+피처 조합(acs_cnt, hour, month, is_weekend_group) 단위 예측값 캐시
+
+- 배치 안에서 동일한 피처 벡터는 한 번만 예측합니다.
+- 예측값은 크기 제한 LRU 로 파일에 저장되어 다음 실행에서도 재사용됩니다.
+- 메타데이터의 trained_at 이 바뀌면(모델 재학습) 캐시는 자동으로 비워집니다.
+"""
+import os
+import json
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+class PredictionCache:
+    """
+    Parameters
+    ----------
+    path : str
+        캐시 파일 경로 (JSON)
+    trained_at : str
+        모델 버전. 파일에 저장된 값과 다르면 기존 캐시를 버립니다.
+    max_entries : int
+        LRU 최대 항목 수
+    """
+
+    def __init__(self, path: str, trained_at: str, max_entries: int = 200_000):
+        self.path = path
+        self.trained_at = trained_at
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("trained_at") != self.trained_at:
+            return
+        for *key, value in data.get("entries", []):
+            self.entries[tuple(key)] = value
+
+    def save(self):
+        """변경된 경우에만 캐시 파일을 원자적으로 교체합니다. (최근 사용 순서 유지)"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        payload = {
+            "trained_at": self.trained_at,
+            "entries": [[*key, value] for key, value in self.entries.items()],
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def predict(self, model, X: pd.DataFrame) -> np.ndarray:
+        """
+        X 의 고유 피처 조합 중 캐시에 없는 것만 model.predict 로 계산하고,
+        원래 행 순서대로 예측값 배열을 반환합니다.
+        """
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+        columns = list(X.columns)
+        uniq, inverse = np.unique(X.to_numpy(dtype=np.float64), axis=0, return_inverse=True)
+        keys = [tuple(row) for row in uniq.tolist()]
+
+        out = np.empty(len(uniq), dtype=np.float64)
+        todo = []
+        for i, key in enumerate(keys):
+            value = self.entries.get(key)
+            if value is None:
+                todo.append(i)
+            else:
+                self.entries.move_to_end(key)
+                out[i] = value
+        self.hits += len(keys) - len(todo)
+        self.misses += len(todo)
+
+        if todo:
+            preds = np.asarray(model.predict(pd.DataFrame(uniq[todo], columns=columns)), dtype=np.float64)
+            out[todo] = preds
+            for i, value in zip(todo, preds.tolist()):
+                self.entries[keys[i]] = value
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._dirty = True
+
+        return out[np.ravel(inverse)]
@@ -0,0 +1,482 @@
+"""
+train_pipeline.py
+---------------------------------
+와이파이 접속량 x 유동인구 학습 데이터 생성 + XGB quantile 모델 재학습 (flowpop_predict.ipynb 의 배치 버전)
+
+- 학습 데이터는 월 단위로 만듭니다.
+  유동인구는 적재된 월 파티션(tb_flowpop_YYYYMM, compact 월은 tb_flowpop_compact_YYYYMM)에서 와이파이 격자만,
+  와이파이는 ap.log_summary_rukus 를 wifi_grid_id.json 매핑으로 격자 x 시간 합산해 (grid_id, std_date) 로 조인합니다.
+  (원본 CSV rglob / WKB sjoin 대신 적재 테이블과 매핑을 사용)
+- std_date 는 etl_ymd + timezn_cd 시간을 문자열 결합 없이 날짜 + 시간(timedelta) 벡터 연산으로 만듭니다.
+- 월별 피처 행렬은 WIFI_FEATURE_CACHE_DIR 에 npz 로 저장하며, 유동인구 월 version(tb_flowpop_load_log),
+  와이파이 월 건수 / 최종 시각, 매핑 파일 해시가 같으면 다시 만들지 않습니다.
+- GridSearchCV 의 후보 x fold 는 WIFI_TRAIN_JOBS 개 프로세스로 병렬 실행합니다.
+- 세 파일을 임시 경로에 만들어 compiled 오차(WIFI_COMPILED_TOLERANCE)를 검증한 뒤 번들 → compiled npz → 메타데이터
+  순서로 원자적으로 교체하므로, 메타데이터의 trained_at 이 바뀌는 시점에 wifi_predict 가 새 번들(과 같은 버전의
+  compiled 모델)을 사용합니다.
+
+사용 예)
+    python train_pipeline.py                              # 최근 WIFI_TRAIN_MONTHS 개월
+    python train_pipeline.py --start 202501 --end 202509
+    python train_pipeline.py --months 202508 202509 --output-dir /tmp/candidate
+    python train_pipeline.py --features-only              # 피처 캐시만 갱신
+"""
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from wifi_predict import (bundle_path, metadata_path, compiled_path, grid_mapping_path, get_engines,
+                          load_wifi_grid_mapping, iter_source_windows)
+from utils import setup_logger, get_src_dir, stage, to_grid_id, read_sql_profiled
+from flowpop import month_range, LOAD_LOG_TABLE
+
+logger = setup_logger("train_pipeline")
+
+# 피처 캐시 포맷 (컬럼 / 계산 방식이 바뀌면 올려서 기존 캐시를 무효화)
+FEATURE_VERSION = 1
+FEATURE_CACHE_DIR = os.getenv("WIFI_FEATURE_CACHE_DIR", os.path.join(get_src_dir(), "cache/wifi_features"))
+FEATURE_WORKERS = int(os.getenv("WIFI_FEATURE_WORKERS", 2))
+TRAIN_JOBS = int(os.getenv("WIFI_TRAIN_JOBS", os.cpu_count() or 1))
+TRAIN_MONTHS = int(os.getenv("WIFI_TRAIN_MONTHS", 12))
+# 원본 번들과 compiled 모델의 예측 최대 절대 오차 허용치 (넘으면 모델을 교체하지 않음)
+COMPILED_TOLERANCE = float(os.getenv("WIFI_COMPILED_TOLERANCE", 1e-4))
+
+# 노트북과 같은 입력 / 전처리 / 탐색 범위
+NUMERIC_FEATURES = ["acs_cnt", "hour", "month"]
+CATEGORICAL_FEATURES = ["is_weekend_group"]
+PARAM_GRID = {
+    "regressor__n_estimators": [200, 300],
+    "regressor__max_depth": [4, 6, 8],
+    "regressor__learning_rate": [0.05, 0.1],
+    "regressor__subsample": [0.8, 1.0],
+}
+CLIP_QUANTILE = 0.995
+TEST_SIZE = 0.2
+CV_FOLDS = 3
+RANDOM_STATE = 42
+
+DAY_NAMES = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+# 금/토/일 (dayofweek 4, 5, 6)
+WEEKEND_GROUP_FROM = 4
+
+FEATURE_COLUMNS = {
+    "grid_id": np.int32, "std_date": "datetime64[ns]", "acs_cnt": np.float64, "total": np.float64,
+    "month": np.int8, "hour": np.int8, "dayofweek": np.int8, "is_weekend_group": np.int8,
+}
+
+# 파라미터를 파티션 id 타입 배열로 캐스트해 (etl_ymd, timezn_cd, id) 인덱스 / 비트맵 스캔을 쓸 수 있게 합니다.
+# compact 월은 호환 뷰(id 를 wide 타입으로 캐스트) 대신 compact 파티션을 직접 조회합니다.
+FLOWPOP_MONTH_QUERY = """
+        SELECT id, etl_ymd, timezn_cd, total
+        FROM {relation}
+        WHERE id = ANY(%(ids)s::{id_type}[])
+        """
+
+MONTH_ID_TYPE_QUERY = """
+        SELECT format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attname = 'id'
+        """
+
+WIFI_STAMP_QUERY = """
+        SELECT COUNT(*), MAX(std_date)
+        FROM ap.log_summary_rukus
+        WHERE std_date >= %(start)s AND std_date < %(end)s
+        """
+
+# ============================================
+# 📅 대상 월 / 버전
+# ============================================
+def available_months(engine) -> list[str]:
+    """월 파티션 또는 compact 호환 뷰(tb_flowpop_YYYYMM)가 있는 월 목록 (오름차순)"""
+    df = pd.read_sql_query(r"""
+        SELECT relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'v', 'p') AND relname ~ '^tb_flowpop_[0-9]{6}$'
+    """, engine)
+    return sorted(name.rsplit("_", 1)[1] for name in df["relname"])
+
+
+def month_versions(engine) -> dict:
+    """tb_flowpop_load_log 의 월별 version (테이블이 없으면 빈 dict)"""
+    with engine.connect() as conn:
+        exists = conn.exec_driver_sql("SELECT to_regclass(%s) IS NOT NULL", (f"public.{LOAD_LOG_TABLE}",)).scalar()
+        if not exists:
+            return {}
+        rows = conn.exec_driver_sql(f"SELECT crtr_ym, version FROM public.{LOAD_LOG_TABLE}").fetchall()
+    return {ym: int(v) for ym, v in rows}
+
+
+def wifi_stamp(source_engine, ym: str) -> list:
+    """와이파이 월 구간의 (건수, 마지막 std_date). 진행 중인 월은 값이 바뀌므로 캐시가 다시 만들어집니다."""
+    start, end = month_range(ym)
+    count, latest = pd.read_sql_query(WIFI_STAMP_QUERY, source_engine,
+                                      params={"start": start, "end": end}).iloc[0]
+    return [int(count), None if pd.isna(latest) else str(latest)]
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# ============================================
+# 🧮 월별 피처 생성
+# ============================================
+def fetch_wifi_month(source_engine, wifi_grid_id: pd.Series, ym: str, server_agg: bool = False) -> pd.DataFrame:
+    """ym 월 와이파이 접속량을 격자 x 시간(grid_id, std_date, acs_cnt)으로 합산합니다. (7일 window 스트리밍)"""
+    start, end = month_range(ym)
+    parts = []
+    for window_df in iter_source_windows(source_engine, start, end, window=timedelta(days=7), server_agg=server_agg):
+        if "grid_id" in window_df.columns:
+            window_df = window_df.assign(grid_id=to_grid_id(window_df["grid_id"]))
+        else:
+            window_df = window_df.assign(grid_id=window_df["ap_id"].map(wifi_grid_id)).rename(columns={"cnt": "acs_cnt"})
+        window_df = window_df.dropna(subset=["grid_id"])
+        parts.append(window_df.groupby(["grid_id", "std_date"], as_index=False)["acs_cnt"].sum())
+    if not parts:
+        return pd.DataFrame(columns=["grid_id", "std_date", "acs_cnt"])
+    wifi = pd.concat(parts, ignore_index=True)
+    wifi["grid_id"] = wifi["grid_id"].astype(np.int32)
+    wifi["std_date"] = pd.to_datetime(wifi["std_date"])
+    return wifi
+
+
+def month_relation(engine, ym: str) -> tuple[str, str]:
+    """ym 월을 조회할 테이블과 그 id 컬럼 타입 (compact 월은 tb_flowpop_compact_YYYYMM)"""
+    with engine.connect() as conn:
+        for relation in (f"public.tb_flowpop_compact_{ym}", f"public.tb_flowpop_{ym}"):
+            id_type = conn.exec_driver_sql(MONTH_ID_TYPE_QUERY, (relation,)).scalar()
+            if id_type:
+                return relation, id_type
+    raise ValueError(f"{ym} 월 유동인구 테이블이 없습니다.")
+
+
+def fetch_flowpop_month(engine, ym: str, grid_ids) -> pd.DataFrame:
+    """
+    ym 월 유동인구 중 grid_ids 격자 행을 (grid_id, std_date, total) 로 반환합니다.
+    노트북과 같이 type 별 행을 합치지 않고 그대로 학습 행으로 사용합니다.
+    """
+    relation, id_type = month_relation(engine, ym)
+    ids = [int(g) for g in grid_ids] if id_type == "integer" else [f"{int(g):08d}" for g in grid_ids]
+    flow = read_sql_profiled(FLOWPOP_MONTH_QUERY.format(relation=relation, id_type=id_type), engine,
+                             params={"ids": ids}, name="train_pipeline.flowpop_month")
+    flow["grid_id"] = to_grid_id(flow["id"])
+    flow = flow.dropna(subset=["grid_id", "total"])
+    # etl_ymd(날짜) + timezn_cd(시) → std_date
+    hours = pd.to_numeric(flow["timezn_cd"], errors="coerce")
+    flow = flow.assign(
+        grid_id=flow["grid_id"].astype(np.int32),
+        std_date=pd.to_datetime(flow["etl_ymd"]) + pd.to_timedelta(hours, unit="h"),
+    )
+    return flow.dropna(subset=["std_date"])[["grid_id", "std_date", "total"]]
+
+
+def build_month_features(ym: str, engine, source_engine, wifi_grid_id: pd.Series,
+                         server_agg: bool = False) -> pd.DataFrame:
+    """ym 월 와이파이 x 유동인구 학습 행렬 (FEATURE_COLUMNS)"""
+    wifi = fetch_wifi_month(source_engine, wifi_grid_id, ym, server_agg)
+    if wifi.empty:
+        return _empty_features()
+    flow = fetch_flowpop_month(engine, ym, wifi["grid_id"].unique())
+    df = wifi.merge(flow, on=["grid_id", "std_date"], how="inner")
+    dt = df["std_date"].dt
+    df["month"] = dt.month
+    df["hour"] = dt.hour
+    df["dayofweek"] = dt.dayofweek
+    df["is_weekend_group"] = (df["dayofweek"] >= WEEKEND_GROUP_FROM).astype(np.int8)
+    return df[list(FEATURE_COLUMNS)].astype(FEATURE_COLUMNS)
+
+
+def _empty_features() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in FEATURE_COLUMNS.items()})
+
+# ============================================
+# 🗃️ 피처 캐시 (월별 npz)
+# ============================================
+def feature_cache_path(ym: str, cache_dir: str = FEATURE_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"wifi_flowpop_{ym}.npz")
+
+
+def load_cached_features(ym: str, stamp: dict, cache_dir: str = FEATURE_CACHE_DIR) -> pd.DataFrame | None:
+    """캐시의 stamp 가 현재 값과 같을 때만 피처 행렬을 반환합니다."""
+    path = feature_cache_path(ym, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["info"]) != json.dumps(stamp, sort_keys=True):
+                return None
+            df = pd.DataFrame({c: data[c] for c in FEATURE_COLUMNS})
+    except (OSError, ValueError, KeyError):
+        return None
+    df["std_date"] = df["std_date"].astype("datetime64[ns]")
+    return df
+
+
+def save_features(ym: str, df: pd.DataFrame, stamp: dict, cache_dir: str = FEATURE_CACHE_DIR) -> str:
+    os.makedirs(cache_dir, exist_ok=True)
+    path = feature_cache_path(ym, cache_dir)
+    arrays = {c: df[c].to_numpy() for c in FEATURE_COLUMNS}
+    arrays["std_date"] = df["std_date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.chmod(tmp_path, 0o644)
+    with os.fdopen(fd, "wb") as f:
+        np.savez_compressed(f, info=np.array(json.dumps(stamp, sort_keys=True)), **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_training_set(months: list[str], engine, source_engine, server_agg: bool = False,
+                       refresh: bool = False, workers: int = FEATURE_WORKERS,
+                       cache_dir: str = FEATURE_CACHE_DIR) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    months 의 월별 피처를 캐시에서 읽거나 새로 만들어 이어 붙입니다.
+    캐시가 없거나 오래된 월만 workers 개 스레드로 동시에 만듭니다. (DB 조회 대기가 대부분)
+
+    Returns
+    -------
+    (DataFrame, list[dict])
+        학습 행렬, 월별 요약 (ym, rows, cached)
+    """
+    wifi_grid_id = load_wifi_grid_mapping()
+    versions = month_versions(engine)
+    mapping_digest = _file_digest(grid_mapping_path)
+    stamps = {
+        ym: {"feature_version": FEATURE_VERSION, "flowpop_version": versions.get(ym),
+             "wifi": wifi_stamp(source_engine, ym), "grid_mapping": mapping_digest}
+        for ym in months
+    }
+
+    frames, summary = {}, {}
+    for ym in months:
+        cached = None if refresh else load_cached_features(ym, stamps[ym], cache_dir)
+        if cached is not None:
+            frames[ym] = cached
+            summary[ym] = {"ym": ym, "rows": len(cached), "cached": True}
+
+    def _build(ym):
+        with stage("features", logger, ym=ym) as rec:
+            df = build_month_features(ym, engine, source_engine, wifi_grid_id, server_agg)
+            save_features(ym, df, stamps[ym], cache_dir)
+            rec.set_rows(rows_out=df)
+        return ym, df
+
+    todo = [ym for ym in months if ym not in frames]
+    if todo:
+        logger.info(f"🧮 피처 생성 대상 {len(todo)}개월 (캐시 사용 {len(frames)}개월)")
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))), thread_name_prefix="features") as pool:
+            for ym, df in pool.map(_build, todo):
+                frames[ym] = df
+                summary[ym] = {"ym": ym, "rows": len(df), "cached": False}
+
+    for ym in months:
+        logger.info(f"📅 {ym}: {summary[ym]['rows']:,} rows" + (" (cache)" if summary[ym]["cached"] else ""))
+    data = [frames[ym] for ym in months if len(frames[ym])]
+    training = pd.concat(data, ignore_index=True) if data else _empty_features()
+    return training, [summary[ym] for ym in months]
+
+# ============================================
+# 🏋️ 학습 / 평가
+# ============================================
+def train_model(df: pd.DataFrame, param_grid: dict = PARAM_GRID, jobs: int = TRAIN_JOBS) -> dict:
+    """
+    노트북과 같은 전처리(상위 0.5% 제거, QuantileTransformer + OneHotEncoder)로 XGBRegressor 를 튜닝합니다.
+    jobs 가 2 이상이면 GridSearchCV 가 후보 x fold 를 병렬로 돌리고, 각 XGBoost 는 단일 스레드로 학습합니다.
+    """
+    from sklearn.model_selection import train_test_split, GridSearchCV
+    from sklearn.preprocessing import QuantileTransformer, OneHotEncoder, LabelEncoder
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+    from xgboost import XGBRegressor
+
+    clip_threshold = float(df["total"].quantile(CLIP_QUANTILE))
+    df = df[df["total"] <= clip_threshold]
+
+    le = LabelEncoder()
+    le.fit(DAY_NAMES[np.unique(df["dayofweek"])])
+
+    X = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+    y = df["total"]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    preprocessor = ColumnTransformer([
+        ("num", QuantileTransformer(output_distribution="normal", random_state=RANDOM_STATE), NUMERIC_FEATURES),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_FEATURES),
+    ])
+    xgb_model = XGBRegressor(objective="reg:squarederror", random_state=RANDOM_STATE,
+                             n_jobs=1 if jobs > 1 else -1)
+    pipe = Pipeline([("preprocess", preprocessor), ("regressor", xgb_model)])
+
+    grid = GridSearchCV(pipe, param_grid, cv=CV_FOLDS, scoring="r2", n_jobs=jobs, verbose=0)
+    with stage("train", logger, rows_in=len(X_train), jobs=jobs):
+        grid.fit(X_train, y_train)
+
+    best_model = grid.best_estimator_
+    y_pred = np.clip(best_model.predict(X_test), 0, None)
+    metrics = {
+        "r2": float(r2_score(y_test, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "cv_r2": float(grid.best_score_),
+    }
+    logger.info(f"🏆 Best Params: {grid.best_params_}")
+    logger.info(f"🏆 R²: {metrics['r2']:.4f}, RMSE: {metrics['rmse']:.4f}, MAE: {metrics['mae']:.4f} "
+                f"(CV R² {metrics['cv_r2']:.4f})")
+    return {
+        "model": best_model,
+        "label_encoder": le,
+        "best_params": grid.best_params_,
+        "metrics": metrics,
+        "clip_threshold": clip_threshold,
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+    }
+
+# ============================================
+# 💾 번들 / compiled / 메타데이터 교체
+# ============================================
+def _atomic_write(path: str, write, suffix: str = ".tmp"):
+    """path 와 같은 디렉토리의 임시 파일에 쓰고 그 경로를 반환합니다. (os.replace 는 호출 측에서)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    os.chmod(tmp_path, 0o644)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        return tmp_path
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def write_model(result: dict, months: list[str], output_dir: str | None = None) -> dict:
+    """
+    학습 결과를 wifi_predict 가 읽는 경로(또는 output_dir)에 저장합니다.
+    임시 파일로 compiled 변환 / 검증까지 마친 뒤 번들 → compiled npz → 메타데이터 순서로 교체하며,
+    메타데이터가 바뀌기 전까지는 이전 trained_at 이 유지됩니다. 검증에 실패하면 기존 파일은 그대로 둡니다.
+    """
+    import joblib
+    from compiled_model import export_bundle, verify
+
+    paths = {"bundle": bundle_path, "compiled": compiled_path, "metadata": metadata_path}
+    if output_dir:
+        paths = {k: os.path.join(output_dir, os.path.basename(v)) for k, v in paths.items()}
+
+    bundle = {
+        "model": result["model"],
+        "label_encoder": result["label_encoder"],
+        "numeric_features": NUMERIC_FEATURES,
+        "categorical_features": CATEGORICAL_FEATURES,
+    }
+    metadata = {
+        "model_file": os.path.basename(paths["bundle"]),
+        "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "model_type": "XGBRegressor + QuantileTransformer",
+        "best_params": result["best_params"],
+        **result["metrics"],
+        "features": NUMERIC_FEATURES + CATEGORICAL_FEATURES,
+        "training_months": months,
+        "train_rows": result["train_rows"],
+        "test_rows": result["test_rows"],
+        "clip_threshold": result["clip_threshold"],
+        "feature_version": FEATURE_VERSION,
+    }
+
+    with stage("export", logger):
+        bundle_tmp = meta_tmp = compiled_tmp = None
+        try:
+            # 세 파일을 모두 임시 경로에 만들고 검증한 뒤에만 교체합니다. (실패 시 기존 모델 그대로)
+            bundle_tmp = _atomic_write(paths["bundle"], lambda f: joblib.dump(bundle, f))
+            meta_tmp = _atomic_write(
+                paths["metadata"], lambda f: f.write(json.dumps(metadata, indent=4, ensure_ascii=False).encode("utf-8"))
+            )
+            # np.savez 는 .npz 가 아닌 경로에 확장자를 덧붙이므로 임시 파일도 .npz 로 만듭니다.
+            compiled_tmp = _atomic_write(paths["compiled"], lambda f: None, suffix=".npz")
+            export_bundle(bundle_tmp, meta_tmp, compiled_tmp)
+            max_err = verify(bundle_tmp, compiled_tmp)
+            if not max_err <= COMPILED_TOLERANCE:
+                raise ValueError(f"compiled 모델 예측 오차가 허용치를 넘습니다: {max_err:.3g} > {COMPILED_TOLERANCE:g}")
+            os.replace(bundle_tmp, paths["bundle"])
+            os.replace(compiled_tmp, paths["compiled"])
+            os.replace(meta_tmp, paths["metadata"])
+        except Exception:
+            for tmp in (bundle_tmp, meta_tmp, compiled_tmp):
+                if tmp and os.path.exists(tmp):
+                    os.remove(tmp)
+            raise
+    logger.info(f"✅ 모델 저장 완료: {paths['bundle']} (compiled 최대 오차 {max_err:.3g})")
+    logger.info(f"✅ 메타데이터 저장 완료: {paths['metadata']} (trained_at {metadata['trained_at']})")
+    return metadata
+
+# ============================================
+# 🚀 실행
+# ============================================
+def resolve_months(engine, months=None, start=None, end=None, last: int = TRAIN_MONTHS) -> list[str]:
+    """명시한 월 / [start, end] 범위 / 최근 last 개월 순으로 학습 대상 월을 정합니다. (적재된 월만)"""
+    loaded = available_months(engine)
+    if months:
+        missing = sorted(set(months) - set(loaded))
+        if missing:
+            logger.warning(f"⚠️ 적재되지 않은 월 제외: {missing}")
+        return [ym for ym in sorted(set(months)) if ym in loaded]
+    if start or end:
+        return [ym for ym in loaded if (not start or ym >= start) and (not end or ym <= end)]
+    return loaded[-last:]
+
+
+def run_training(months=None, start=None, end=None, server_agg: bool = False, refresh: bool = False,
+                 jobs: int = TRAIN_JOBS, output_dir: str | None = None, features_only: bool = False,
+                 param_grid: dict = PARAM_GRID) -> dict | None:
+    source_engine, target_engine = get_engines()
+    months = resolve_months(target_engine, months, start, end)
+    if not months:
+        raise ValueError("학습할 유동인구 월이 없습니다.")
+    logger.info(f"▶ 학습 대상 월: {months[0]} ~ {months[-1]} ({len(months)}개월)")
+
+    training, summary = build_training_set(months, target_engine, source_engine, server_agg, refresh)
+    logger.info(f"📚 학습 데이터: {len(training):,} rows")
+    if features_only:
+        return None
+    if len(training) < CV_FOLDS * 10:
+        raise ValueError(f"학습 데이터가 너무 적습니다: {len(training):,} rows")
+
+    used = [s["ym"] for s in summary if s["rows"]]
+    result = train_model(training, param_grid, jobs)
+    return write_model(result, used, output_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="와이파이 x 유동인구 학습 데이터 생성 및 모델 재학습")
+    parser.add_argument("--months", nargs="+", help="학습 월 목록 (YYYYMM)")
+    parser.add_argument("--start", help="학습 시작 월 (YYYYMM, 포함)")
+    parser.add_argument("--end", help="학습 종료 월 (YYYYMM, 포함)")
+    parser.add_argument("--jobs", type=int, default=TRAIN_JOBS, help="GridSearchCV 병렬 프로세스 수")
+    parser.add_argument("--output-dir", help="번들/메타데이터 저장 디렉토리 (기본: wifi_predict 가 읽는 경로)")
+    parser.add_argument("--param-grid", help="탐색 범위 JSON 파일 (기본: 노트북과 같은 범위)")
+    parser.add_argument("--refresh", action="store_true", help="피처 캐시를 무시하고 다시 생성")
+    parser.add_argument("--features-only", action="store_true", help="피처 캐시만 갱신하고 학습하지 않음")
+    parser.add_argument("--server-agg", action="store_true", default=os.getenv("WIFI_SERVER_AGG", "0") == "1",
+                        help="AP-격자 조인과 합산을 소스 DB 에서 수행")
+    args = parser.parse_args()
+
+    param_grid = PARAM_GRID
+    if args.param_grid:
+        with open(args.param_grid, "r", encoding="utf-8") as f:
+            param_grid = json.load(f)
+
+    logger.info("🚀 재학습 시작")
+    try:
+        run_training(args.months, args.start, args.end, args.server_agg, args.refresh, args.jobs,
+                     args.output_dir, args.features_only, param_grid)
+        logger.info("▶ 재학습 종료")
+    except Exception as e:
+        logger.exception(f"❌ 재학습 중 오류 발생: {e}")
+        raise SystemExit(1)
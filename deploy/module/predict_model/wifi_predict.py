@@ -1,114 +1,690 @@
-import joblib
 import pandas as pd
 import numpy as np
 import json
+import io
+import hashlib
+import contextlib
+import sys
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv, find_dotenv
 import os
 from datetime import datetime, timedelta
-from utils import setup_logger, get_engine_from_env
 
-# .env 파일 로드
-bundle_path = "/DATA/jupyter_WorkingDirectory/notebook/yeosu/deploy/module/predict_model/xgb_quantile_bundle.joblib"
-metadata_path = "/DATA/jupyter_WorkingDirectory/notebook/yeosu/deploy/module/predict_model/xgb_quantile_metadata.json"
-grid_mapping_path = "/DATA/jupyter_WorkingDirectory/notebook/yeosu/deploy/data/json/wifi_grid_id.json"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import (setup_logger, get_engine_from_env, get_src_dir, get_async_dsn, AsyncRunner, stage, timed_stage,
+                   to_grid_id, grid_id_for_storage, grid_id_sql_type, compact_grid_mapping,
+                   profiled_execute, read_sql_profiled)
 
+# .env 파일 로드
 env_path = find_dotenv(usecwd=True)
 if not env_path:
     env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
 load_dotenv(env_path)
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+bundle_path = os.getenv("WIFI_BUNDLE_PATH", os.path.join(MODEL_DIR, "xgb_quantile_bundle.joblib"))
+metadata_path = os.getenv("WIFI_METADATA_PATH", os.path.join(MODEL_DIR, "xgb_quantile_metadata.json"))
+compiled_path = os.getenv("WIFI_COMPILED_PATH", os.path.join(MODEL_DIR, "xgb_quantile_compiled.npz"))
+prediction_cache_path = os.getenv("WIFI_PRED_CACHE_PATH", os.path.join(get_src_dir(), "cache/wifi_prediction_cache.json"))
+prediction_cache_size = int(os.getenv("WIFI_PRED_CACHE_SIZE", 200_000))
+grid_mapping_path = os.getenv("WIFI_GRID_MAPPING_PATH", os.path.join(get_src_dir(), "json/wifi_grid_id.json"))
+# 소스 DB 에 올려두는 AP → 격자 매핑 테이블 (서버 사이드 집계용)
+grid_map_table = os.getenv("WIFI_GRID_MAP_TABLE", "public.tb_wifi_grid_map")
+
 # ============================================
 # 🪶 로깅 설정
 # ============================================
 logger = setup_logger("wifi_predict")
 
+SOURCE_QUERY = """
+        SELECT std_date, ap_id, cnt
+        FROM ap.log_summary_rukus where std_date IN ({placeholders})
+        ;
+        """
+
+# 소스 DB 에서 AP → 격자 조인과 합산까지 끝내고 격자 × 시간 단위 1행만 전송
+GRID_AGG_QUERY = """
+        SELECT l.std_date, m.grid_id, SUM(l.cnt) AS acs_cnt
+        FROM ap.log_summary_rukus l
+        JOIN {map_table} m ON m.ap_id = l.ap_id
+        WHERE l.std_date >= %(start)s AND l.std_date < %(end)s
+        GROUP BY l.std_date, m.grid_id
+        """
+
+LATEST_STD_DATE_QUERY = "SELECT max(std_date) FROM ap.log_summary_rukus"
+
+RANGE_QUERY = """
+        SELECT std_date, ap_id, cnt
+        FROM ap.log_summary_rukus
+        WHERE std_date >= %(start)s AND std_date < %(end)s
+        """
+
+WATERMARK_QUERY = "SELECT max(std_date) FROM public.tb_wifi_prediction"
+
+CREATE_WIFI_PREDICTION = """
+CREATE TABLE IF NOT EXISTS public.tb_wifi_prediction (
+    grid_id         {grid_type} NOT NULL,
+    std_date        TIMESTAMP NOT NULL,
+    predicted_total INTEGER NOT NULL,
+    acs_cnt         INTEGER NOT NULL,
+    reg_dttm        TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_tb_wifi_prediction_grid_date
+    ON public.tb_wifi_prediction (grid_id, std_date);
+"""
+
+CREATE_TMP_WIFI_PREDICTION = """
+CREATE TEMP TABLE tmp_wifi_prediction (
+    grid_id         {grid_type},
+    std_date        TIMESTAMP,
+    predicted_total DOUBLE PRECISION,
+    acs_cnt         DOUBLE PRECISION,
+    reg_dttm        TIMESTAMP
+) ON COMMIT DROP;
+"""
+
+UPSERT_DELETE_QUERY = """
+DELETE FROM public.tb_wifi_prediction t
+USING tmp_wifi_prediction s
+WHERE t.grid_id = s.grid_id AND t.std_date = s.std_date;
+"""
+
+RESULT_COLS = ['grid_id', 'std_date', 'predicted_total', 'acs_cnt', 'reg_dttm']
+
+NEW_STD_DATES_QUERY = """
+        SELECT DISTINCT std_date FROM ap.log_summary_rukus
+        WHERE std_date > %(after)s
+        ORDER BY std_date
+        """
+
 # ============================================
 # PostgreSQL 연결 생성
 # ============================================
-# 소스 DB (와이파이)
-source_engine = get_engine_from_env(
-    user_env="WIFI_DB_USER",
-    pass_env="WIFI_DB_PASS",
-    host_env="WIFI_DB_HOST",
-    port_env="WIFI_DB_PORT",
-    name_env="WIFI_DB_NAME"
-)
-# 타겟 DB (결과값 적재)
-target_engine = get_engine_from_env()
+def get_engines():
+    """소스 DB(와이파이)와 타겟 DB(결과값 적재) 엔진을 반환합니다."""
+    source_engine = get_engine_from_env(
+        user_env="WIFI_DB_USER",
+        pass_env="WIFI_DB_PASS",
+        host_env="WIFI_DB_HOST",
+        port_env="WIFI_DB_PORT",
+        name_env="WIFI_DB_NAME",
+        app_name="wifi_predict"
+    )
+    target_engine = get_engine_from_env(app_name="wifi_predict")
+    return source_engine, target_engine
 
 # ============================================
 # 📘 저장된 모델 및 전처리기 로드
 # ============================================
-bundle = joblib.load(bundle_path)
-model = bundle["model"]
-le = bundle["label_encoder"]
-numeric_features = bundle["numeric_features"]
-categorical_features = bundle["categorical_features"]
+@timed_stage("load_model", job="wifi_predict")
+def load_model(bundle_path: str = bundle_path, metadata_path: str = metadata_path,
+               engine: str = "auto") -> dict:
+    """
+    모델과 메타데이터를 로드해 예측에 필요한 객체를 dict 로 반환합니다.
+
+    engine
+        - "compiled" : compiled_model.py 로 변환한 npz 를 NumPy 평가기로 사용 (sklearn/xgboost 불필요)
+        - "joblib"   : 원본 joblib 번들 사용
+        - "auto"     : npz 가 있고 메타데이터의 trained_at 과 일치하면 compiled, 아니면 joblib
+    """
+    with open(metadata_path, "r") as f:
+        meta = json.load(f)
 
-with open(metadata_path, "r") as f:
-    meta = json.load(f)
+    if engine in ("auto", "compiled") and os.path.exists(compiled_path):
+        from compiled_model import CompiledModel
+        compiled = CompiledModel.load(compiled_path)
+        if compiled.trained_at == meta["trained_at"] or engine == "compiled":
+            logger.info(f"✅ compiled 모델 로드 완료 ({compiled.trained_at})")
+            return {
+                "model": compiled,
+                "label_encoder": compiled.label_encoder,
+                "numeric_features": compiled.numeric_features,
+                "categorical_features": compiled.categorical_features,
+                "meta": meta,
+            }
+        logger.warning("⚠️ compiled 모델이 현재 번들과 버전이 달라 joblib 번들을 사용합니다.")
+    elif engine == "compiled":
+        raise FileNotFoundError(f"compiled 모델이 없습니다: {compiled_path}")
 
-logger.info(f"✅ 모델 버전 로드 완료 ({meta['trained_at']})")
+    import joblib
+    bundle = joblib.load(bundle_path)
+
+    logger.info(f"✅ 모델 버전 로드 완료 ({meta['trained_at']})")
+    return {
+        "model": bundle["model"],
+        "label_encoder": bundle["label_encoder"],
+        "numeric_features": bundle["numeric_features"],
+        "categorical_features": bundle["categorical_features"],
+        "meta": meta,
+    }
+
+
+def attach_prediction_cache(state: dict, path: str = prediction_cache_path,
+                            max_entries: int = prediction_cache_size) -> dict:
+    """피처 조합 단위 예측 캐시를 state 에 연결합니다. (모델 trained_at 이 바뀌면 캐시 무효화)"""
+    from prediction_cache import PredictionCache
+    state["cache"] = PredictionCache(path, state["meta"]["trained_at"], max_entries)
+    logger.info(f"🗃️ 예측 캐시 로드 완료 : {len(state['cache'].entries):,} 항목")
+    return state
+
+
+def save_prediction_cache(state: dict):
+    cache = state.get("cache")
+    if cache is not None:
+        cache.save()
+        logger.info(f"🗃️ 예측 캐시 적중 {cache.hits:,} / 미적중 {cache.misses:,}")
+
+
+def load_wifi_grid_mapping(path: str = grid_mapping_path) -> pd.Series:
+    """
+    와이파이 AP → 격자 매핑을 ap_id 인덱스 + Int32 grid_id Series 로 로드합니다.
+    wifi_grid_id.json 은 JSON 문자열을 한 번 더 JSON 으로 저장한 형태이므로 두 번 디코딩합니다.
+    격자 밖 AP(-1) 등 유효하지 않은 grid_id 는 제외합니다.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    if isinstance(mapping, str):
+        mapping = json.loads(mapping)
+    compact = compact_grid_mapping(mapping)
+    logger.info(f"✅ 와이파이-격자 매핑 로드 완료 : {len(compact):,} AP (제외 {len(mapping) - len(compact):,})")
+    return compact
 
 # ============================================
 # 📥 신규 데이터 준비
 # ============================================
-# 현재 날짜 기준으로 std_date 동적 생성
-today = datetime.now()
-start_date = (today - timedelta(days=60)).strftime('%Y-%m-%d')  # 30일 전부터 시작
-logger.info(f"📅 동적 날짜 설정: {start_date} 이후 데이터 로드")
-
-query = f"""
-        SELECT std_date, ap_id, cnt, dong_nm, detail_address, "location", weekday, "date", "hour", mac
-        FROM ap.log_summary_rukus where std_date = (select max(std_date) from ap.log_summary_rukus)
-        ;
-        """
-logger.debug(f"{query=}")
-new_data = pd.read_sql_query(query, source_engine)
-logger.info(f"✅ 신규 데이터 로드 완료 : {len(new_data):,} rows")
+# 테이블별로 마지막으로 동기화한 JSON 해시 (매번 DB 코멘트를 조회하지 않도록)
+_grid_map_synced = {}
+
+
+@timed_stage("sync_grid_map", job="wifi_predict")
+def sync_grid_map_table(source_engine, path: str = grid_mapping_path, table: str = grid_map_table) -> bool:
+    """
+    wifi_grid_id.json 을 소스 DB 의 인덱스 테이블(ap_id PK)로 올립니다.
+    테이블 코멘트에 JSON 해시를 기록해 두고, 파일 내용이 바뀐 경우에만 다시 적재합니다.
+
+    Returns
+    -------
+    bool
+        테이블을 새로 적재했으면 True, 이미 최신이면 False
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    if _grid_map_synced.get(table) == digest:
+        return False
+
+    raw = source_engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("SELECT obj_description(to_regclass(%s), 'pg_class')", (table,))
+        row = cur.fetchone()
+        if row and row[0] == digest:
+            _grid_map_synced[table] = digest
+            return False
+
+        mapping = load_wifi_grid_mapping(path)
+        buf = io.StringIO()
+        for ap_id, grid_id in mapping.items():
+            buf.write(f"{ap_id}\t{grid_id}\n")
+        buf.seek(0)
+
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table} (ap_id TEXT PRIMARY KEY, grid_id INTEGER NOT NULL)")
+        cur.execute(f"TRUNCATE {table}")
+        cur.copy_expert(f"COPY {table} (ap_id, grid_id) FROM STDIN", buf)
+        cur.execute(f"COMMENT ON TABLE {table} IS %s", (digest,))
+        raw.commit()
+        cur.execute(f"ANALYZE {table}")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        cur.close()
+        raw.close()
+
+    _grid_map_synced[table] = digest
+    logger.info(f"🔄 AP-격자 매핑 테이블 갱신 완료 : {table}")
+    return True
+
+
+@timed_stage("extract", job="wifi_predict", source="grid_agg")
+def fetch_grid_agg(source_engine, start, end, table: str = grid_map_table) -> pd.DataFrame:
+    """[start, end) 구간을 소스 DB 에서 격자 × 시간 단위로 집계해 조회합니다."""
+    sync_grid_map_table(source_engine, table=table)
+    params = {"start": str(start), "end": str(end)}
+    new_data = read_sql_profiled(GRID_AGG_QUERY.format(map_table=table), source_engine, params=params,
+                                 name="wifi_predict.grid_agg")
+    logger.info(f"✅ 격자 집계 데이터 로드 완료 : {len(new_data):,} rows ({start} ~ {end})")
+    return new_data
+
+
+@timed_stage("extract", job="wifi_predict", source="raw")
+def fetch_source(source_engine, std_dates: list) -> pd.DataFrame:
+    """지정한 std_date 들의 원천 와이파이 로그를 조회합니다."""
+    params = {f"d{i}": str(d) for i, d in enumerate(std_dates)}
+    query = SOURCE_QUERY.format(placeholders=", ".join(f"%({k})s" for k in params))
+    logger.debug(f"{query=}")
+    new_data = read_sql_profiled(query, source_engine, params=params, name="wifi_predict.source")
+    logger.info(f"✅ 신규 데이터 로드 완료 : {len(new_data):,} rows")
+    return new_data
 
-# 와이파이 - 격자 매핑 ID 가져오기
-wifi_grid_id = json.load(open(grid_mapping_path, "r"))
 
-new_data['grid_id'] = new_data['ap_id'].map(wifi_grid_id)
-new_data['std_date'] = pd.to_datetime(new_data['std_date'])
-new_data = new_data.groupby(['grid_id', 'std_date'], as_index=False).agg(acs_cnt=('acs_cnt', 'sum'))
+def fetch_new_std_dates(source_engine, after=None) -> list:
+    """watermark(after) 이후 새로 적재된 std_date 목록을 반환합니다. after 가 없으면 최신 1건만 반환합니다."""
+    if after is None:
+        latest = pd.read_sql_query(LATEST_STD_DATE_QUERY, source_engine).iloc[0, 0]
+        return [] if pd.isna(latest) else [latest]
+    df = pd.read_sql_query(NEW_STD_DATES_QUERY, source_engine, params={"after": str(after)})
+    return df["std_date"].tolist()
 
-new_data['month'] = new_data['std_date'].dt.month
-new_data['dayname'] = new_data['std_date'].dt.day_name()
-new_data['hour'] = new_data['std_date'].dt.hour
-new_data['is_weekend_group'] = new_data['dayname'].isin(["Friday", "Saturday", "Sunday"]).astype(int)
 
-# 학습 시점의 인코더로 변환 (주의!)
-try:
-    new_data['dayname_encoded'] = le.transform(new_data['dayname'])
-except ValueError:
-    logger.warning("⚠️ 신규 데이터에 학습 시점에 없던 요일이 있습니다. 확인 필요.")
+def iter_source_windows(source_engine, start, end, window: timedelta = timedelta(days=1),
+                        chunksize: int = 200_000, server_agg: bool = False):
+    """
+    [start, end) 구간을 window 단위로 나누어 원천 로그를 스트리밍 조회합니다.
+    각 window 는 서버 사이드 커서로 chunksize 행씩 읽어 (grid 매핑 전) ap_id × std_date 로 부분 합산하므로
+    메모리 사용량은 window 하나의 집계 결과 크기로 제한됩니다.
+    server_agg=True 이면 소스 DB 에서 격자 단위 집계까지 마친 결과를 받습니다.
+    """
+    cursor = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    while cursor < end:
+        window_end = min(cursor + window, end)
+        if server_agg:
+            window_df = fetch_grid_agg(source_engine, cursor, window_end)
+            if len(window_df):
+                yield window_df
+            cursor = window_end
+            continue
+        params = {"start": str(cursor), "end": str(window_end)}
+        partials = []
+        with stage("extract", logger, source="raw_window") as rec:
+            rows_in = 0
+            with source_engine.connect().execution_options(stream_results=True) as conn:
+                for chunk in pd.read_sql_query(RANGE_QUERY, conn, params=params, chunksize=chunksize):
+                    rows_in += len(chunk)
+                    partials.append(chunk.groupby(['ap_id', 'std_date'], as_index=False)['cnt'].sum())
+            window_df = None
+            if partials:
+                window_df = pd.concat(partials, ignore_index=True)
+                window_df = window_df.groupby(['ap_id', 'std_date'], as_index=False)['cnt'].sum()
+            rec.set_rows(rows_in=rows_in, rows_out=0 if window_df is None else window_df)
+        if window_df is not None:
+            logger.info(f"📦 {cursor} ~ {window_end} 로드 완료 : {len(window_df):,} rows")
+            yield window_df
+        cursor = window_end
 
-X = new_data[numeric_features + categorical_features]
+
+@timed_stage("transform", job="wifi_predict")
+def build_features(new_data: pd.DataFrame, wifi_grid_id: pd.Series, state: dict) -> pd.DataFrame:
+    """
+    원천 로그를 격자 × 시간 단위로 집계하고 모델 입력 피처를 생성합니다.
+    이미 소스 DB 에서 격자 단위로 집계된 데이터(grid_id 컬럼 보유)는 매핑을 건너뜁니다.
+    """
+    new_data = new_data.rename(columns={"cnt": "acs_cnt"})
+    if 'grid_id' not in new_data.columns:
+        new_data['grid_id'] = new_data['ap_id'].map(wifi_grid_id)
+    else:
+        new_data['grid_id'] = to_grid_id(new_data['grid_id'])
+    new_data['std_date'] = pd.to_datetime(new_data['std_date'])
+    new_data = new_data.groupby(['grid_id', 'std_date'], as_index=False).agg(acs_cnt=('acs_cnt', 'sum'))
+    return add_time_features(new_data, state)
+
+
+def add_time_features(new_data: pd.DataFrame, state: dict) -> pd.DataFrame:
+    """std_date 로부터 month / hour / 주말 그룹 피처를 생성합니다."""
+    new_data['month'] = new_data['std_date'].dt.month
+    new_data['dayname'] = new_data['std_date'].dt.day_name()
+    new_data['hour'] = new_data['std_date'].dt.hour
+    new_data['is_weekend_group'] = new_data['dayname'].isin(["Friday", "Saturday", "Sunday"]).astype(int)
+
+    # 학습 시점의 인코더로 변환 (주의!)
+    try:
+        new_data['dayname_encoded'] = state["label_encoder"].transform(new_data['dayname'])
+    except ValueError:
+        logger.warning("⚠️ 신규 데이터에 학습 시점에 없던 요일이 있습니다. 확인 필요.")
+    return new_data
 
 # ============================================
 # 📊 예측 및 결과 병합
 # ============================================
-preds = np.clip(model.predict(X), 0, None)
-new_data["predicted_total"] = preds
-new_data['grid_id'] = new_data['grid_id'].astype(int)
-logger.info("✅ 예측 완료")
+@timed_stage("predict", job="wifi_predict")
+def predict(state: dict, new_data: pd.DataFrame) -> pd.DataFrame:
+    """모델 예측값을 predicted_total 컬럼으로 추가합니다."""
+    X = new_data[state["numeric_features"] + state["categorical_features"]]
+    if state.get("cache") is not None:
+        # 동일 피처 조합은 한 번만, 이전 실행에서 본 조합은 캐시에서
+        preds = state["cache"].predict(state["model"], X)
+    else:
+        preds = state["model"].predict(X) if len(X) else np.empty(0)
+    new_data["predicted_total"] = np.clip(preds, 0, None)
+    return new_data
 
 # ============================================
 # 💾 결과 저장
 # ============================================
-result_cols = ['grid_id', 'std_date', 'predicted_total', 'acs_cnt']
-results = new_data[result_cols]
-# 현재 시각을 reg_dttm 컬럼으로 추가
-results["reg_dttm"] = datetime.now()  # 현재 시각
-# 컬럼 순서 조정 (원하는 순서로)
-save_cols = result_cols + ["reg_dttm"]
-results = results[save_cols]
-
-results["grid_id"] = results["grid_id"].astype(str)
-results.to_sql('tb_wifi_prediction', target_engine, schema='public', if_exists='append', index=False)
-logger.info("✅ 예측 결과 저장 완료 to TB_WIFI_PREDICTION")
+def get_watermark(target_engine):
+    """이미 예측/적재된 마지막 std_date(watermark)를 반환합니다. 결과 테이블이 없으면 None."""
+    try:
+        latest = pd.read_sql_query(WATERMARK_QUERY, target_engine).iloc[0, 0]
+    except Exception as e:
+        logger.warning(f"⚠️ 기존 예측 결과 조회 실패: {e}")
+        return None
+    return None if pd.isna(latest) else pd.Timestamp(latest)
+
+
+def build_results(new_data: pd.DataFrame) -> pd.DataFrame:
+    """적재용 결과 DataFrame (grid_id, std_date, predicted_total, acs_cnt, reg_dttm) 을 만듭니다."""
+    results = new_data[RESULT_COLS[:-1]].copy()
+    results['grid_id'] = grid_id_for_storage(results['grid_id'])
+    # 현재 시각을 reg_dttm 컬럼으로 추가
+    results["reg_dttm"] = datetime.now()
+    return results[RESULT_COLS]
+
+
+@timed_stage("load", job="wifi_predict")
+def save_predictions(new_data: pd.DataFrame, target_engine):
+    """
+    예측 결과를 (grid_id, std_date) 기준으로 upsert 합니다.
+    임시 테이블로 COPY 한 뒤 같은 트랜잭션 안에서 기존 행을 삭제하고 다시 넣으므로 재실행해도 중복이 생기지 않습니다.
+    """
+    results = build_results(new_data)
+    if results.empty:
+        return
+
+    cols = ", ".join(RESULT_COLS)
+    buf = io.StringIO()
+    results.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+
+    raw = target_engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(CREATE_WIFI_PREDICTION.format(grid_type=grid_id_sql_type()))
+        cur.execute(CREATE_TMP_WIFI_PREDICTION.format(grid_type=grid_id_sql_type()))
+        cur.copy_expert(f"COPY tmp_wifi_prediction ({cols}) FROM STDIN WITH (FORMAT CSV)", buf)
+        profiled_execute(cur, "wifi_predict.upsert_delete", UPSERT_DELETE_QUERY)
+        profiled_execute(cur, "wifi_predict.upsert_insert",
+                         f"INSERT INTO public.tb_wifi_prediction ({cols}) SELECT {cols} FROM tmp_wifi_prediction;")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        cur.close()
+        raw.close()
+    logger.info(f"✅ 예측 결과 저장 완료 to TB_WIFI_PREDICTION ({len(results):,} rows)")
+
+
+@timed_stage("load", job="wifi_predict", mode="async")
+async def save_predictions_async(pool, new_data: pd.DataFrame):
+    """
+    save_predictions 의 asyncpg 버전입니다. (binary COPY, 동일한 upsert 트랜잭션)
+    AsyncRunner 에 제출하면 다음 window 의 조회/예측과 겹쳐 실행됩니다. 적재끼리는 advisory lock 으로 순서대로 커밋됩니다.
+    """
+    results = build_results(new_data)
+    if results.empty:
+        return
+    results["predicted_total"] = results["predicted_total"].astype(float)
+    results["acs_cnt"] = results["acs_cnt"].astype(float)
+    records = list(results.astype(object).where(results.notna(), None).itertuples(index=False, name=None))
+
+    cols = ", ".join(RESULT_COLS)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            # 동시에 제출된 적재끼리 DDL/DELETE 잠금 순서가 엇갈려 교착되지 않도록 트랜잭션 단위로 직렬화
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('public.tb_wifi_prediction'))")
+            await conn.execute(CREATE_WIFI_PREDICTION.format(grid_type=grid_id_sql_type()))
+            await conn.execute(CREATE_TMP_WIFI_PREDICTION.format(grid_type=grid_id_sql_type()))
+            await conn.copy_records_to_table("tmp_wifi_prediction", records=records, columns=RESULT_COLS)
+            await conn.execute(UPSERT_DELETE_QUERY)
+            await conn.execute(f"INSERT INTO public.tb_wifi_prediction ({cols}) SELECT {cols} FROM tmp_wifi_prediction;")
+    logger.info(f"✅ 예측 결과 비동기 저장 완료 to TB_WIFI_PREDICTION ({len(results):,} rows)")
+
+
+def run_batch(state: dict, wifi_grid_id: pd.Series, source_engine, target_engine, std_dates: list,
+              server_agg: bool = False, model_lock=None):
+    """
+    std_date 묶음(오름차순) 하나를 조회 → 예측 → 저장합니다.
+    model_lock 이 있으면 모델/예측 캐시를 쓰는 구간만 잠그고, 원천 조회와 적재는 잠금 밖에서 실행합니다.
+    """
+    if server_agg:
+        start = pd.Timestamp(std_dates[0])
+        end = pd.Timestamp(std_dates[-1]) + timedelta(seconds=1)
+        new_data = fetch_grid_agg(source_engine, start, end)
+    else:
+        new_data = fetch_source(source_engine, std_dates)
+    with model_lock or contextlib.nullcontext():
+        new_data = build_features(new_data, wifi_grid_id, state)
+        new_data = predict(state, new_data)
+    logger.info("✅ 예측 완료")
+    save_predictions(new_data, target_engine)
+    return new_data
+
+
+def run_once(server_agg: bool = False, model_engine: str = "auto", use_cache: bool = True):
+    """기존 동작: 최신 std_date 한 건을 예측해 적재합니다."""
+    source_engine, target_engine = get_engines()
+    state = load_model(engine=model_engine)
+    if use_cache:
+        attach_prediction_cache(state)
+    wifi_grid_id = load_wifi_grid_mapping()
+
+    std_dates = fetch_new_std_dates(source_engine)
+    if std_dates:
+        run_batch(state, wifi_grid_id, source_engine, target_engine, std_dates, server_agg)
+    save_prediction_cache(state)
+
+
+def run_backfill(start=None, end=None, window_days: int = 1, chunksize: int = 200_000,
+                 server_agg: bool = False, model_engine: str = "auto", use_cache: bool = True,
+                 async_io: bool = False):
+    """
+    [start, end) 구간을 window 단위로 스트리밍 조회 → 예측 → upsert 합니다.
+    start 가 없으면 watermark(마지막 예측 std_date)부터, watermark 도 없으면 60일 전부터 시작합니다.
+    end 가 없으면 원천 데이터의 최신 std_date 까지 처리합니다.
+    async_io 가 True 이면 window 적재를 asyncpg 로 백그라운드 제출해 다음 window 조회/예측과 겹쳐 실행합니다.
+    """
+    source_engine, target_engine = get_engines()
+    state = load_model(engine=model_engine)
+    if use_cache:
+        attach_prediction_cache(state)
+    wifi_grid_id = load_wifi_grid_mapping()
+
+    if start is None:
+        # watermark 시점도 다시 예측해 부분 적재된 시간대를 보정 (upsert 이므로 중복 없음)
+        start = get_watermark(target_engine)
+        if start is None:
+            start = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
+    if end is None:
+        latest = fetch_new_std_dates(source_engine)
+        if not latest:
+            logger.info("ℹ️ 원천 데이터가 없습니다.")
+            return
+        end = pd.Timestamp(latest[0]) + timedelta(seconds=1)
+    logger.info(f"📅 백필 구간: {start} ~ {end}")
+
+    total = 0
+    runner = AsyncRunner(dsn=get_async_dsn(), app_name="wifi_predict") if async_io else None
+    try:
+        windows = iter_source_windows(source_engine, start, end, timedelta(days=window_days), chunksize, server_agg)
+        for window_df in windows:
+            features = build_features(window_df, wifi_grid_id, state)
+            features = predict(state, features)
+            if runner is not None:
+                runner.submit(save_predictions_async(runner.pool(), features))
+            else:
+                save_predictions(features, target_engine)
+            total += len(features)
+    finally:
+        if runner is not None:
+            runner.close()
+    save_prediction_cache(state)
+    logger.info(f"✅ 백필 완료 : {total:,} rows")
+
+# ============================================
+# 🔁 상주 서비스 (모델/매핑 1회 로드 + 폴링 + HTTP)
+# ============================================
+class WifiPredictService:
+    """
+    모델과 매핑을 한 번만 로드해 두고
+    - ap.log_summary_rukus 의 신규 std_date 를 주기적으로 폴링해 micro-batch 로 예측/적재하고
+    - 로컬 HTTP 엔드포인트로 즉시 예측 요청을 처리합니다.
+    """
+
+    def __init__(self, poll_interval: int = 300, batch_dates: int = 24, server_agg: bool = False,
+                 model_engine: str = "auto", use_cache: bool = True):
+        self.poll_interval = poll_interval
+        self.batch_dates = batch_dates
+        self.server_agg = server_agg
+        self.model_engine = model_engine
+        self.use_cache = use_cache
+        self.source_engine, self.target_engine = get_engines()
+        self.state = load_model(engine=model_engine)
+        if use_cache:
+            attach_prediction_cache(self.state)
+        self.wifi_grid_id = load_wifi_grid_mapping()
+        self.watermark = get_watermark(self.target_engine)
+        logger.info(f"📌 시작 watermark: {self.watermark}")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def reload_model_if_changed(self) -> bool:
+        """메타데이터의 trained_at 이 바뀌었으면(train_pipeline.py 재학습) 모델을 다시 로드합니다."""
+        try:
+            with open(metadata_path, "r") as f:
+                trained_at = json.load(f)["trained_at"]
+        except (OSError, ValueError, KeyError):
+            return False
+        if trained_at == self.state["meta"]["trained_at"]:
+            return False
+        state = load_model(engine=self.model_engine)
+        if self.use_cache:
+            attach_prediction_cache(state)
+        with self._lock:
+            self.state = state
+        logger.info(f"🔄 재학습 모델로 교체 ({trained_at})")
+        return True
+
+    def poll_once(self):
+        self.reload_model_if_changed()
+        std_dates = fetch_new_std_dates(self.source_engine, self.watermark)
+        if not std_dates:
+            return 0
+        logger.info(f"🆕 신규 std_date {len(std_dates):,}건 감지")
+        for i in range(0, len(std_dates), self.batch_dates):
+            batch = std_dates[i:i + self.batch_dates]
+            # 조회/적재 중에도 HTTP 예측이 기다리지 않도록 모델 호출 구간만 잠급니다.
+            run_batch(self.state, self.wifi_grid_id, self.source_engine, self.target_engine, batch,
+                      self.server_agg, model_lock=self._lock)
+            self.watermark = batch[-1]
+        with self._lock:
+            save_prediction_cache(self.state)
+        return len(std_dates)
+
+    def predict_rows(self, rows: list[dict]) -> list[dict]:
+        """{grid_id, std_date, acs_cnt} 목록을 받아 예측값을 붙여 반환합니다."""
+        df = pd.DataFrame(rows)
+        df['std_date'] = pd.to_datetime(df['std_date'])
+        df['acs_cnt'] = pd.to_numeric(df['acs_cnt'])
+        with self._lock:
+            df = predict(self.state, add_time_features(df, self.state))
+        df['std_date'] = df['std_date'].dt.strftime("%Y-%m-%d %H:%M:%S")
+        cols = [c for c in ['grid_id', 'std_date', 'acs_cnt', 'predicted_total'] if c in df.columns]
+        return df[cols].to_dict(orient="records")
+
+    def serve_http(self, host: str, port: int):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, payload):
+                body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/health":
+                    return self._reply(200, {"status": "ok", "watermark": service.watermark,
+                                             "trained_at": service.state["meta"]["trained_at"]})
+                if url.path != "/predict":
+                    return self._reply(404, {"error": "not found"})
+                qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    return self._reply(200, service.predict_rows([qs]))
+                except (KeyError, ValueError) as e:
+                    return self._reply(400, {"error": str(e)})
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/predict":
+                    return self._reply(404, {"error": "not found"})
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    rows = json.loads(self.rfile.read(length) or b"[]")
+                    return self._reply(200, service.predict_rows(rows if isinstance(rows, list) else [rows]))
+                except (KeyError, ValueError) as e:
+                    return self._reply(400, {"error": str(e)})
+
+            def log_message(self, fmt, *args):
+                logger.debug("HTTP " + fmt % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        logger.info(f"🌐 예측 HTTP 엔드포인트 시작: http://{host}:{port}/predict")
+        return server
+
+    def run_forever(self, host: str, port: int):
+        server = self.serve_http(host, port)
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    logger.exception(f"❌ 폴링 중 오류 발생: {e}")
+                self._stop.wait(self.poll_interval)
+        finally:
+            server.shutdown()
+
+    def stop(self):
+        self._stop.set()
+
 
 if __name__ == "__main__":
-    pass 
-    #logger.info("🚀 스크립트 실행 시작")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="와이파이 기반 유동인구 예측")
+    parser.add_argument("--serve", action="store_true", help="상주 모드 (폴링 + HTTP 엔드포인트)")
+    parser.add_argument("--poll-interval", type=int, default=int(os.getenv("WIFI_POLL_INTERVAL", 300)), help="신규 std_date 폴링 주기(초)")
+    parser.add_argument("--batch-dates", type=int, default=24, help="micro-batch 당 std_date 수")
+    parser.add_argument("--incremental", action="store_true", help="watermark 이후 전체 구간 예측 (upsert)")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"), help="[START, END) 구간 재예측 (upsert)")
+    parser.add_argument("--window-days", type=int, default=1, help="백필 시 한 번에 처리할 일 수")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="원천 로그 스트리밍 행 수")
+    parser.add_argument("--server-agg", action="store_true",
+                        default=os.getenv("WIFI_SERVER_AGG", "0") == "1",
+                        help="AP-격자 조인과 합산을 소스 DB 에서 수행")
+    parser.add_argument("--model-engine", choices=["auto", "compiled", "joblib"],
+                        default=os.getenv("WIFI_MODEL_ENGINE", "auto"), help="예측 엔진 선택")
+    parser.add_argument("--async-io", action="store_true", help="백필/증분 시 asyncpg 로 적재를 다음 window 처리와 겹쳐 실행")
+    parser.add_argument("--no-cache", action="store_true", help="피처 조합 예측 캐시 사용 안 함")
+    parser.add_argument("--host", default=os.getenv("WIFI_HTTP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("WIFI_HTTP_PORT", 8765)))
+    args = parser.parse_args()
+
+    logger.info("🚀 스크립트 실행 시작")
+    if args.serve:
+        service = WifiPredictService(args.poll_interval, args.batch_dates, args.server_agg,
+                                     args.model_engine, not args.no_cache)
+        service.run_forever(args.host, args.port)
+    elif args.backfill:
+        run_backfill(args.backfill[0], args.backfill[1], args.window_days, args.chunksize,
+                     args.server_agg, args.model_engine, not args.no_cache, args.async_io)
+    elif args.incremental:
+        run_backfill(window_days=args.window_days, chunksize=args.chunksize, server_agg=args.server_agg,
+                     model_engine=args.model_engine, use_cache=not args.no_cache, async_io=args.async_io)
+    else:
+        run_once(args.server_agg, args.model_engine, not args.no_cache)
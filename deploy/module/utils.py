@@ -1,8 +1,28 @@
+from __future__ import annotations
+
 import os
+import re
+import sys
+import json
+import time
+import atexit
+import inspect
 import logging
+import asyncio
+import functools
+import threading
+import contextlib
+import contextvars
+from datetime import datetime
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
-import geopandas as gpd
+from typing import TYPE_CHECKING
+import numpy as np
+# pandas / geopandas / shapely 는 임포트 비용이 커서 실제로 사용하는 함수 안에서 임포트합니다.
+# (flowpop 처럼 csv + psycopg2 만 쓰는 경로는 GEOS/pyproj 로딩 없이 시작)
+if TYPE_CHECKING:
+    import pandas as pd
+    import geopandas as gpd
 
 # .env 파일 로드 (한 번만)
 load_dotenv()
@@ -31,15 +51,297 @@ def setup_logger(script_name) -> logging.Logger:
         )
     return logger
 
+# -----------------------------------------------------------
+# ⏱️ 스테이지 계측 (소요시간 / CPU / 행 수 / 메모리)
+# -----------------------------------------------------------
+# 스테이지가 끝날 때마다
+# - LOG_DIR/metrics.jsonl (METRICS_LOG_PATH 로 변경) 에 JSON 한 줄
+# - 스크립트 로그에 요약 한 줄
+# - PROM_TEXTFILE_DIR 이 설정되어 있으면 node_exporter textfile(<job>.prom) 갱신
+_CURRENT_STAGE = contextvars.ContextVar("current_stage", default=None)
+_PROM_SAMPLES = {}
+_METRICS_LOCK = threading.Lock()
+
+_PROM_METRICS = [
+    ("wall_seconds", "wall_s", "스테이지 경과 시간(초)"),
+    ("cpu_seconds", "cpu_s", "스테이지 동안 사용한 프로세스 CPU 시간(초)"),
+    ("rows_in", "rows_in", "입력 행 수"),
+    ("rows_out", "rows_out", "출력 행 수"),
+    ("rows_per_second", "rows_per_sec", "초당 처리 행 수"),
+    ("peak_rss_bytes", "peak_rss_bytes", "스테이지 종료 시점까지의 프로세스 최대 RSS(bytes)"),
+    ("success", "success", "마지막 실행 성공 여부(1/0)"),
+    ("last_run_timestamp_seconds", "ended_at", "마지막 실행 종료 시각(unix time)"),
+]
+
+
+def _peak_rss_bytes() -> int:
+    """프로세스 최대 RSS(bytes). resource 모듈이 없는 환경(Windows)에서는 0."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 는 KB, macOS 는 bytes 단위
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def count_rows(obj) -> int | None:
+    """int 는 그대로, DataFrame/배열/리스트는 행 수를 반환합니다. 셀 수 없으면 None."""
+    if obj is None or isinstance(obj, bool):
+        return None
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (str, bytes, dict, tuple)):
+        return None
+    shape = getattr(obj, "shape", None)
+    if shape:
+        return int(shape[0])
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class StageRecord:
+    """stage() 블록 하나의 계측 결과. 블록 안에서 set_rows 로 입력/출력 행 수를 채웁니다."""
+
+    def __init__(self, job: str, stage: str, labels: dict):
+        self.job = job
+        self.stage = stage
+        self.labels = labels
+        self.rows_in = None
+        self.rows_out = None
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_bytes = 0
+        self.status = "ok"
+        self.ended_at = None
+
+    def set_rows(self, rows_in=None, rows_out=None):
+        """행 수(int) 또는 DataFrame 등 행을 셀 수 있는 객체를 받습니다."""
+        if rows_in is not None:
+            self.rows_in = count_rows(rows_in)
+        if rows_out is not None:
+            self.rows_out = count_rows(rows_out)
+
+    @property
+    def rows_per_sec(self) -> float | None:
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        if rows is None or self.wall_s <= 0:
+            return None
+        return rows / self.wall_s
+
+    @property
+    def success(self) -> int:
+        return int(self.status == "ok")
+
+    def to_dict(self) -> dict:
+        rps = self.rows_per_sec
+        return {
+            "ts": datetime.fromtimestamp(self.ended_at).isoformat(timespec="milliseconds"),
+            "job": self.job,
+            "stage": self.stage,
+            "status": self.status,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_sec": None if rps is None else round(rps, 1),
+            "peak_rss_mb": round(self.peak_rss_bytes / 1024 ** 2, 1),
+            "pid": os.getpid(),
+            **({"labels": self.labels} if self.labels else {}),
+        }
+
+
+def _metrics_logger() -> logging.Logger:
+    """JSON lines 전용 로거. 스크립트 로그(root)로 전파하지 않습니다."""
+    logger = logging.getLogger("yeosu.metrics")
+    if not logger.handlers:
+        path = os.getenv("METRICS_LOG_PATH") or os.path.join(os.getenv("LOG_DIR", "./logs"), "metrics.jsonl")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def _prom_escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _write_prom_textfile(job: str, prom_dir: str):
+    """job 의 마지막 스테이지 값들을 <prom_dir>/<job>.prom 으로 원자적으로 교체합니다."""
+    samples = [rec for (j, *_), rec in _PROM_SAMPLES.items() if j == job]
+    lines = []
+    for metric, attr, help_text in _PROM_METRICS:
+        name = f"yeosu_stage_{metric}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for rec in samples:
+            value = getattr(rec, attr)
+            if value is None:
+                continue
+            labels = {"job": rec.job, "stage": rec.stage, **rec.labels}
+            label_str = ",".join(f'{k}="{_prom_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_str}}} {float(value)!r}")
+    os.makedirs(prom_dir, exist_ok=True)
+    path = os.path.join(prom_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", job) + ".prom")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def _emit_stage(rec: StageRecord, logger: logging.Logger | None):
+    payload = rec.to_dict()
+    _metrics_logger().info(json.dumps(payload, ensure_ascii=False, default=str))
+
+    logger = logger or logging.getLogger(rec.job)
+    rows = " → ".join(f"{r:,}" for r in (rec.rows_in, rec.rows_out) if r is not None)
+    rps = rec.rows_per_sec
+    logger.info(
+        f"⏱️ [{rec.stage}] {'✅' if rec.success else '❌'} {rec.wall_s:.2f}s (cpu {rec.cpu_s:.2f}s)"
+        + (f", rows {rows}" if rows else "")
+        + (f", {rps:,.0f} rows/s" if rps is not None else "")
+        + f", peak RSS {payload['peak_rss_mb']:,.0f}MB"
+    )
+
+    prom_dir = os.getenv("PROM_TEXTFILE_DIR")
+    if prom_dir:
+        with _METRICS_LOCK:
+            _PROM_SAMPLES[(rec.job, rec.stage, tuple(sorted(rec.labels.items())))] = rec
+            _write_prom_textfile(rec.job, prom_dir)
+
+
+def _default_job() -> str:
+    return os.path.splitext(os.path.basename(sys.argv[0] or ""))[0] or "yeosu"
+
+
+@contextlib.contextmanager
+def stage(name: str, logger: logging.Logger | None = None, job: str | None = None, rows_in=None, **labels):
+    """
+    파이프라인 스테이지 하나의 wall/CPU 시간, 입력/출력 행 수, 초당 행 수, 최대 RSS 를 기록합니다.
+
+    Parameters
+    ----------
+    name : str
+        스테이지 이름 (예: "extract", "transform", "load")
+    logger : logging.Logger, optional
+        요약 한 줄을 남길 로거. 없으면 job 이름의 로거를 사용합니다.
+    job : str, optional
+        작업 이름. 없으면 logger 이름, 그것도 없으면 실행 스크립트 이름
+    rows_in : int | DataFrame, optional
+        입력 행 수 (또는 행을 셀 수 있는 객체)
+    **labels
+        추가 라벨 (예: table="tb_kcb_stat"). JSON 레코드와 Prometheus 라벨에 함께 기록됩니다.
+
+    Examples
+    --------
+    >>> with stage("load", logger, rows_in=df, table="tb_kcb_stat") as rec:
+    ...     df.to_sql(...)
+    ...     rec.set_rows(rows_out=len(df))
+    """
+    job = job or (logger.name if logger is not None else _default_job())
+    rec = StageRecord(job, name, {k: str(v) for k, v in labels.items()})
+    rec.set_rows(rows_in=rows_in)
+    token = _CURRENT_STAGE.set(rec)
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield rec
+    except BaseException:
+        rec.status = "error"
+        raise
+    finally:
+        rec.wall_s = time.perf_counter() - wall0
+        rec.cpu_s = time.process_time() - cpu0
+        rec.peak_rss_bytes = _peak_rss_bytes()
+        rec.ended_at = time.time()
+        _CURRENT_STAGE.reset(token)
+        try:
+            _emit_stage(rec, logger)
+        except Exception as e:
+            # 계측 실패로 적재가 중단되지 않도록 경고만 남깁니다.
+            logging.getLogger(job).warning(f"⚠️ 스테이지 계측 기록 실패 ({name}): {e}")
+
+
+def record_rows(rows_in=None, rows_out=None):
+    """현재 실행 중인 stage() 의 행 수를 갱신합니다. (stage 밖에서 호출하면 무시)"""
+    rec = _CURRENT_STAGE.get()
+    if rec is not None:
+        rec.set_rows(rows_in=rows_in, rows_out=rows_out)
+
+
+def timed_stage(name: str | None = None, job: str | None = None, **labels):
+    """
+    함수 전체를 stage() 로 감싸는 데코레이터. (일반 함수 / async 함수 모두 지원)
+
+    - rows_in : 첫 번째 DataFrame/배열 인자의 행 수
+    - rows_out : 반환값의 행 수 (함수 안에서 record_rows 로 직접 지정하면 그 값을 우선)
+    """
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        def _rows_in(args):
+            for arg in args:
+                if hasattr(arg, "shape"):
+                    return arg
+            return None
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(stage_name, job=job, rows_in=_rows_in(args), **labels) as rec:
+                    result = await fn(*args, **kwargs)
+                    if rec.rows_out is None:
+                        rec.set_rows(rows_out=result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, job=job, rows_in=_rows_in(args), **labels) as rec:
+                result = fn(*args, **kwargs)
+                if rec.rows_out is None:
+                    rec.set_rows(rows_out=result)
+            return result
+        return wrapper
+    return decorator
+
+# -----------------------------------------------------------
+# 🔌 프로세스 공용 엔진 레지스트리
+# -----------------------------------------------------------
+# (접속 URL, application_name) 당 엔진 1개를 재사용합니다.
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
 def get_engine_from_env(
     user_env="DB_USER",
     pass_env="DB_PASS",
     host_env="DB_HOST",
     port_env="DB_PORT",
-    name_env="DB_NAME"
+    name_env="DB_NAME",
+    app_name=None
 ):
     """
-    기본 yeosu_db의 접속 정보를 .env에서 읽어 SQLAlchemy 엔진을 생성합니다.
+    기본 yeosu_db의 접속 정보를 .env에서 읽어 SQLAlchemy 엔진을 반환합니다.
+    같은 접속 정보로 다시 호출하면 새로 만들지 않고 캐시된 엔진(커넥션 풀)을 돌려줍니다.
+
+    풀/커넥션 설정은 .env 에서 읽습니다.
+    - DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE(초), DB_POOL_TIMEOUT(초), DB_POOL_PRE_PING(0/1)
+    - DB_KEEPALIVES_IDLE(초), DB_STATEMENT_TIMEOUT_MS (0 또는 미설정 시 제한 없음)
+
+    Parameters
+    ----------
+    app_name : str, optional
+        PostgreSQL application_name. 없으면 DB_APP_NAME 또는 실행 스크립트 이름을 사용합니다.
     """
     db_config = {
         "DB_USER": os.getenv(user_env),
@@ -52,7 +354,59 @@ def get_engine_from_env(
         f"postgresql+psycopg2://{db_config['DB_USER']}:{db_config['DB_PASS']}"
         f"@{db_config['DB_HOST']}:{db_config['DB_PORT']}/{db_config['DB_NAME']}"
     )
-    return create_engine(url)
+    app_name = (
+        app_name
+        or os.getenv("DB_APP_NAME")
+        or os.path.splitext(os.path.basename(sys.argv[0] or ""))[0]
+        or "yeosu"
+    )
+
+    key = (url, app_name)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            connect_args = {
+                "application_name": app_name,
+                "keepalives": 1,
+                "keepalives_idle": _env_int("DB_KEEPALIVES_IDLE", 30),
+                "keepalives_interval": 10,
+                "keepalives_count": 5,
+            }
+            statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+            if statement_timeout > 0:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+            engine = create_engine(
+                url,
+                pool_size=_env_int("DB_POOL_SIZE", 5),
+                max_overflow=_env_int("DB_MAX_OVERFLOW", 5),
+                pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+                pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+                pool_pre_ping=_env_int("DB_POOL_PRE_PING", 1) == 1,
+                connect_args=connect_args,
+            )
+            _ENGINES[key] = engine
+    return engine
+
+
+def dispose_engines():
+    """레지스트리의 모든 엔진 커넥션 풀을 정리합니다. (프로세스 종료 시 자동 호출)"""
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+
+def _reset_engines_after_fork():
+    # fork 된 자식 프로세스는 부모의 커넥션을 닫지 않고 버린 뒤 새 풀을 사용
+    for engine in _ENGINES.values():
+        engine.dispose(close=False)
+    _ENGINES.clear()
+
+
+atexit.register(dispose_engines)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
 
 def get_src_dir():
     """
@@ -62,6 +416,277 @@ def get_src_dir():
     """
     return os.getenv("DATA_DIR", "../data")
 
+# -----------------------------------------------------------
+# 🔬 SQL 프로파일링 (느린 쿼리 실행 계획 캡처)
+# -----------------------------------------------------------
+# SQL_PROFILE=1 이면 profiled_execute / profiled_execute_sa / fetch_df 로 실행한 SQL 중
+# SQL_PROFILE_MIN_MS 이상 걸린 문장을 SAVEPOINT 안에서 EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) 으로
+# 한 번 더 실행해 계획을 얻고, 곧바로 롤백합니다. (데이터 변경은 남지 않지만 느린 문장은 두 번 실행됨)
+# 계획은 쿼리 이름 / 파라미터와 함께 SQL_PROFILE_DB(기본 LOG_DIR/sql_profile.sqlite)에 저장되며
+# deploy/bench/plan_report.py 로 조회/실행 간 비교합니다.
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with", "values", "merge", "execute")
+_CTAS = re.compile(r"^create\s+(?:temp\s+|temporary\s+)?table\s+\S+(?:\s+on\s+commit\s+\w+)?\s+as\s+(.*)$",
+                   re.IGNORECASE | re.DOTALL)
+_PROFILE_LOCK = threading.Lock()
+_PROFILE_RUN_ID = None
+
+SQL_PROFILE_DDL = """
+CREATE TABLE IF NOT EXISTS sql_profile (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id      TEXT NOT NULL,
+    ts          TEXT NOT NULL,
+    job         TEXT,
+    name        TEXT NOT NULL,
+    params      TEXT,
+    sql_hash    TEXT,
+    sql         TEXT,
+    elapsed_ms  REAL,
+    plan_ms     REAL,
+    plan        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sql_profile_name_run ON sql_profile (name, run_id);
+"""
+
+
+def sql_profile_enabled() -> bool:
+    return os.getenv("SQL_PROFILE", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def sql_profile_path() -> str:
+    return os.getenv("SQL_PROFILE_DB") or os.path.join(os.getenv("LOG_DIR", "./logs"), "sql_profile.sqlite")
+
+
+def sql_profile_run_id() -> str:
+    """한 프로세스 실행을 묶는 id. SQL_PROFILE_RUN_ID 로 지정하지 않으면 시작 시각-pid 입니다."""
+    global _PROFILE_RUN_ID
+    if _PROFILE_RUN_ID is None:
+        _PROFILE_RUN_ID = os.getenv("SQL_PROFILE_RUN_ID") or f"{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}"
+    return _PROFILE_RUN_ID
+
+
+def explainable_sql(sql: str) -> str | None:
+    """
+    EXPLAIN 할 수 있는 단일 문장이면 끝의 ';' 를 뗀 SQL 을, 아니면(DDL, COPY, 여러 문장) None 을 반환합니다.
+    CREATE TABLE ... AS 는 재실행 시 테이블이 이미 있으므로 AS 뒤의 조회문만 반환합니다.
+    """
+    body = re.sub(r"--[^\n]*", "", sql).strip().rstrip(";").strip()
+    if not body or ";" in body:
+        return None
+    ctas = _CTAS.match(body)
+    if ctas:
+        body = ctas.group(1).strip()
+    return body if body.split(None, 1)[0].lower() in _EXPLAINABLE else None
+
+
+def _should_profile(sql: str, elapsed_ms: float) -> str | None:
+    if not sql_profile_enabled():
+        return None
+    if elapsed_ms < float(os.getenv("SQL_PROFILE_MIN_MS", "1000")):
+        return None
+    return explainable_sql(sql)
+
+
+def save_sql_profile(name: str, sql: str, params, elapsed_ms: float, plan, job: str | None = None,
+                     labels: dict | None = None):
+    """
+    실행 계획 한 건을 프로파일 저장소(sqlite)에 기록합니다.
+    params 칼럼에는 바인드 파라미터("bind")와 labels(예: ym)를 함께 JSON 으로 저장합니다.
+    """
+    import sqlite3
+    import hashlib
+
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    root = plan[0] if isinstance(plan, list) else plan
+    path = sql_profile_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    row = (
+        sql_profile_run_id(),
+        datetime.now().isoformat(timespec="milliseconds"),
+        job or _default_job(),
+        name,
+        json.dumps({**(labels or {}), **({"bind": params} if params is not None else {})},
+                   ensure_ascii=False, default=str),
+        hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12],
+        sql,
+        round(elapsed_ms, 3),
+        root.get("Execution Time"),
+        json.dumps(plan, ensure_ascii=False),
+    )
+    with _PROFILE_LOCK:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            conn.executescript(SQL_PROFILE_DDL)
+            conn.execute(
+                "INSERT INTO sql_profile (run_id, ts, job, name, params, sql_hash, sql, elapsed_ms, plan_ms, plan)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    logging.getLogger(row[2]).info(f"🔬 [{name}] {elapsed_ms:,.0f}ms → 실행 계획 저장 ({path})")
+
+
+def profiled_execute(cur, name: str, sql: str, params=None, **labels):
+    """
+    DB-API(psycopg2) 커서로 sql 을 실행하고, 프로파일링 대상이면 실행 계획을 저장합니다.
+    계획은 별도 커서에서 얻으므로 cur 의 결과(fetch / rowcount)는 그대로 사용할 수 있습니다.
+
+    Parameters
+    ----------
+    name : str
+        저장/비교 기준이 되는 쿼리 이름 (예: "flowpop.tb_flowpop_agg_agegen")
+    params : tuple | dict, optional
+        cur.execute 바인드 파라미터
+    **labels
+        f-string 으로 SQL 에 들어간 값 등 함께 저장할 파라미터 (예: ym="202509")
+    """
+    t0 = time.perf_counter()
+    cur.execute(sql, params)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    body = _should_profile(sql, elapsed_ms)
+    if body is None:
+        return cur
+
+    conn = cur.connection
+    pcur = conn.cursor()
+    in_block = not getattr(conn, "autocommit", False)
+    try:
+        pcur.execute("SAVEPOINT sql_profile" if in_block else "BEGIN")
+        try:
+            pcur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {body}", params)
+            plan = pcur.fetchone()[0]
+        finally:
+            pcur.execute("ROLLBACK TO SAVEPOINT sql_profile; RELEASE SAVEPOINT sql_profile" if in_block else "ROLLBACK")
+        save_sql_profile(name, sql, params, elapsed_ms, plan, labels=labels)
+    except Exception as e:
+        # 프로파일 실패로 적재가 중단되지 않도록 경고만 남깁니다.
+        logging.getLogger(_default_job()).warning(f"⚠️ 실행 계획 캡처 실패 ({name}): {e}")
+    finally:
+        pcur.close()
+    return cur
+
+
+def profiled_execute_sa(conn, name: str, sql: str, params: dict | None = None):
+    """
+    SQLAlchemy Connection 으로 text(sql) 을 실행하고 Result 를 반환합니다. (프로파일링은 profiled_execute 와 동일)
+    """
+    from sqlalchemy import text
+
+    t0 = time.perf_counter()
+    result = conn.execute(text(sql), params or {})
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    body = _should_profile(sql, elapsed_ms)
+    if body is None:
+        return result
+
+    # 계획용 재실행 전에 결과를 버퍼링해 둡니다. (같은 커넥션에서 다음 문장을 실행하므로)
+    if result.returns_rows:
+        result = result.freeze()()
+    try:
+        with conn.begin_nested() as savepoint:
+            plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {body}"), params or {}).scalar()
+            savepoint.rollback()
+        save_sql_profile(name, sql, params, elapsed_ms, plan)
+    except Exception as e:
+        logging.getLogger(_default_job()).warning(f"⚠️ 실행 계획 캡처 실패 ({name}): {e}")
+    return result
+
+
+def read_sql_profiled(query: str, engine, params=None, name: str = "read_sql") -> pd.DataFrame:
+    """
+    pd.read_sql_query 와 같은 DataFrame 을 반환하되, profiled_execute 로 실행해 느린 쿼리의 계획을 남깁니다.
+    (psycopg2 %(name)s 형식 파라미터)
+    """
+    import pandas as pd
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        profiled_execute(cur, name, query, params)
+        columns = [d[0] for d in cur.description]
+        df = pd.DataFrame.from_records(cur.fetchall(), columns=columns, coerce_float=True)
+        raw.rollback()
+        return df
+    finally:
+        raw.close()
+
+# -----------------------------------------------------------
+# 🔢 grid_id 표현 (메모리: int32 / 저장: CHAR(8) 또는 INTEGER)
+# -----------------------------------------------------------
+# 여수 50m 격자 id 는 8자리 정수이므로 int32 로 충분합니다.
+# 파일/원천에서 읽은 값은 to_grid_id 로 검증한 뒤 Int32 로 다루고,
+# 적재 직전에만 grid_id_for_storage 로 GRID_ID_STORAGE 형식(char | int)에 맞춥니다.
+GRID_ID_MIN = 10_000_000
+GRID_ID_MAX = 99_999_999
+
+
+def grid_id_storage() -> str:
+    """GRID_ID_STORAGE 환경변수 값("char" | "int", 기본 char)을 반환합니다."""
+    storage = os.getenv("GRID_ID_STORAGE", "char").strip().lower()
+    if storage not in ("char", "int"):
+        raise ValueError(f"GRID_ID_STORAGE 는 char 또는 int 여야 합니다: {storage!r}")
+    return storage
+
+
+def grid_id_sql_type() -> str:
+    """신규 테이블 DDL 의 grid_id 컬럼 타입"""
+    return "INTEGER" if grid_id_storage() == "int" else "CHAR(8)"
+
+
+def to_grid_id(values, errors: str = "coerce") -> pd.Series:
+    """
+    grid_id 값(8자리 문자열 / 정수 / 실수)을 검증해 Int32 Series 로 변환합니다.
+
+    Parameters
+    ----------
+    values : Series | array-like
+        변환할 grid_id 값
+    errors : {"coerce", "raise"}
+        8자리 범위를 벗어나거나(결측 sentinel -1, int64 최솟값 등) 숫자가 아닌 값을
+        coerce 이면 <NA> 로 바꾸고, raise 이면 ValueError 를 발생시킵니다.
+    """
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        numeric = pd.to_numeric(series.astype("string").str.strip(), errors="coerce")
+    else:
+        numeric = pd.to_numeric(series, errors="coerce")
+    numeric = numeric.astype("Float64")
+    valid = (numeric >= GRID_ID_MIN) & (numeric <= GRID_ID_MAX) & (numeric % 1 == 0)
+    valid = valid.fillna(False).astype(bool)
+    if errors == "raise":
+        bad = series[~valid & series.notna()]
+        if len(bad):
+            raise ValueError(f"잘못된 grid_id {len(bad):,}건 (예: {bad.iloc[:3].tolist()})")
+    return numeric.where(valid).astype("Int32")
+
+
+def grid_id_for_storage(values) -> pd.Series:
+    """
+    grid_id 를 GRID_ID_STORAGE 형식의 적재용 값으로 변환합니다.
+    - char : 8자리 문자열 (결측은 None)
+    - int  : Int32
+    """
+    ids = to_grid_id(values)
+    if grid_id_storage() == "int":
+        return ids
+    return ids.astype("string").astype(object).where(ids.notna(), None)
+
+
+def compact_grid_mapping(mapping: dict) -> pd.Series:
+    """
+    {키: grid_id} 매핑 dict 를 키 인덱스 + Int32 값의 Series 로 변환합니다.
+    잘못된 grid_id(-1, int64 최솟값 등 결측 sentinel)는 제외하므로 Series.map 결과의 미매칭은 <NA> 입니다.
+    """
+    import pandas as pd
+
+    ids = to_grid_id(pd.Series(mapping, dtype=object))
+    return ids[ids.notna()]
+
+
 def get_grid_id(points_gdf: gpd.GeoDataFrame, grid_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     """
     각 포인트(GeoDataFrame)가 어느 격자(grid_gdf)에 포함되는지를 계산하여,
@@ -111,6 +736,7 @@ def get_grid_id(points_gdf: gpd.GeoDataFrame, grid_gdf: gpd.GeoDataFrame) -> gpd
     POINT(127.03 37.5)   10021
     POINT(127.05 37.52)  10022
     """
+    import geopandas as gpd
 
     # 1️⃣ 좌표계 통일
     if points_gdf.crs != grid_gdf.crs:
@@ -137,3 +763,661 @@ def get_grid_id(points_gdf: gpd.GeoDataFrame, grid_gdf: gpd.GeoDataFrame) -> gpd
     result["grid_id"] = joined["grid_id"].values.astype(int)
 
     return result
+
+
+# -----------------------------------------------------------
+# 🧮 격자 산술 좌표 변환 (O(1) point → grid_id)
+# -----------------------------------------------------------
+# 여수 격자는 EPSG:5179 기준 50m 정규 격자이며 id 는 행/열 번호의 선형식으로 부여됩니다.
+LATTICE_CRS = "EPSG:5179"
+
+
+class GridLattice:
+    """
+    정규 격자의 원점, 셀 크기, id 배치 규칙을 보관하고
+    투영 좌표로부터 grid_id 를 산술적으로 계산합니다.
+
+    grid_id = id0 + row_stride * row + col_stride * col
+    row = floor((y - y0) / cell_size), col = floor((x - x0) / cell_size)
+
+    Parameters
+    ----------
+    x0, y0 : float
+        격자 원점(좌하단) 좌표 (crs 단위)
+    cell_size : float
+        셀 한 변의 길이 (crs 단위, 여수 격자는 50m)
+    id0, row_stride, col_stride : int
+        id 배치 규칙 계수
+    ids : array-like
+        격자 레이어에 실제로 존재하는 grid_id 목록 (경계 판정용)
+    crs : str
+        격자 좌표계 (기본 EPSG:5179)
+    """
+
+    def __init__(self, x0, y0, cell_size, id0, row_stride, col_stride, ids, crs=LATTICE_CRS):
+        self.x0 = float(x0)
+        self.y0 = float(y0)
+        self.cell_size = float(cell_size)
+        self.id0 = int(id0)
+        self.row_stride = int(row_stride)
+        self.col_stride = int(col_stride)
+        self.ids = np.unique(np.asarray(ids, dtype=np.int64)).astype(np.int32)
+        self.crs = crs
+
+    @classmethod
+    def from_grid(cls, grid_gdf: gpd.GeoDataFrame, crs=LATTICE_CRS) -> "GridLattice":
+        """
+        격자 레이어(id, geometry)로부터 원점/셀 크기/id 배치 규칙을 학습합니다.
+        모든 격자에 대해 산술식이 id 를 정확히 재현하지 못하면 ValueError 를 발생시킵니다.
+        """
+        grid = grid_gdf[['id', 'geometry']]
+        if grid.crs != crs:
+            grid = grid.to_crs(crs)
+
+        bounds = grid.geometry.bounds
+        ids = grid['id'].astype(np.int64).values
+        cell_size = float(np.round(np.median(bounds['maxx'] - bounds['minx']), 3))
+
+        # 1️⃣ 셀 중심 기준 행/열 번호 산출
+        cx = ((bounds['minx'] + bounds['maxx']) / 2).values
+        cy = ((bounds['miny'] + bounds['maxy']) / 2).values
+        col = np.rint((cx - cx.min()) / cell_size).astype(np.int64)
+        row = np.rint((cy - cy.min()) / cell_size).astype(np.int64)
+
+        # 2️⃣ 원점 보정 (재투영 오차를 중앙값으로 흡수)
+        x0 = float(np.median(bounds['minx'].values - col * cell_size))
+        y0 = float(np.median(bounds['miny'].values - row * cell_size))
+
+        # 3️⃣ id = id0 + row_stride*row + col_stride*col 선형식 적합
+        design = np.column_stack([np.ones_like(row), row, col]).astype(np.float64)
+        coef, *_ = np.linalg.lstsq(design, ids.astype(np.float64), rcond=None)
+        id0, row_stride, col_stride = (int(v) for v in np.rint(coef))
+        predicted = id0 + row_stride * row + col_stride * col
+        mismatch = int((predicted != ids).sum())
+        if mismatch:
+            raise ValueError(f"격자 id 배치 규칙을 학습하지 못했습니다 (불일치 {mismatch:,}건)")
+
+        return cls(x0, y0, cell_size, id0, row_stride, col_stride, ids, crs=crs)
+
+    def locate_xy(self, x, y, edge_tol: float = 1e-6):
+        """
+        투영 좌표 배열(x, y)을 grid_id 배열로 변환합니다. (순수 NumPy 연산)
+
+        Returns
+        -------
+        (numpy.ndarray, numpy.ndarray)
+            grid_id(int32, 미확정은 -1), 폴리곤 재확인이 필요한 포인트 마스크
+        """
+        fx = (np.asarray(x, dtype=np.float64) - self.x0) / self.cell_size
+        fy = (np.asarray(y, dtype=np.float64) - self.y0) / self.cell_size
+        col = np.floor(fx)
+        row = np.floor(fy)
+
+        ids = (self.id0 + self.row_stride * row + self.col_stride * col)
+        ids = np.where(np.isfinite(ids), ids, -1).astype(np.int64)
+
+        # 격자 레이어에 없는 id (여수 경계 바깥 또는 경계 셀) 는 폴리곤으로 재확인
+        # (from_json 으로 만든 규칙은 ids 목록이 없으므로 전부 재확인)
+        if len(self.ids):
+            pos = np.searchsorted(self.ids, ids).clip(0, len(self.ids) - 1)
+            known = self.ids[pos] == ids
+        else:
+            known = np.zeros(len(ids), dtype=bool)
+
+        # 셀 경계선 위 포인트는 intersects 기준으로 인접 셀과 겹치므로 재확인
+        tol = edge_tol / self.cell_size
+        on_edge = (
+            (np.minimum(fx - col, col + 1 - fx) < tol)
+            | (np.minimum(fy - row, row + 1 - fy) < tol)
+        )
+
+        fallback = ~known | on_edge
+        ids[fallback] = -1
+        return ids.astype(np.int32), fallback
+
+    # -------------------------------------------------------
+    # 상위 해상도(250m, 1km 등) 격자 id 계산
+    # -------------------------------------------------------
+    def _strides(self):
+        """(큰 stride, 작은 stride) 를 반환합니다. id 에서 행/열 번호를 역산할 때 사용합니다."""
+        if abs(self.row_stride) >= abs(self.col_stride):
+            return self.row_stride, self.col_stride
+        return self.col_stride, self.row_stride
+
+    def factor_of(self, size: float) -> int:
+        """셀 크기(size, crs 단위)가 기본 셀의 몇 배인지 반환합니다. 정수배가 아니면 ValueError."""
+        factor = size / self.cell_size
+        if factor < 1 or abs(factor - round(factor)) > 1e-6:
+            raise ValueError(f"{size} 는 격자 셀 크기 {self.cell_size} 의 정수배가 아닙니다.")
+        return int(round(factor))
+
+    def parent_id(self, grid_ids, factor: int) -> np.ndarray:
+        """
+        grid_id 배열을 factor×factor 블록 단위 상위 격자 id 로 변환합니다.
+        상위 격자 id 는 블록의 좌하단(행/열 번호가 가장 작은) 기본 격자 id 입니다.
+
+        Parameters
+        ----------
+        grid_ids : array-like
+            기본 격자 grid_id (또는 factor 의 약수 단위 상위 격자 id)
+        factor : int
+            블록 한 변의 기본 셀 개수 (50m 격자 기준 250m → 5, 1km → 20)
+        """
+        big, small = self._strides()
+        off = np.asarray(grid_ids, dtype=np.int64) - self.id0
+        q = off / big
+        q = np.floor(q) if (big > 0) == (small > 0) else np.ceil(q)
+        q = q.astype(np.int64)
+        r = (off - big * q) // small
+        return (self.id0 + big * (q // factor * factor) + small * (r // factor * factor)).astype(np.int32)
+
+    def parent_id_sql(self, expr: str, factor: int) -> str:
+        """
+        parent_id 와 같은 계산을 하는 PostgreSQL 식을 반환합니다.
+        expr 은 grid_id 컬럼(CHAR(8) 또는 INTEGER) 식이며 결과는 bigint 입니다.
+        """
+        big, small = self._strides()
+        rnd = "floor" if (big > 0) == (small > 0) else "ceil"
+        off = f"(({expr})::bigint - {self.id0})"
+        q = f"{rnd}({off}::numeric / {big})::bigint"
+        r = f"(({off} - {big} * {q}) / {small})"
+        return f"({self.id0} + {big} * ({q} / {factor} * {factor}) + {small} * ({r} / {factor} * {factor}))"
+
+    # -------------------------------------------------------
+    # 격자 규칙 저장/로드 (격자 레이어 없이 id 산술만 필요한 작업용)
+    # -------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {
+            "x0": self.x0, "y0": self.y0, "cell_size": self.cell_size,
+            "id0": self.id0, "row_stride": self.row_stride, "col_stride": self.col_stride,
+            "crs": self.crs,
+        }
+
+    def to_json(self, path: str):
+        """격자 규칙 계수를 JSON 으로 저장합니다. (ids 목록은 저장하지 않습니다)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def from_json(cls, path: str) -> "GridLattice":
+        """
+        to_json 으로 저장한 격자 규칙을 로드합니다.
+        ids 목록이 없으므로 parent_id 등 id 산술 전용이며, locate_xy 는 모든 포인트를 재확인 대상으로 돌려줍니다.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            params = json.load(f)
+        return cls(ids=[], **params)
+
+
+def get_grid_id_fast(points_gdf: gpd.GeoDataFrame, grid_gdf: gpd.GeoDataFrame,
+                     lattice: GridLattice | None = None) -> gpd.GeoDataFrame:
+    """
+    get_grid_id 와 동일한 결과를 산술 격자 변환으로 계산합니다.
+    대부분의 포인트는 NumPy 연산만으로 grid_id 가 결정되고,
+    경계 셀(격자 레이어에 없는 id, 셀 경계선 위 포인트)만 get_grid_id 의 sjoin 으로 재확인합니다.
+
+    Parameters
+    ----------
+    points_gdf : geopandas.GeoDataFrame
+        격자 매핑 대상 포인트 데이터
+    grid_gdf : geopandas.GeoDataFrame
+        격자(폴리곤) 데이터 ('id', 'geometry')
+    lattice : GridLattice, optional
+        미리 학습된 격자 규칙. 없으면 grid_gdf 로부터 학습합니다.
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+        원본 points_gdf 에 grid_id(Int32, 미포함은 <NA>) 컬럼이 추가된 GeoDataFrame
+    """
+    import pandas as pd
+    import geopandas as gpd
+
+    if lattice is None:
+        lattice = GridLattice.from_grid(grid_gdf)
+
+    # 1️⃣ 격자 좌표계로 투영 후 좌표 배열 추출
+    projected = points_gdf.geometry
+    if projected.crs != lattice.crs:
+        projected = projected.to_crs(lattice.crs)
+    ids, fallback = lattice.locate_xy(projected.x.values, projected.y.values)
+
+    # 2️⃣ 경계 포인트만 폴리곤 sjoin 으로 재확인
+    result = points_gdf.copy()
+    grid_ids = pd.array(np.where(ids >= 0, ids, 0), dtype="Int32")
+    grid_ids[~(ids >= 0)] = pd.NA
+    if fallback.any():
+        subset = points_gdf.iloc[np.flatnonzero(fallback)]
+        if subset.crs != grid_gdf.crs:
+            subset = subset.to_crs(grid_gdf.crs)
+        joined = gpd.sjoin(
+            subset[['geometry']].reset_index(drop=True),
+            grid_gdf[['id', 'geometry']],
+            how="left",
+            predicate="intersects"
+        )
+        # 경계선 위 포인트는 여러 셀과 겹칠 수 있으므로 첫 번째 셀만 사용
+        joined = joined[~joined.index.duplicated(keep="first")].sort_index()
+        grid_ids[np.flatnonzero(fallback)] = pd.array(
+            pd.to_numeric(joined['id'], errors="coerce").values, dtype="Int32"
+        )
+    result["grid_id"] = grid_ids
+
+    return result
+
+
+# -----------------------------------------------------------
+# 🗺️ 공유 격자 인덱스 (GeoParquet 캐시 + STRtree + prepared geometry)
+# -----------------------------------------------------------
+def get_grid_paths():
+    """
+    격자 원본/캐시/행정동 경계/격자 규칙 파일 경로를 환경변수에서 읽어 반환합니다.
+    GRID_PATH, GRID_CACHE_PATH, ADMIN_DONG_PATH, GRID_LATTICE_PATH 가 없으면 DATA_DIR 하위 기본 경로를 사용합니다.
+
+    - grid    : 여수 50m 격자 (id, geometry) GeoJSON
+    - admin   : 여수시 행정동 경계 GeoJSON (adm_cd2, geometry 컬럼)
+                전국 행정동 경계(HangJeongDong_verYYYYMMDD.geojson, sggnm 컬럼 포함)를 그대로 두어도 되며
+                이 경우 sggnm == '여수시' 만 사용합니다.
+    - cache   : 위 두 파일로 build_grid_cache 가 만드는 GeoParquet (id, admin_cd, geometry)
+    - lattice : 격자 규칙 JSON (없으면 GridIndex 에서 학습해 저장)
+
+    grid / admin / cache 는 저장소 루트의 extract_ys_grid.py 가 원본 격자 shp 와 행정동 경계에서 한 번에 생성합니다.
+    """
+    src_dir = get_src_dir()
+    return {
+        "grid": os.getenv("GRID_PATH", os.path.join(src_dir, "json/yeosu_grid_filtered.geojson")),
+        "cache": os.getenv("GRID_CACHE_PATH", os.path.join(src_dir, "json/yeosu_grid.parquet")),
+        "admin": os.getenv("ADMIN_DONG_PATH", os.path.join(src_dir, "json/yeosu_admin_dong.geojson")),
+        "lattice": os.getenv("GRID_LATTICE_PATH", os.path.join(src_dir, "json/grid_lattice.json")),
+    }
+
+
+def require_grid_file(path: str, label: str, env_name: str):
+    """격자 인덱스 입력 파일이 없으면 경로와 지정 방법을 담은 FileNotFoundError 를 발생시킵니다."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{label} 파일이 없습니다: {path} "
+            f"(파일을 이 경로에 두거나 {env_name} 환경변수로 지정하세요. 형식은 get_grid_paths 참고)"
+        )
+
+
+def build_grid_cache(grid_path: str, admin_path: str, cache_path: str, sgg_name: str = "여수시") -> gpd.GeoDataFrame:
+    """
+    여수 격자에 행정동 코드(admin_cd)를 미리 계산하여 GeoParquet 캐시로 저장합니다.
+    행정동은 격자 중심점 기준으로 배정하고, 바다 등 미매칭 격자는 가장 가까운 행정동으로 채웁니다.
+    """
+    import geopandas as gpd
+
+    require_grid_file(grid_path, "격자", "GRID_PATH")
+    require_grid_file(admin_path, "행정동 경계", "ADMIN_DONG_PATH")
+
+    grid = gpd.read_file(grid_path)[['id', 'geometry']]
+    grid['id'] = grid['id'].astype(np.int32)
+
+    admin = gpd.read_file(admin_path)
+    if 'sggnm' in admin.columns:
+        admin = admin[admin['sggnm'] == sgg_name]
+    admin = admin[['adm_cd2', 'geometry']].to_crs(grid.crs)
+
+    # 1️⃣ 중심점 기준 행정동 배정 (경계 셀 중복 매칭 방지)
+    centers = gpd.GeoDataFrame(geometry=grid.geometry.representative_point(), crs=grid.crs)
+    joined = gpd.sjoin(centers, admin, how="left", predicate="within")
+    joined = joined[~joined.index.duplicated(keep="first")]
+    grid['admin_cd'] = joined['adm_cd2'].reindex(grid.index).values
+
+    # 2️⃣ 미매칭 격자는 최근접 행정동
+    unmatched = grid['admin_cd'].isna()
+    if unmatched.any():
+        nearest = gpd.sjoin_nearest(grid.loc[unmatched, ['geometry']], admin, how="left")
+        nearest = nearest[~nearest.index.duplicated(keep="first")]
+        grid.loc[unmatched, 'admin_cd'] = nearest['adm_cd2'].values
+
+    grid['admin_cd'] = grid['admin_cd'].astype(str)
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    grid.to_parquet(cache_path)
+    return grid
+
+
+class GridIndex:
+    """
+    여수 격자를 한 번만 로드해 두고 여러 공간 매핑 작업이 공유하는 인덱스입니다.
+
+    - 정규 격자 산술 변환(GridLattice)으로 point → grid_id 를 먼저 계산하고
+    - 경계 포인트만 미리 생성된 STRtree + prepared geometry 로 재확인합니다.
+    - 격자별 행정동 코드(admin_cd)는 캐시에 미리 계산되어 있습니다.
+
+    Example
+    -------
+    >>> index = get_grid_index()
+    >>> grid_ids = index.locate(points_gdf)
+    >>> admin_cds = index.admin_of(grid_ids)
+    """
+
+    def __init__(self, grid_gdf: gpd.GeoDataFrame):
+        import pandas as pd
+        import shapely
+
+        self.grid = grid_gdf.reset_index(drop=True)
+        self.crs = self.grid.crs
+        self.ids = self.grid['id'].astype(np.int32).values
+        self._id_index = pd.Index(self.ids)
+
+        geoms = self.grid.geometry.values
+        shapely.prepare(geoms)
+        self.tree = shapely.STRtree(geoms)
+
+        try:
+            self.lattice = GridLattice.from_grid(self.grid)
+        except ValueError:
+            self.lattice = None
+
+    @classmethod
+    def load(cls, cache_path: str | None = None, grid_path: str | None = None,
+             admin_path: str | None = None) -> "GridIndex":
+        """
+        GeoParquet 캐시에서 격자를 로드합니다.
+        캐시가 없거나 원본 격자 파일보다 오래되었으면 원본에서 다시 생성합니다.
+        """
+        import geopandas as gpd
+
+        paths = get_grid_paths()
+        cache_path = cache_path or paths["cache"]
+        grid_path = grid_path or paths["grid"]
+        admin_path = admin_path or paths["admin"]
+
+        stale = (
+            not os.path.exists(cache_path)
+            or (os.path.exists(grid_path) and os.path.getmtime(grid_path) > os.path.getmtime(cache_path))
+        )
+        if stale:
+            grid = build_grid_cache(grid_path, admin_path, cache_path)
+        else:
+            grid = gpd.read_parquet(cache_path)
+        return cls(grid)
+
+    def _points_xy(self, points):
+        """GeoSeries/GeoDataFrame 또는 (x, y) 튜플을 격자 좌표계 geometry 배열로 변환합니다."""
+        import geopandas as gpd
+        import shapely
+
+        if isinstance(points, tuple):
+            return shapely.points(np.asarray(points[0]), np.asarray(points[1]))
+        geoms = points.geometry if isinstance(points, gpd.GeoDataFrame) else points
+        if geoms.crs is not None and geoms.crs != self.crs:
+            geoms = geoms.to_crs(self.crs)
+        return geoms.values
+
+    def locate(self, points) -> np.ndarray:
+        """
+        포인트가 포함된 격자의 grid_id 배열(int32, 미포함은 -1)을 반환합니다.
+
+        Parameters
+        ----------
+        points : GeoDataFrame | GeoSeries | tuple
+            포인트 데이터 또는 격자 좌표계 기준 (x, y) 배열 튜플
+        """
+        import geopandas as gpd
+
+        geoms = np.asarray(self._points_xy(points))
+        ids = np.full(len(geoms), -1, dtype=np.int32)
+        pending = np.ones(len(geoms), dtype=bool)
+
+        # 1️⃣ 산술 격자 변환
+        if self.lattice is not None and len(geoms):
+            projected = gpd.GeoSeries(geoms, crs=self.crs).to_crs(self.lattice.crs)
+            lat_ids, fallback = self.lattice.locate_xy(projected.x.values, projected.y.values)
+            ids[~fallback] = lat_ids[~fallback]
+            pending = fallback
+
+        # 2️⃣ 경계 포인트만 STRtree + prepared geometry 로 재확인
+        todo = np.flatnonzero(pending)
+        if len(todo):
+            src, hit = self.tree.query(geoms[todo], predicate="intersects")
+            first_src, first_pos = np.unique(src, return_index=True)
+            ids[todo[first_src]] = self.ids[hit[first_pos]]
+        return ids
+
+    def query_bbox(self, minx: float, miny: float, maxx: float, maxy: float) -> gpd.GeoDataFrame:
+        """격자 좌표계 기준 bbox 와 겹치는 격자를 반환합니다."""
+        import shapely
+
+        hit = self.tree.query(shapely.box(minx, miny, maxx, maxy), predicate="intersects")
+        return self.grid.iloc[np.sort(hit)]
+
+    def admin_of(self, grid_ids) -> np.ndarray:
+        """grid_id 배열에 대응하는 행정동 코드 배열을 반환합니다. (미존재 격자는 None)"""
+        pos = self._id_index.get_indexer(np.asarray(grid_ids, dtype=np.int32))
+        admin = self.grid['admin_cd'].values
+        return np.where(pos >= 0, admin[pos.clip(0)], None)
+
+    def locate_admin(self, points) -> np.ndarray:
+        """포인트가 속한 격자의 행정동 코드 배열을 반환합니다."""
+        return self.admin_of(self.locate(points))
+
+
+@functools.lru_cache(maxsize=None)
+def get_grid_index(cache_path: str | None = None) -> GridIndex:
+    """
+    프로세스 전체에서 공유하는 GridIndex 를 반환합니다. (최초 호출 시 한 번만 로드)
+    """
+    return GridIndex.load(cache_path=cache_path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_grid_lattice(path: str | None = None) -> GridLattice:
+    """
+    격자 규칙(GridLattice)을 반환합니다.
+    저장된 grid_lattice.json 이 있으면 격자 레이어를 읽지 않고 바로 로드하고,
+    없으면 GridIndex 에서 학습한 뒤 다음 실행을 위해 저장합니다.
+    """
+    path = path or get_grid_paths()["lattice"]
+    if os.path.exists(path):
+        return GridLattice.from_json(path)
+
+    lattice = get_grid_index().lattice
+    if lattice is None:
+        raise ValueError("격자 레이어가 정규 격자가 아니어서 격자 규칙을 만들 수 없습니다.")
+    lattice.to_json(path)
+    return lattice
+
+
+# -----------------------------------------------------------
+# ⚡ asyncpg 비동기 데이터 접근 계층
+# -----------------------------------------------------------
+# 독립적인 조회/적재를 소수의 커넥션 위에서 겹쳐 실행하기 위한 계층입니다.
+# asyncpg 는 선택 의존성이므로 실제로 사용할 때만 import 합니다.
+_ASYNC_POOLS = {}
+
+# pandas dtype → PostgreSQL 타입 (to_sql 이 생성하는 타입과 동일 계열)
+_PG_TYPES = {"i": "BIGINT", "u": "BIGINT", "f": "DOUBLE PRECISION", "b": "BOOLEAN", "M": "TIMESTAMP"}
+
+
+def get_async_dsn(
+    user_env="DB_USER",
+    pass_env="DB_PASS",
+    host_env="DB_HOST",
+    port_env="DB_PORT",
+    name_env="DB_NAME"
+) -> str:
+    """get_engine_from_env 와 같은 환경변수로 asyncpg 접속 DSN 을 만듭니다."""
+    return (
+        f"postgresql://{os.getenv(user_env)}:{os.getenv(pass_env)}"
+        f"@{os.getenv(host_env)}:{os.getenv(port_env)}/{os.getenv(name_env)}"
+    )
+
+
+async def get_async_pool(dsn: str | None = None, app_name: str | None = None, max_size: int | None = None):
+    """
+    현재 이벤트 루프에서 사용할 asyncpg 커넥션 풀을 반환합니다. (DSN/루프별 1개 캐시)
+    풀 크기는 ASYNC_POOL_SIZE (기본 4) 로 조절합니다.
+    """
+    import asyncpg
+
+    dsn = dsn or get_async_dsn()
+    app_name = app_name or os.getenv("DB_APP_NAME") or "yeosu"
+    key = (dsn, app_name, id(asyncio.get_running_loop()))
+    pool = _ASYNC_POOLS.get(key)
+    if pool is None:
+        pool = await asyncpg.create_pool(
+            dsn,
+            min_size=1,
+            max_size=max_size or _env_int("ASYNC_POOL_SIZE", 4),
+            server_settings={"application_name": app_name},
+        )
+        _ASYNC_POOLS[key] = pool
+    return pool
+
+
+async def close_async_pools():
+    """현재 이벤트 루프에서 만든 asyncpg 풀을 모두 닫습니다."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _ASYNC_POOLS if k[2] == loop_id]:
+        await _ASYNC_POOLS.pop(key).close()
+
+
+async def fetch_df(pool, query: str, *args, name: str | None = None) -> pd.DataFrame:
+    """
+    쿼리 결과를 DataFrame 으로 반환합니다. (prepared statement, $1 형식 파라미터)
+    name 은 SQL 프로파일링(SQL_PROFILE=1) 시 저장할 쿼리 이름입니다.
+    """
+    import pandas as pd
+
+    async with pool.acquire() as conn:
+        t0 = time.perf_counter()
+        stmt = await conn.prepare(query)
+        columns = [attr.name for attr in stmt.get_attributes()]
+        records = await stmt.fetch(*args)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        body = _should_profile(query, elapsed_ms)
+        if body is not None:
+            try:
+                tr = conn.transaction()
+                await tr.start()
+                try:
+                    plan = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {body}", *args)
+                finally:
+                    await tr.rollback()
+                save_sql_profile(name or "fetch_df", query, list(args) or None, elapsed_ms, plan)
+            except Exception as e:
+                logging.getLogger(_default_job()).warning(f"⚠️ 실행 계획 캡처 실패 ({name}): {e}")
+    return pd.DataFrame([tuple(r) for r in records], columns=columns)
+
+
+async def fetch_arrow(pool, query: str, *args):
+    """쿼리 결과를 pyarrow.Table 로 반환합니다."""
+    import pyarrow as pa
+
+    async with pool.acquire() as conn:
+        stmt = await conn.prepare(query)
+        columns = [attr.name for attr in stmt.get_attributes()]
+        records = await stmt.fetch(*args)
+    return pa.table({name: [r[i] for r in records] for i, name in enumerate(columns)})
+
+
+def _pg_type(dtype) -> str:
+    if dtype.kind == "i" and dtype.itemsize <= 4:
+        return "INTEGER"
+    return _PG_TYPES.get(dtype.kind, "TEXT")
+
+
+def _create_table_sql(df: pd.DataFrame, table: str, schema: str) -> str:
+    cols = ", ".join(f'"{c}" {_pg_type(df[c].dtype)}' for c in df.columns)
+    return f'CREATE TABLE IF NOT EXISTS "{schema}"."{table}" ({cols})'
+
+
+async def copy_df_to_table(pool, df: pd.DataFrame, table: str, schema: str = "public",
+                           if_exists: str = "append") -> int:
+    """
+    DataFrame 을 copy_records_to_table(바이너리 COPY)로 적재합니다.
+
+    Parameters
+    ----------
+    if_exists : {"append", "replace"}
+        replace 이면 테이블을 삭제 후 DataFrame dtype 기준으로 다시 생성합니다.
+        (to_sql 의 if_exists 와 같은 의미)
+    """
+    records = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if if_exists == "replace":
+                await conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table}"')
+            await conn.execute(_create_table_sql(df, table, schema))
+            await conn.copy_records_to_table(
+                table, records=records, columns=[str(c) for c in df.columns], schema_name=schema
+            )
+    return len(records)
+
+
+class ConcurrencyGate:
+    """동시에 실행되는 코루틴 수를 limit 개로 제한합니다."""
+
+    def __init__(self, limit: int | None = None):
+        self._semaphore = asyncio.Semaphore(limit or _env_int("ASYNC_CONCURRENCY", 4))
+
+    async def run(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    async def gather(self, *coros):
+        return await asyncio.gather(*(self.run(c) for c in coros))
+
+
+class AsyncRunner:
+    """
+    백그라운드 스레드의 이벤트 루프에 코루틴을 제출합니다.
+    동기 코드(pandas 전처리 등)를 진행하는 동안 이전 단계의 적재를 겹쳐 실행할 때 사용합니다.
+
+    Example
+    -------
+    >>> with AsyncRunner() as runner:
+    ...     future = runner.submit(copy_df_to_table(runner.pool(), df, "tb_x"))
+    ...     ...  # 다음 데이터 준비
+    """
+
+    def __init__(self, dsn: str | None = None, app_name: str | None = None, limit: int | None = None):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self._dsn = dsn
+        self._app_name = app_name
+        self._pool = self.call(get_async_pool(dsn, app_name))
+        self.gate = self.call(self._make_gate(limit))
+        self._futures = []
+
+    @staticmethod
+    async def _make_gate(limit):
+        return ConcurrencyGate(limit)
+
+    def pool(self):
+        return self._pool
+
+    def call(self, coro):
+        """코루틴을 실행하고 결과를 기다립니다."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def submit(self, coro):
+        """코루틴을 동시성 제한 안에서 실행하도록 제출하고 Future 를 반환합니다."""
+        future = asyncio.run_coroutine_threadsafe(self.gate.run(coro), self.loop)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """제출된 작업이 모두 끝날 때까지 기다립니다. (실패가 있으면 예외 전파)"""
+        futures, self._futures = self._futures, []
+        return [f.result() for f in futures]
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self.call(close_async_pools())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,68 @@
+#!/bin/bash
+
+# flowpop / pop / localeco / wifi_predict 를 하나의 프로세스에서 스케줄 실행
+# 사용 예) ./orchestrator_start.sh start --wifi-http
+
+WORKDIR=module/
+
+DAEMON=orchestrator.py
+
+LOG=log/startup.log
+
+PIDFILE=log/orchestrator.pid
+
+DAEMON_ARGS="${@:2}"
+
+# 정상 종료(SIGTERM) 대기 시간(초). 초과하면 강제 종료
+STOP_TIMEOUT=${ORCH_SHUTDOWN_TIMEOUT:-600}
+
+
+if ! [ -d ${WORKDIR}/log ]; then
+    mkdir ${WORKDIR}/log
+fi
+
+function do_start()
+{
+	cd ${WORKDIR}
+	if [ -f ${PIDFILE} ] && kill -0 `cat ${PIDFILE}` 2>/dev/null; then
+		echo '>>>>' ${DAEMON} `cat ${PIDFILE}` 'already running'
+		return
+	fi
+	nohup python -u ${DAEMON} serve ${DAEMON_ARGS} >> ${LOG} 2>&1 &
+	echo $! > ${PIDFILE}
+	cd - > /dev/null
+}
+
+function do_stop()
+{
+	PID=`cat ${WORKDIR}/${PIDFILE} 2>/dev/null`
+	if [ "$PID" != "" ] && kill -0 $PID 2>/dev/null; then
+		# 실행 중인 태스크가 끝날 때까지 기다린 뒤 종료
+		kill -TERM $PID
+		for i in `seq ${STOP_TIMEOUT}`; do
+			kill -0 $PID 2>/dev/null || break
+			sleep 1
+		done
+		if kill -0 $PID 2>/dev/null; then
+			kill -9 $PID
+			echo '>>>>' ${DAEMON} $PID 'killed (timeout)'
+		else
+			echo '>>>>' ${DAEMON} $PID 'stopped'
+		fi
+	fi
+	rm -f ${WORKDIR}/${PIDFILE}
+}
+
+case "$1" in
+    start|stop)
+        do_${1}
+        echo '>>>> PYTHON MODULE' ${1^^}
+        ;;
+    reload|restart)
+        do_stop
+        do_start
+        ;;
+    *)
+        exit 1
+        ;;
+esac
@@ -5,6 +5,9 @@ CREATE TABLE IF NOT EXISTS public.tb_wifi_prediction (
     acs_cnt         INTEGER NOT NULL,
     reg_dttm        TIMESTAMP
 );
+-- (grid_id, std_date) upsert 용 인덱스
+CREATE INDEX IF NOT EXISTS idx_tb_wifi_prediction_grid_date
+    ON public.tb_wifi_prediction (grid_id, std_date);
 
 CREATE TABLE IF NOT EXISTS public.tb_flowpop (
     grid_id     CHAR(8),
@@ -65,4 +68,53 @@ CREATE INDEX IF NOT EXISTS idx_tb_local_pay_std_ym
 -- 인구
 CREATE TABLE IF NOT EXISTS yeosu_dm.tb_population (
     grid_id         CHAR(8) NOT NULL,
-)
\ No newline at end of file
+)
+-- grid_id 정수 저장 (GRID_ID_STORAGE=int)
+-- 위 테이블의 grid_id 는 CHAR(8) 기준이며, GRID_ID_STORAGE=int 로 실행하면 파이프라인이 새로 만드는
+-- 테이블(tb_wifi_prediction, tb_flowpop 부모 테이블 등)은 grid_id INTEGER 로 생성됩니다.
+-- 기존 테이블을 전환할 때는 아래처럼 변환 후 GRID_ID_STORAGE=int 로 바꿉니다.
+-- ALTER TABLE public.tb_wifi_prediction ALTER COLUMN grid_id TYPE INTEGER USING grid_id::integer;
+-- ALTER TABLE yeosu_dm.tb_population   ALTER COLUMN grid_id TYPE INTEGER USING grid_id::integer;
+
+-- 유동인구 다중 해상도 롤업 (flowpop.run_rollups 가 월별로 DELETE + INSERT)
+-- grid_id 는 250m / 1km 블록의 좌하단 50m 격자 id (json/grid_lattice.json 의 격자 규칙으로 계산)
+CREATE TABLE IF NOT EXISTS public.tb_flowpop_rollup_250m (
+    crtr_ym     VARCHAR(6) NOT NULL,
+    grid_id     CHAR(8),
+    timezn_cd   VARCHAR(10),
+    type        VARCHAR(20),
+    m10 FLOAT8, m20 FLOAT8, m30 FLOAT8, m40 FLOAT8, m50 FLOAT8, m60 FLOAT8, m70 FLOAT8,
+    f10 FLOAT8, f20 FLOAT8, f30 FLOAT8, f40 FLOAT8, f50 FLOAT8, f60 FLOAT8, f70 FLOAT8,
+    total       FLOAT8
+);
+CREATE INDEX IF NOT EXISTS idx_tb_flowpop_rollup_250m_ym_key
+    ON public.tb_flowpop_rollup_250m (crtr_ym, grid_id, timezn_cd);
+-- tb_flowpop_rollup_1km 은 동일 구조, tb_flowpop_rollup_admi 는 grid_id 대신 admi_cd VARCHAR(20)
+
+-- 유동인구 compact 레이아웃 (FLOWPOP_LAYOUT=compact 또는 flowpop.py --layout compact 로 새 월에 적용)
+-- (격자, 일자, 시간대, 유형) 당 성/연령 14개 값을 real[] 하나로 저장하고 admi_cd 는 격자 차원으로 분리합니다.
+-- compact 월의 public.tb_flowpop_YYYYMM 은 wide 컬럼 모양의 뷰이며, 전체 월은 public.v_tb_flowpop 으로 조회합니다.
+-- 기존 wide 월 전환: python flowpop.py YYYYMM --to-compact
+CREATE TABLE IF NOT EXISTS public.tb_flowpop_compact (
+    id          INTEGER NOT NULL,
+    etl_ymd     DATE NOT NULL,
+    timezn_cd   VARCHAR(10),    -- wide 와 같은 원본 코드 문자열
+    type        VARCHAR(20),
+    total       REAL,
+    pop         REAL[]      -- m10..m70, f10..f70 순서
+)
+PARTITION BY RANGE (etl_ymd);
+
+CREATE TABLE IF NOT EXISTS public.tb_flowpop_grid (
+    id          INTEGER PRIMARY KEY,
+    admi_cd     VARCHAR(20)
+);
+
+-- 유동인구 월 적재 버전 (적재 / compact 전환 / 집계 / 롤업 트랜잭션에서 version + 1)
+-- flowpop_api.py 조회 캐시가 주기적으로 읽어 version 이 바뀐 월의 캐시를 비웁니다.
+CREATE TABLE IF NOT EXISTS public.tb_flowpop_load_log (
+    crtr_ym     VARCHAR(6) PRIMARY KEY,
+    version     BIGINT NOT NULL,
+    step        VARCHAR(20),
+    loaded_at   TIMESTAMP NOT NULL DEFAULT now()
+);
@@ -1,3 +1,6 @@
+-- 모든 쿼리는 :snapshot_dt (data_crtr_dt 스냅샷) 파라미터를 받습니다.
+-- NULL 이면 테이블별 최신 MAX(data_crtr_dt) 와 현재 날짜(나이 계산) 기준, 값이 있으면 그 스냅샷 기준입니다.
+-- (asyncpg 경로에서는 pop.py 가 $1 로 바꿔 실행)
 -- ####################
 -- [1] 세대별 세대원 수
 -- ####################
@@ -9,7 +12,7 @@ with household AS (
              LEFT JOIN tb_gmc_fmbr_info mbr
                        ON head.jumin_head_sid = mbr.jumin_head_sid
     WHERE head.jumin_state_code IN ('10', '13', '43')
-      AND head.data_crtr_dt = (select MAX(data_crtr_dt) from tb_gmc_hshldr_info) -- #변수#
+      AND head.data_crtr_dt = COALESCE(:snapshot_dt, (SELECT MAX(data_crtr_dt) FROM tb_gmc_hshldr_info))
     GROUP BY head.jumin_head_sid
 )
 SELECT
@@ -24,7 +27,7 @@ SELECT
     head.data_crtr_dt
 from household
 LEFT JOIN tb_gmc_hshldr_info head ON household.jumin_head_sid = head.jumin_head_sid
-WHERE head.data_crtr_dt = (select MAX(data_crtr_dt) from tb_gmc_hshldr_info)
+WHERE head.data_crtr_dt = COALESCE(:snapshot_dt, (SELECT MAX(data_crtr_dt) FROM tb_gmc_hshldr_info))
 ; 
 
 
@@ -38,11 +41,11 @@ SELECT
         WHEN CAST(SUBSTRING(mvin.jumin_sid, 7, 1) AS INTEGER) % 2 = 1 THEN 'M'
         ELSE 'F'
         END AS gender,
-    -- 나이 계산: 현재년도(두 자리) - 주민번호 앞 두 자리 → 음수면 +100
+    -- 나이 계산: 기준년도(스냅샷, 없으면 현재 / 두 자리) - 주민번호 앞 두 자리 → 음수면 +100
     CASE
-        WHEN ((CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100) - CAST(SUBSTRING(mvin.jumin_sid, 1, 2) AS INTEGER)) < 0
-            THEN ((CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100) - CAST(SUBSTRING(mvin.jumin_sid, 1, 2) AS INTEGER) + 100)
-        ELSE ((CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100) - CAST(SUBSTRING(mvin.jumin_sid, 1, 2) AS INTEGER))
+        WHEN ((CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100) - CAST(SUBSTRING(mvin.jumin_sid, 1, 2) AS INTEGER)) < 0
+            THEN ((CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100) - CAST(SUBSTRING(mvin.jumin_sid, 1, 2) AS INTEGER) + 100)
+        ELSE ((CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100) - CAST(SUBSTRING(mvin.jumin_sid, 1, 2) AS INTEGER))
         END AS age,
     mvin.jumin_inr_rd_code,
     mvin.jumin_inr_regn_code,
@@ -50,7 +53,7 @@ SELECT
     mvin.jumin_inr_bdng_subno,
     mvin.jumin_inr_san
 FROM tb_gmc_mvin_info mvin
-where mvin.data_crtr_dt = (select MAX(data_crtr_dt) from tb_gmc_mvin_info)
+where mvin.data_crtr_dt = COALESCE(:snapshot_dt, (SELECT MAX(data_crtr_dt) FROM tb_gmc_mvin_info))
 ;
 
 -- ####################
@@ -63,11 +66,11 @@ SELECT
         WHEN CAST(SUBSTRING(mvout.jumin_sid, 7, 1) AS INTEGER) % 2 = 1 THEN 'M'
         ELSE 'F'
         END AS gender,
-    -- 나이 계산: 현재년도(두 자리) - 주민번호 앞 두 자리 → 음수면 +100
+    -- 나이 계산: 기준년도(스냅샷, 없으면 현재 / 두 자리) - 주민번호 앞 두 자리 → 음수면 +100
     CASE
-        WHEN ((CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100) - CAST(SUBSTRING(mvout.jumin_sid, 1, 2) AS INTEGER)) < 0
-            THEN ((CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100) - CAST(SUBSTRING(mvout.jumin_sid, 1, 2) AS INTEGER) + 100)
-        ELSE ((CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100) - CAST(SUBSTRING(mvout.jumin_sid, 1, 2) AS INTEGER))
+        WHEN ((CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100) - CAST(SUBSTRING(mvout.jumin_sid, 1, 2) AS INTEGER)) < 0
+            THEN ((CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100) - CAST(SUBSTRING(mvout.jumin_sid, 1, 2) AS INTEGER) + 100)
+        ELSE ((CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100) - CAST(SUBSTRING(mvout.jumin_sid, 1, 2) AS INTEGER))
         END AS age,
     mvout.jumin_inr_rd_code,
     mvout.jumin_exr_rd_code,
@@ -76,7 +79,7 @@ SELECT
     mvout.jumin_exr_bdng_subno,
     mvout.jumin_exr_san
 FROM tb_gmc_mvout_info mvout
-where mvout.data_crtr_dt = (select MAX(data_crtr_dt) from tb_gmc_mvout_info)
+where mvout.data_crtr_dt = COALESCE(:snapshot_dt, (SELECT MAX(data_crtr_dt) FROM tb_gmc_mvout_info))
 ;
 
 -- ####################
@@ -92,16 +95,16 @@ SELECT
     -- 나이 계산: 세대원 주민번호 기준
     CASE
         WHEN (
-            (CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100)
+            (CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100)
             - CAST(SUBSTRING(mbr.jumin_sid, 1, 2) AS INTEGER)
         ) < 0
         THEN (
-            (CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100)
+            (CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100)
             - CAST(SUBSTRING(mbr.jumin_sid, 1, 2) AS INTEGER)
             + 100
         )
         ELSE (
-            (CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER) % 100)
+            (CAST(EXTRACT(YEAR FROM COALESCE(CAST(:snapshot_dt AS date), CURRENT_DATE)) AS INTEGER) % 100)
             - CAST(SUBSTRING(mbr.jumin_sid, 1, 2) AS INTEGER)
         )
     END AS age,
@@ -116,8 +119,8 @@ SELECT
 FROM tb_gmc_fmbr_info mbr
 LEFT JOIN tb_gmc_hshldr_info head 
     ON head.jumin_head_sid = mbr.jumin_head_sid
-   AND head.data_crtr_dt = (SELECT MAX(data_crtr_dt) FROM tb_gmc_hshldr_info)
+   AND head.data_crtr_dt = COALESCE(:snapshot_dt, (SELECT MAX(data_crtr_dt) FROM tb_gmc_hshldr_info))
 WHERE mbr.jumin_state_code IN ('10', '13', '43')
-  AND mbr.data_crtr_dt = (SELECT MAX(data_crtr_dt) FROM tb_gmc_fmbr_info)
+  AND mbr.data_crtr_dt = COALESCE(:snapshot_dt, (SELECT MAX(data_crtr_dt) FROM tb_gmc_fmbr_info))
 ;
 
@@ -6,6 +6,9 @@ DAEMON=wifi_predict.py
 
 LOG=${WORKDIR}/log/startup.log
 
+# 상주 모드: ./wifi_start.sh start --serve
+DAEMON_ARGS="${@:2}"
+
 
 if ! [ -d ${WORKDIR}/log ]; then
     mkdir ${WORKDIR}/log
@@ -14,7 +17,7 @@ fi
 function do_start()
 {
 	cd ${WORKDIR}
-    	nohup python -u ${DAEMON} >> ${LOG} &
+    	nohup python -u ${DAEMON} ${DAEMON_ARGS} >> ${LOG} &
 }
 
 function do_stop()
@@ -5,18 +5,31 @@ extract_ys_grid_joblib_tqdm.py
 ---------------------------------
 joblib 기반 병렬처리 + tqdm 로그 실시간 출력
 pickle 병목 해소 버전
+
+2단계 클리핑
+  1단계: STRtree bbox 사전 필터 + 내부(음수 버퍼) 격자 즉시 채택
+  2단계: 경계 후보 격자만 prepared geometry 로 정밀 교차 판정 (병렬)
+
+결과는 deploy/module/utils.get_grid_paths() 경로에 저장합니다. (GRID_PATH / ADMIN_DONG_PATH / GRID_CACHE_PATH)
+  - 여수 격자 GeoJSON
+  - 전국 행정동 경계에서 여수시만 뽑은 GeoJSON
+  - build_grid_cache 로 만든 격자 + 행정동 GeoParquet 캐시 (GridIndex 가 읽는 형식)
 """
 
 import geopandas as gpd
-import pandas as pd
 import numpy as np
+import shapely
 from shapely import unary_union, wkb
 from joblib import Parallel, delayed
 from tqdm import tqdm
 import logging
 import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "deploy", "module"))
+from utils import get_grid_paths, build_grid_cache
+
 def setup_logger():
     log_dir = "./"
     os.makedirs(log_dir, exist_ok=True)
@@ -31,11 +44,43 @@ def setup_logger():
     return log_file
 
 
-def intersect_chunk(chunk, region_wkb):
-    """개별 청크 교차 여부"""
-    from shapely import wkb
-    region_poly = wkb.loads(region_wkb)
-    return chunk.geometry.intersects(region_poly)
+def intersect_chunk(chunk_wkb, region_wkb):
+    """개별 청크 교차 여부 (prepared geometry 정밀 판정)"""
+    import shapely
+    region_poly = shapely.from_wkb(region_wkb)
+    shapely.prepare(region_poly)
+    return shapely.intersects(region_poly, shapely.from_wkb(chunk_wkb))
+
+
+def prefilter_grid(grid, region_poly, logger):
+    """
+    1단계: bbox 사전 필터 + 내부 격자 즉시 채택
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        내부 확정 격자 인덱스, 정밀 판정이 필요한 경계 후보 격자 인덱스
+    """
+    geoms = grid.geometry.values
+
+    # STRtree bbox 사전 필터: 여수 경계 bbox 와 겹치지 않는 격자는 제외
+    tree = shapely.STRtree(geoms)
+    candidates = np.sort(tree.query(region_poly))
+    logger.info(f"🔎 bbox 사전 필터: {len(candidates):,} / {len(grid):,} 격자 후보")
+
+    # 격자 대각선만큼 안쪽으로 줄인 내부 영역에 중심점이 있으면 격자 전체가 여수 내부
+    bounds = shapely.bounds(geoms[candidates])
+    margin = float(np.hypot(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]).max()) if len(candidates) else 0.0
+    interior = region_poly.buffer(-margin)
+    shapely.prepare(interior)
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+    inside = shapely.contains_xy(interior, cx, cy)
+
+    accepted = candidates[inside]
+    boundary = candidates[~inside]
+    logger.info(f"🟢 내부 격자 즉시 채택: {len(accepted):,} / 🟡 경계 후보: {len(boundary):,}")
+    return accepted, boundary
 
 
 def main():
@@ -46,7 +91,11 @@ def main():
     # ---------------------------------------------------
     grid_path = "./yeosu_flow_pop/grid_shp/yeosoo_id_wgs84.shp"
     region_path = "../../GIS/sgg/sig.shp"
-    output_path = "./yeosu_grid_filtered.geojson"
+    admin_src_path = "../../GIS/admin_dong/HangJeongDong_ver20250401.geojson"
+    paths = get_grid_paths()
+    output_path = paths["grid"]
+    admin_path = paths["admin"]
+    cache_path = paths["cache"]
     simplify_tol = 0.0
     n_jobs = -1
     # ---------------------------------------------------
@@ -66,26 +115,42 @@ def main():
     else:
         logger.info("⚙️ simplify_tol=0 → 단순화 미적용 (원본 유지)")
 
+    # 1단계: bbox 사전 필터 + 내부 격자 채택
+    accepted, boundary = prefilter_grid(grid, region_poly, logger)
+
     # WKB 변환 (pickle보다 훨씬 가벼움)
     region_wkb = wkb.dumps(region_poly)
 
-    # 청크 분할
-    n_chunks = os.cpu_count()
-    chunks = np.array_split(grid, n_chunks)
-    logger.info(f"🧩 총 {len(grid):,}개 격자를 {n_chunks}개 청크로 분할")
+    # 2단계: 경계 후보만 청크 분할 후 병렬 정밀 판정
+    n_chunks = max(1, min(os.cpu_count() or 1, len(boundary)))
+    chunks = [c for c in np.array_split(boundary, n_chunks) if len(c)]
+    logger.info(f"🧩 경계 후보 {len(boundary):,}개 격자를 {len(chunks)}개 청크로 분할")
+
+    boundary_wkb = shapely.to_wkb(grid.geometry.values[boundary])
+    offsets = np.cumsum([0] + [len(c) for c in chunks])
 
     # tqdm + joblib 병행
     results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(intersect_chunk)(chunk, region_wkb)
-        for chunk in tqdm(chunks, total=len(chunks), desc="여수시 격자 필터링 진행 중", mininterval=2.0)
+        delayed(intersect_chunk)(boundary_wkb[offsets[i]:offsets[i + 1]], region_wkb)
+        for i in tqdm(range(len(chunks)), total=len(chunks), desc="여수시 격자 필터링 진행 중", mininterval=2.0)
     )
 
-    mask = pd.concat(results)
-    grid_in_region = grid.loc[mask.values].copy()
+    mask = np.concatenate(results) if results else np.zeros(0, dtype=bool)
+    keep = np.sort(np.concatenate([accepted, boundary[mask]]))
+    grid_in_region = grid.iloc[keep].copy()
     logger.info(f"✅ 필터링 완료: {len(grid_in_region):,} / {len(grid):,} 격자 유지")
 
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
     grid_in_region.to_file(output_path, driver="GeoJSON")
     logger.info(f"💾 결과 저장 완료: {os.path.abspath(output_path)}")
+
+    # 행정동 경계 (여수시만) → GridIndex 캐시
+    admin = gpd.read_file(admin_src_path)
+    admin = admin[admin["sggnm"] == "여수시"][["adm_cd2", "sggnm", "geometry"]]
+    admin.to_file(admin_path, driver="GeoJSON")
+    logger.info(f"💾 행정동 경계 저장 완료: {os.path.abspath(admin_path)} ({len(admin):,}개 행정동)")
+    build_grid_cache(output_path, admin_path, cache_path)
+    logger.info(f"💾 GeoParquet 캐시 저장 완료: {os.path.abspath(cache_path)}")
     logger.info("✅ 스크립트 종료")
 
     print(f"로그 파일: {log_file}")